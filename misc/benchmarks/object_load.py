@@ -0,0 +1,103 @@
+"""
+Rough measurement of how long it takes to fetch and instantiate every object
+at start-up, comparing dict rows from psycopg2's DictConnection (what the
+DB layer used to use) with plain tuple rows converted by row_to_kwargs().
+
+Scratch objects are inserted into the test DB, loaded both ways, then
+deleted. The test DB needs to exist, so run the test suite first. Run from
+the repository root:
+
+    PYTHONPATH=. python misc/benchmarks/object_load.py [num_objects]
+"""
+
+import sys
+import time
+
+import psycopg2
+import psycopg2.extras
+
+from src.daemons.server.objects.db_io import DBManager
+from src.daemons.server.objects.parent_loader.loader import ParentLoader
+from src.utils.db import get_db_connection_kwargs
+
+THING_PARENT = 'src.game.parents.base_objects.thing.ThingObject'
+# Each timing is repeated this many times, and the best is kept.
+NUM_RUNS = 3
+
+
+def insert_objects(cursor, num_objects):
+    """
+    :param cursor: A psycopg2 cursor.
+    :param int num_objects: How many scratch objects to insert.
+    """
+
+    rows = [
+        ('Benchmark %d' % i, THING_PARENT, 'thing', 'A thing.', ['obj'])
+        for i in xrange(num_objects)
+    ]
+    psycopg2.extras.execute_values(
+        cursor,
+        "INSERT INTO dott_objects "
+        "  (name, parent, base_type, description, aliases) VALUES %s",
+        rows, page_size=1000)
+
+
+def time_load(conn, instantiate, query):
+    """
+    :param conn: A psycopg2 connection.
+    :param callable instantiate: Turns a row into an object.
+    :param str query: The object SELECT.
+    :rtype: float
+    :returns: The best time to fetch and instantiate every object, in
+        seconds.
+    """
+
+    best_time = None
+    for _ in xrange(NUM_RUNS):
+        cursor = conn.cursor()
+        start_time = time.time()
+        cursor.execute(query)
+        objects = [instantiate(row) for row in cursor.fetchall()]
+        elapsed = time.time() - start_time
+        cursor.close()
+        del objects
+        if best_time is None or elapsed < best_time:
+            best_time = elapsed
+    return best_time
+
+
+def main():
+    num_objects = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    conn_info = get_db_connection_kwargs(db_mode='test')
+    tuple_conn = psycopg2.connect(**conn_info)
+    tuple_conn.set_session(autocommit=True)
+    dict_conn = psycopg2.connect(
+        connection_factory=psycopg2.extras.DictConnection, **conn_info)
+
+    db_manager = DBManager(None, ParentLoader(), 'test')
+    query = db_manager._object_select + " WHERE name LIKE 'Benchmark %%'"
+
+    cursor = tuple_conn.cursor()
+    insert_objects(cursor, num_objects)
+    try:
+        dict_time = time_load(
+            dict_conn, db_manager.instantiate_object, query)
+        tuple_time = time_load(
+            tuple_conn, db_manager.instantiate_object_from_row, query)
+    finally:
+        cursor.execute(
+            "DELETE FROM dott_objects WHERE name LIKE 'Benchmark %%'")
+        dict_conn.close()
+        tuple_conn.close()
+
+    print('Objects loaded: %d' % num_objects)
+    print('Dict rows:  %.3f sec (%.1f usec/object)' % (
+        dict_time, dict_time / num_objects * 1000000))
+    print('Tuple rows: %.3f sec (%.1f usec/object)' % (
+        tuple_time, tuple_time / num_objects * 1000000))
+    print('Speedup:    %.1f%%' % ((dict_time - tuple_time) / dict_time * 100))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""
+Rough measurement of how much memory each in-memory object costs. Instantiates
+a large number of objects the same way the object store does when loading
+from the DB, then reports the growth in resident memory per object. This is
+done for BaseObject, and for a baseline class that stores the same fields the
+way BaseObject used to, in a per-instance __dict__. Each is measured in its
+own process, so one can't re-use memory freed by the other.
+
+Run from the repository root:
+
+    PYTHONPATH=. python misc/benchmarks/object_memory.py [num_objects]
+"""
+
+import gc
+import multiprocessing
+import resource
+import sys
+
+from src.game.parents.base_objects.room import RoomObject
+from src.game.parents.base_objects.thing import ThingObject
+
+ROOM_PARENT = 'src.game.parents.base_objects.room.RoomObject'
+THING_PARENT = 'src.game.parents.base_objects.thing.ThingObject'
+
+
+def get_max_rss_bytes():
+    """
+    :rtype: int
+    :returns: The peak resident set size of this process, in bytes.
+    """
+
+    # ru_maxrss is in kilobytes on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class DictBackedObject(object):
+    """
+    The baseline. Holds the same fields as :py:class:`BaseObject`, the way
+    it did before it had __slots__: in a per-instance __dict__, with a list
+    of aliases and an attributes dict for every object, and no interning.
+    """
+
+    def __init__(self, mud_service, id, parent, name, description=None,
+                 internal_description=None,
+                 location_id=None, destination_id=None, zone_id=None,
+                 aliases=None, originally_controlled_by_account_id=None,
+                 controlled_by_account_id=None, attributes=None,
+                 created_time=None):
+        self.mud_service = mud_service
+        self.id = id
+        self.name = name
+        self.description = description
+        self.internal_description = internal_description
+        self.parent = parent
+        self.location_id = location_id
+        self.destination_id = destination_id
+        self.zone_id = zone_id
+        self.aliases = aliases or []
+        self.originally_controlled_by_account_id = originally_controlled_by_account_id
+        self.controlled_by_account_id = controlled_by_account_id
+        self._attributes = attributes or {}
+        self.created_time = created_time
+
+
+def copy_str(value):
+    """
+    Returns an equal, but distinct, string instance. Rows coming back from
+    the DB driver don't share string instances, so neither should we.
+    """
+
+    return (value + '.')[:-1]
+
+
+def build_objects(num_objects, baseline=False):
+    """
+    :param int num_objects: How many objects to instantiate.
+    :keyword bool baseline: If True, instantiate :py:class:`DictBackedObject`
+        instead of the real parents.
+    :rtype: list
+    :returns: A list of freshly instantiated objects.
+    """
+
+    objects = []
+    for i in xrange(num_objects):
+        if i % 10 == 0:
+            parent_class, parent = RoomObject, ROOM_PARENT
+            location_id = None
+        else:
+            parent_class, parent = ThingObject, THING_PARENT
+            location_id = i - (i % 10)
+        if baseline:
+            parent_class = DictBackedObject
+        objects.append(parent_class(
+            None, i, copy_str(parent), 'Object %d' % i,
+            location_id=location_id,
+            aliases=[copy_str('obj'), copy_str('thing')],
+            attributes={},
+        ))
+    return objects
+
+
+def measure_rss_growth(num_objects, baseline):
+    """
+    Builds the objects, and measures how much the process grew.
+
+    :param int num_objects: How many objects to instantiate.
+    :param bool baseline: See :py:func:`build_objects`.
+    :rtype: int
+    :returns: The growth in peak resident memory, in bytes.
+    """
+
+    gc.collect()
+    rss_before = get_max_rss_bytes()
+    objects = build_objects(num_objects, baseline=baseline)
+    gc.collect()
+    rss_after = get_max_rss_bytes()
+    assert len(objects) == num_objects
+    return rss_after - rss_before
+
+
+def main():
+    num_objects = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    print "Objects: %d" % num_objects
+    print "%-18s %14s %18s" % ('', 'RSS growth (MB)', 'Bytes per object')
+    for label, baseline in (('Before (__dict__)', True),
+                            ('After (BaseObject)', False)):
+        # A fresh process for each, so their peaks don't overlap.
+        pool = multiprocessing.Pool(1)
+        rss_growth = pool.apply(measure_rss_growth, (num_objects, baseline))
+        pool.close()
+        pool.join()
+        print "%-18s %14.1f %18d" % (
+            label, rss_growth / 1048576.0, rss_growth / num_objects)
+
+
+if __name__ == '__main__':
+    main()
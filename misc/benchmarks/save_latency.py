@@ -0,0 +1,74 @@
+"""
+Rough measurement of per-save latency, comparing the plain-text partial
+UPDATE that object saves used to send with the prepared statement that
+DBManager executes by name now. Both run over one synchronous connection, so
+the difference is mostly the parsing and planning that Postgres skips.
+
+A scratch object is inserted, saved over and over, then deleted. Run from
+the repository root:
+
+    PYTHONPATH=. python misc/benchmarks/save_latency.py [num_saves] [db_mode]
+
+``db_mode`` is either 'test' (the default) or 'production'.
+"""
+
+import sys
+import time
+
+import psycopg2
+
+from src.utils.db import PreparedStatement, get_db_connection_kwargs
+
+# A typical save after an object is moved and renamed.
+UPDATE_QUERY = "UPDATE dott_objects SET name=%s, location_id=%s WHERE id=%s"
+
+
+def time_saves(cursor, num_saves, query, obj_id):
+    """
+    :param cursor: A psycopg2 cursor.
+    :param int num_saves: How many saves to time.
+    :param str query: The query to run for each save.
+    :param int obj_id: The ID of the scratch object.
+    :rtype: float
+    :returns: The average time per save, in seconds.
+    """
+
+    start_time = time.time()
+    for i in xrange(num_saves):
+        cursor.execute(query, ('Benchmark %d' % i, None, obj_id))
+    return (time.time() - start_time) / num_saves
+
+
+def main():
+    num_saves = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    db_mode = sys.argv[2] if len(sys.argv) > 2 else 'test'
+
+    conn = psycopg2.connect(**get_db_connection_kwargs(db_mode=db_mode))
+    conn.set_session(autocommit=True)
+    cursor = conn.cursor()
+    cursor.execute(
+        "INSERT INTO dott_objects (name, parent, base_type) "
+        "  VALUES ('Benchmark', 'benchmark', 'thing') RETURNING id")
+    obj_id = cursor.fetchone()[0]
+
+    statement = PreparedStatement('benchmark_update_object', UPDATE_QUERY)
+    cursor.execute(statement.prepare_sql)
+    try:
+        # Warm up the connection and caches before timing anything.
+        time_saves(cursor, 100, UPDATE_QUERY, obj_id)
+        plain_time = time_saves(cursor, num_saves, UPDATE_QUERY, obj_id)
+        prepared_time = time_saves(
+            cursor, num_saves, statement.execute_sql, obj_id)
+    finally:
+        cursor.execute("DELETE FROM dott_objects WHERE id=%s", (obj_id,))
+        conn.close()
+
+    print('Saves timed: %d' % num_saves)
+    print('Plain UPDATE:    %.1f usec/save' % (plain_time * 1000000))
+    print('Prepared UPDATE: %.1f usec/save' % (prepared_time * 1000000))
+    print('Difference:      %.1f%%' % (
+        (plain_time - prepared_time) / plain_time * 100))
+
+
+if __name__ == '__main__':
+    main()
@@ -32,6 +32,22 @@ COMMENT ON EXTENSION plpgsql IS 'PL/pgSQL procedural language';
 
 SET search_path = public, pg_catalog;
 
+--
+-- Name: dott_objects_bump_change_seq(); Type: FUNCTION; Schema: public; Owner: dott
+--
+
+CREATE FUNCTION dott_objects_bump_change_seq() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+    PERFORM nextval('dott_objects_change_seq');
+    RETURN NULL;
+END;
+$$;
+
+
+ALTER FUNCTION public.dott_objects_bump_change_seq() OWNER TO dott;
+
 SET default_tablespace = '';
 
 SET default_with_oids = false;
@@ -84,7 +100,7 @@ ALTER SEQUENCE dott_accounts_id_seq OWNED BY dott_accounts.id;
 
 CREATE TABLE dott_objects (
     id integer NOT NULL,
-    attributes json,
+    attributes jsonb,
     name character varying NOT NULL,
     parent character varying NOT NULL,
     location_id integer,
@@ -126,6 +142,21 @@ ALTER TABLE public.dott_objects_id_seq OWNER TO dott;
 ALTER SEQUENCE dott_objects_id_seq OWNED BY dott_objects.id;
 
 
+--
+-- Name: dott_objects_change_seq; Type: SEQUENCE; Schema: public; Owner: dott
+--
+
+CREATE SEQUENCE dott_objects_change_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+ALTER TABLE public.dott_objects_change_seq OWNER TO dott;
+
+
 --
 -- TOC entry 1866 (class 2604 OID 16457)
 -- Name: id; Type: DEFAULT; Schema: public; Owner: dott
@@ -169,6 +200,13 @@ ALTER TABLE ONLY dott_objects
     ADD CONSTRAINT dott_objects_id PRIMARY KEY (id);
 
 
+--
+-- Name: dott_objects_attributes; Type: INDEX; Schema: public; Owner: dott; Tablespace: 
+--
+
+CREATE INDEX dott_objects_attributes ON dott_objects USING gin (attributes jsonb_path_ops);
+
+
 --
 -- TOC entry 1874 (class 1259 OID 16465)
 -- Name: fki_dott_accounts_currently_controlling_id; Type: INDEX; Schema: public; Owner: dott; Tablespace: 
@@ -217,6 +255,13 @@ CREATE INDEX fki_dott_objects_original_account_id_to_id ON dott_objects USING bt
 CREATE INDEX fki_dott_objects_zone_id_to_id ON dott_objects USING btree (zone_id);
 
 
+--
+-- Name: dott_objects_changed; Type: TRIGGER; Schema: public; Owner: dott
+--
+
+CREATE TRIGGER dott_objects_changed AFTER INSERT OR DELETE OR UPDATE OR TRUNCATE ON dott_objects FOR EACH STATEMENT EXECUTE PROCEDURE dott_objects_bump_change_seq();
+
+
 --
 -- TOC entry 1882 (class 2606 OID 16471)
 -- Name: dott_accounts_currently_controlling_id; Type: FK CONSTRAINT; Schema: public; Owner: dott
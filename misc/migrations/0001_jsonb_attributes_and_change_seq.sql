@@ -0,0 +1,63 @@
+--
+-- Brings a database created from an older dott-schema.sql up to date:
+--
+--  * dott_objects.attributes becomes jsonb, which set_attribute() saves
+--    rely on (they patch single keys through jsonb_set), and gets a GIN
+--    index for attribute lookups.
+--  * dott_objects_change_seq, and the trigger that bumps it whenever
+--    dott_objects changes, are added. Shutdown snapshots are checked
+--    against this counter before they are trusted.
+--
+-- Safe to run more than once. Stop the server before running it:
+--
+--   psql --username dott -f misc/migrations/0001_jsonb_attributes_and_change_seq.sql dott
+--
+
+SET search_path = public, pg_catalog;
+
+BEGIN;
+
+--
+-- jsonb attributes.
+--
+
+DO $$
+BEGIN
+    IF (SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'dott_objects' AND column_name = 'attributes') = 'json' THEN
+        ALTER TABLE dott_objects
+            ALTER COLUMN attributes TYPE jsonb USING attributes::jsonb;
+    END IF;
+END;
+$$;
+
+CREATE INDEX IF NOT EXISTS dott_objects_attributes ON dott_objects USING gin (attributes jsonb_path_ops);
+
+--
+-- Change counter.
+--
+
+CREATE SEQUENCE IF NOT EXISTS dott_objects_change_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+ALTER TABLE public.dott_objects_change_seq OWNER TO dott;
+
+CREATE OR REPLACE FUNCTION dott_objects_bump_change_seq() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+BEGIN
+    PERFORM nextval('dott_objects_change_seq');
+    RETURN NULL;
+END;
+$$;
+
+ALTER FUNCTION public.dott_objects_bump_change_seq() OWNER TO dott;
+
+DROP TRIGGER IF EXISTS dott_objects_changed ON dott_objects;
+CREATE TRIGGER dott_objects_changed AFTER INSERT OR DELETE OR UPDATE OR TRUNCATE ON dott_objects FOR EACH STATEMENT EXECUTE PROCEDURE dott_objects_bump_change_seq();
+
+COMMIT;
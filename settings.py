@@ -30,12 +30,67 @@ TEST_DATABASE = {
     'host': None,
     'port': None,
 }
+# Number of DB connections in each of a process's connection pools.
+# Player-facing queries and saves go through the interactive lane. Loads,
+# batch writes, and other long-running work go through the bulk lane, so
+# they can't hold up the interactive one.
+DB_POOL_SIZES = {
+    'interactive': 3,
+    'bulk': 2,
+}
+# Where objects and accounts are stored. One of 'postgres' or 'memory'. The
+# memory backend keeps everything in-process and loses it all on shutdown,
+# which makes it handy for benchmarks and load tests without a DB server.
+DB_BACKEND = 'postgres'
+# Same as above, for the test suite. Set DOTT_TEST_DB_BACKEND=memory to run
+# the tests without Postgres. Tests that are specific to Postgres are skipped.
+TEST_DB_BACKEND = os.environ.get('DOTT_TEST_DB_BACKEND', 'postgres')
 
 # Amazon Web Services credentials.
 AWS_ACCESS_KEY_ID = 'XXXXXXXXXXXXXXXXXXXXX'
 AWS_SECRET_ACCESS_KEY = 'YYYYYYYYYYYYYYYYYYYYYYYYYYY'
 # This needs to be set to one of your Amazon SES verified email addresses.
 SERVER_EMAIL_FROM = 'your@email.com'
+# If True, object attributes are loaded from the DB as JSON text, and only
+# decoded when first accessed. Speeds up start-up and saves memory on big games.
+LAZY_ATTRIBUTE_DECODING = True
+# If True, only the fields needed to place objects in the world are loaded
+# at start-up. Descriptions and attributes are loaded in the background, in
+# batches of OBJECT_HYDRATION_BATCH_SIZE, or as soon as a command needs them.
+SKELETON_OBJECT_LOAD = True
+OBJECT_HYDRATION_BATCH_SIZE = 500
+# How many rows to fetch at a time when loading objects from the DB.
+OBJECT_LOAD_BATCH_SIZE = 1000
+# If set, bounded-memory mode is turned on. Only this many objects keep their
+# descriptions and attributes in memory, least recently used are dropped
+# first and re-loaded when needed. Implies SKELETON_OBJECT_LOAD.
+OBJECT_PAYLOAD_CACHE_SIZE = None
+# If set, write-behind mode is turned on. Saves of existing objects are
+# queued, and written to the DB in batches of WRITE_BEHIND_BATCH_SIZE every
+# this many seconds (and on shutdown). Repeated saves of the same object
+# between flushes are only written once.
+WRITE_BEHIND_INTERVAL = None
+WRITE_BEHIND_BATCH_SIZE = 100
+# If a batch fails to write, its objects are retried one at a time. Objects
+# that fail to write on this many flushes in a row are logged and dropped
+# from the queue, so they can't hold up the rest forever.
+WRITE_BEHIND_MAX_ATTEMPTS = 5
+# If set, and write-behind mode is on, every save and destroy is appended to
+# this local journal file before it returns, and written to the DB on the
+# next flush. New objects are still inserted straight away. Whatever a crash
+# keeps from the DB is replayed from the journal on the next start-up.
+OBJECT_JOURNAL_FILE = None
+# Same as above, for the test suite.
+TEST_OBJECT_JOURNAL_FILE = None
+# Journal appends are fsynced together, this many seconds after the first
+# one. Saves return once their record is synced.
+OBJECT_JOURNAL_SYNC_DELAY = 0.005
+# The object store is written here on graceful shutdown, and loaded from here
+# on the next start-up if nothing has changed in the DB since. Set to None to
+# always load from the DB.
+OBJECT_SNAPSHOT_FILE = os.path.join(BASE_PATH, 'object_store.snapshot')
+# Same as above, for the test suite.
+TEST_OBJECT_SNAPSHOT_FILE = None
 # The ID of the room or object that new PlayerObjects are created in.
 NEW_PLAYER_LOCATION_ID = 1
 
@@ -8,6 +8,8 @@ from twisted.internet.defer import inlineCallbacks, returnValue
 from src.accounts.db_io import DBManager
 from src.accounts.exceptions import AccountNotFoundException, UsernameTakenException
 from src.accounts.account import PlayerAccount
+from src.accounts.memory_db_io import MemoryDBManager
+from src.utils.db import get_db_backend
 
 
 class AccountStore(object):
@@ -15,13 +17,21 @@ class AccountStore(object):
     Serves as an in-memory store for all account values.
     """
 
+    # Storage backend names, as used in settings.DB_BACKEND, mapped to the
+    # BaseDBManager sub-classes that implement them.
+    DB_MANAGERS = {
+        'postgres': DBManager,
+        'memory': MemoryDBManager,
+    }
+
     def __init__(self, db_mode='production'):
         """
         :keyword str mode: Either 'test' or 'production'.
         """
 
         # All DB operations happen through here.
-        self.db_manager = DBManager(self, db_mode)
+        self.db_manager = self.DB_MANAGERS[get_db_backend(db_mode)](
+            self, db_mode)
 
     @inlineCallbacks
     def prep_and_load(self):
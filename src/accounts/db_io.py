@@ -1,20 +1,107 @@
 """
 This module manages all I/O from the DB, and handles the population of the
-AccountStore.
+AccountStore. :py:class:`BaseDBManager` is the interface the store talks
+to, and :py:class:`DBManager` is the Postgres implementation of it.
 """
 
 from twisted.internet.defer import inlineCallbacks, returnValue
 
 from src.accounts.account import PlayerAccount
-from src.utils.db import txPGDictConnection, get_db_connection_kwargs
+from src.utils.db import KeyedLock, PreparedStatement, get_db_pool, \
+    get_select_columns, row_to_kwargs
 
 
-class DBManager(object):
+class BaseDBManager(object):
     """
     This class serves as an abstraction layer between the AccountStore
-    and the underlying database. It handles the loading of objects at
-    server start time, and all CRUD operations on the DB side. DBManager is
-    allowed to manipulate the self.store._objects dict.
+    and whatever it is persisted to. It handles all CRUD operations on the
+    storage side. Sub-classes implement this for a particular storage
+    engine, and are picked by ``settings.DB_BACKEND``. Anything that
+    touches storage returns a Deferred.
+    """
+
+    def __init__(self, store, db_mode='production'):
+        """
+        :keyword AccountStore store: The account store this instance manages.
+        :keyword str mode: Either 'test' or 'production'.
+        """
+
+        self.store = store
+        self._db_mode = db_mode
+
+    def prepare_and_load(self):
+        """
+        Gets the storage engine ready for use.
+
+        :rtype: Deferred
+        """
+
+        raise NotImplementedError('Over-ride in sub-class.')
+
+    def get_account_count(self):
+        """
+        :rtype: Deferred
+        :returns: A Deferred that fires with a total count of active
+            accounts.
+        """
+
+        raise NotImplementedError('Over-ride in sub-class.')
+
+    def get_account_by_id(self, account_id):
+        """
+        :param int account_id: The account's ID (pk).
+        :rtype: Deferred
+        :returns: A Deferred that fires with the matching PlayerAccount, or
+            None if there isn't one.
+        """
+
+        raise NotImplementedError('Over-ride in sub-class.')
+
+    def get_account_by_username(self, account_username):
+        """
+        :param str account_username: The account's username. This is not
+            case sensitive.
+        :rtype: Deferred
+        :returns: A Deferred that fires with the matching PlayerAccount, or
+            None if there isn't one.
+        """
+
+        raise NotImplementedError('Over-ride in sub-class.')
+
+    def save_account(self, account):
+        """
+        Saves an account. New accounts have their ``id`` and
+        ``created_time`` filled in.
+
+        :param PlayerAccount account: The account to save.
+        :rtype: Deferred
+        :returns: A Deferred that fires with the saved account.
+        """
+
+        raise NotImplementedError('Over-ride in sub-class.')
+
+    def destroy_account(self, account):
+        """
+        :param PlayerAccount account: The account to delete.
+        :rtype: Deferred
+        """
+
+        raise NotImplementedError('Over-ride in sub-class.')
+
+    def instantiate_account(self, row):
+        """
+        :param dict row: The account's values, keyed by column name.
+        :rtype: PlayerAccount
+        :returns: The newly loaded player account.
+        """
+
+        # Instantiate the object, using the values from the row as kwargs.
+        return PlayerAccount(account_store=self.store, **row)
+
+
+class DBManager(BaseDBManager):
+    """
+    The Postgres storage engine, which is the default.
     """
 
     # TODO: Add last_login_dtime column.
@@ -27,6 +114,31 @@ class DBManager(object):
         "  id, username, currently_controlling_id, email, password, created_time "
         "  FROM dott_accounts"
     )
+    # Rows come back as tuples. These are the column names, in order.
+    ACCOUNT_COLUMNS = get_select_columns(BASE_ACCOUNT_SELECT)
+    # The hot queries are prepared once per connection, and executed by
+    # name from then on.
+    SELECT_ACCOUNT_BY_ID = PreparedStatement(
+        'dott_select_account_by_id', BASE_ACCOUNT_SELECT + " WHERE id=%s")
+    SELECT_ACCOUNT_BY_USERNAME = PreparedStatement(
+        'dott_select_account_by_username',
+        BASE_ACCOUNT_SELECT + " WHERE username ILIKE %s")
+    INSERT_ACCOUNT = PreparedStatement(
+        'dott_insert_account',
+        "INSERT INTO dott_accounts"
+        "  (username, currently_controlling_id, email, password)"
+        "  VALUES (%s, %s, %s, %s) "
+        " RETURNING id, created_time"
+    )
+    UPDATE_ACCOUNT = PreparedStatement(
+        'dott_update_account',
+        "UPDATE dott_accounts SET"
+        "  username=%s,"
+        "  currently_controlling_id=%s,"
+        "  email=%s,"
+        "  password=%s "
+        " WHERE ID=%s"
+    )
 
     def __init__(self, store, db_mode='production'):
         """
@@ -34,11 +146,13 @@ class DBManager(object):
         :keyword str mode: Either 'test' or 'production'.
         """
 
-        self.store = store
-        self._db_mode = db_mode
-        # This eventually contains a txpostgres Connection object, which is
-        # where we can query.
+        super(DBManager, self).__init__(store, db_mode)
+        # This eventually contains the process's interactive connection
+        # pool, which is where we can query.
         self._db = None
+        # Keeps saves of the same account from overtaking each other on
+        # different pooled connections.
+        self._save_lock = KeyedLock()
 
     @inlineCallbacks
     def prepare_and_load(self):
@@ -49,10 +163,7 @@ class DBManager(object):
 
         # Just in case this is a code reload.
         self.store._accounts = {}
-        # Instantiate the connection to Postgres.
-        self._db = txPGDictConnection()
-        conn_info = get_db_connection_kwargs(db_mode=self._db_mode)
-        yield self._db.connect(**conn_info)
+        self._db = yield get_db_pool(self._db_mode, 'interactive')
 
     @inlineCallbacks
     def get_account_count(self):
@@ -73,10 +184,8 @@ class DBManager(object):
         :rtype: PlayerAccount
         """
 
-        modified_query = "{base_query} WHERE id=%s".format(
-            base_query=self.BASE_ACCOUNT_SELECT
-        )
-        results = yield self._db.runQuery(modified_query, (account_id,))
+        results = yield self._db.runPreparedQuery(
+            self.SELECT_ACCOUNT_BY_ID, (account_id,))
 
         for row in results:
             returnValue(self.instantiate_account_from_row(row))
@@ -92,10 +201,8 @@ class DBManager(object):
         :rtype: PlayerAccount
         """
 
-        modified_query = "{base_query} WHERE username ILIKE %s".format(
-            base_query=self.BASE_ACCOUNT_SELECT
-        )
-        results = yield self._db.runQuery(modified_query, (account_username,))
+        results = yield self._db.runPreparedQuery(
+            self.SELECT_ACCOUNT_BY_USERNAME, (account_username,))
 
         for row in results:
             returnValue(self.instantiate_account_from_row(row))
@@ -106,28 +213,37 @@ class DBManager(object):
         """
         Given a txpostgres row, return a PlayerAccount instance for it.
 
-        :param row:
+        :param tuple row: A row from :py:attr:`BASE_ACCOUNT_SELECT`.
         :rtype: PlayerAccount
         :returns: The newly loaded player account.
         """
 
-        # Instantiate the object, using the values from dict-based row.
-        return PlayerAccount(account_store=self.store, **row)
+        return self.instantiate_account(
+            row_to_kwargs(self.ACCOUNT_COLUMNS, row))
 
-    @inlineCallbacks
     def save_account(self, account):
         """
         Saves an account to the DB.
 
+        :param PlayerAccount account: The account to save to the DB.
+        :rtype: Deferred
+        """
+
+        if not account.id:
+            return self._save_account(account)
+        return self._save_lock.run(account.id, self._save_account, account)
+
+    @inlineCallbacks
+    def _save_account(self, account):
+        """
+        Does the work for :py:meth:`save_account`.
+
         :param PlayerAccount account: The account to save to the DB.
         """
 
         if not account.id:
-            result = yield self._db.runQuery(
-                "INSERT INTO dott_accounts"
-                "  (username, currently_controlling_id, email, password)"
-                "  VALUES (%s, %s, %s, %s) "
-                " RETURNING id, created_time",
+            result = yield self._db.runPreparedQuery(
+                self.INSERT_ACCOUNT,
                 (
                     account.username,
                     account.currently_controlling_id,
@@ -140,13 +256,8 @@ class DBManager(object):
             account.id = result[0][0]
             account.created_time = result[0][1]
         else:
-            yield self._db.runOperation(
-                "UPDATE dott_accounts SET"
-                "  username=%s,"
-                "  currently_controlling_id=%s,"
-                "  email=%s,"
-                "  password=%s "
-                " WHERE ID=%s",
+            yield self._db.runPreparedOperation(
+                self.UPDATE_ACCOUNT,
                 (
                     account.username,
                     account.currently_controlling_id,
@@ -0,0 +1,99 @@
+"""
+An in-process storage engine for the AccountStore, which keeps everything in
+plain dicts. Nothing survives a restart, so this is meant for tests,
+benchmarks, and load tests, where it takes the DB out of the picture.
+"""
+
+import datetime
+
+from twisted.internet.defer import succeed
+
+from src.accounts.db_io import BaseDBManager
+
+
+class MemoryDBManager(BaseDBManager):
+    """
+    Stores each account as a dict of its column values, keyed by ID.
+    """
+
+    # The columns that save_account() writes.
+    ACCOUNT_COLUMNS = (
+        'username', 'currently_controlling_id', 'email', 'password')
+
+    def __init__(self, store, db_mode='production'):
+        """
+        :keyword AccountStore store: The account store this instance manages.
+        :keyword str mode: Either 'test' or 'production'.
+        """
+
+        super(MemoryDBManager, self).__init__(store, db_mode)
+        # Keys are account IDs, values are dicts of column values.
+        self._rows = {}
+        self._last_id = 0
+
+    def prepare_and_load(self):
+        """
+        Nothing to set up.
+        """
+
+        return succeed(None)
+
+    def get_account_count(self):
+        """
+        :rtype: int
+        :returns: A total count of active accounts.
+        """
+
+        return succeed(len(self._rows))
+
+    def get_account_by_id(self, account_id):
+        """
+        :param int account_id: The account's ID (pk).
+        :rtype: PlayerAccount
+        """
+
+        row = self._rows.get(account_id)
+        if row is None:
+            return succeed(None)
+        return succeed(self.instantiate_account(dict(row)))
+
+    def get_account_by_username(self, account_username):
+        """
+        :param str account_username: The account's username. This is not
+            case sensitive.
+        :rtype: PlayerAccount
+        """
+
+        lowered_username = account_username.lower()
+        for row in self._rows.itervalues():
+            if row['username'].lower() == lowered_username:
+                return succeed(self.instantiate_account(dict(row)))
+        return succeed(None)
+
+    def save_account(self, account):
+        """
+        :param PlayerAccount account: The account to save.
+        """
+
+        if not account.id:
+            self._last_id += 1
+            account.id = self._last_id
+            account.created_time = datetime.datetime.utcnow()
+            self._rows[account.id] = {
+                'id': account.id,
+                'created_time': account.created_time,
+            }
+
+        row = self._rows.get(account.id)
+        if row is not None:
+            for column in self.ACCOUNT_COLUMNS:
+                row[column] = getattr(account, column)
+        return succeed(account)
+
+    def destroy_account(self, account):
+        """
+        :param PlayerAccount account: The account to delete.
+        """
+
+        self._rows.pop(account.id, None)
+        return succeed(None)
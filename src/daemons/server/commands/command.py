@@ -17,6 +17,23 @@ class BaseCommand(object):
     name = None
     aliases = []
 
+    def hydrate_targets(self, invoker, *objects):
+        """
+        Makes sure that the descriptions and attributes of the objects a
+        command targets are loaded. The command handler only does this for
+        the invoker's surroundings, so commands that show the payloads of
+        objects found elsewhere (through an object ID, for example) need to
+        call this before reading them.
+
+        :param BaseObject invoker: The object running the command.
+        :param objects: The objects to hydrate. ``None`` values are skipped.
+        :rtype: Deferred
+        """
+
+        object_store = invoker.mud_service.object_store
+        return object_store.hydrate_objects(
+            [obj for obj in objects if obj is not None])
+
     def _get_header_str(self, header_text, header_text_color=ANSI_HI_YELLOW,
                         pad_char='=', pad_color=ANSI_HI_BLUE):
         """
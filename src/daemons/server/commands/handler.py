@@ -1,4 +1,4 @@
-from twisted.internet.defer import maybeDeferred
+from twisted.internet.defer import succeed
 from twisted.python import log
 from src.utils import logger
 from src.daemons.server.commands.parser import CommandParser
@@ -38,22 +38,12 @@ class CommandHandler(object):
         if not invoker.location:
             return None
 
-        # This is what we'll match aliases against.
-        exit_str = parsed_command.command_str.lower()
-
-        # Contents of current location = neighbors.
-        exit_neighbors = [obj for obj in invoker.location.get_contents() if obj.base_type == 'exit']
-
-        # This is pretty inefficient.
-        for n_exit in exit_neighbors:
-            for alias in n_exit.aliases:
-                alias = alias.lower()
-                if alias == exit_str:
-                    # Match found.
-                    return n_exit
-
-        # No exit match.
-        return None
+        # Exits are indexed by (location, alias) in the object store, so
+        # this is a single lookup no matter how many exits are around.
+        return self._mud_service.object_store.find_exit_by_alias(
+            invoker.location,
+            parsed_command.command_str,
+        )
 
     def _match_user_input_to_command(self, invoker, parsed_command):
         """
@@ -95,6 +85,33 @@ class CommandHandler(object):
 
         return result
 
+    def _hydrate_surroundings(self, invoker, exit_match):
+        """
+        While skeleton-loaded objects are still being hydrated in the
+        background (or have had their payloads evicted), make sure that the
+        invoker's surroundings are loaded before a command runs. Commands
+        that reach further than that hydrate their own targets, see
+        :py:meth:`BaseCommand.hydrate_targets`.
+
+        :param BaseObject invoker: The object generating the input.
+        :param exit_match: The exit the input matched, if any.
+        :type exit_match: ``ExitObject`` or ``None``
+        :rtype: Deferred
+        """
+
+        object_store = self._mud_service.object_store
+        if object_store.is_fully_hydrated:
+            return succeed(None)
+
+        to_hydrate = [invoker] + invoker.get_contents()
+        if invoker.location:
+            to_hydrate.append(invoker.location)
+            to_hydrate.extend(invoker.location.get_contents())
+        if exit_match and object_store.object_exists(exit_match.destination_id):
+            to_hydrate.append(
+                object_store.get_object(exit_match.destination_id))
+        return object_store.hydrate_objects(to_hydrate)
+
     def handle_input(self, invoker, command_string):
         """
         Given string-based input, parse for command details, then send the
@@ -124,7 +141,8 @@ class CommandHandler(object):
             return None
 
         # We found a command match, try to run it.
-        d = maybeDeferred(cmd_match.func, invoker, parsed_command)
+        d = self._hydrate_surroundings(invoker, exit_match)
+        d.addCallback(lambda _: cmd_match.func(invoker, parsed_command))
         d.addErrback(self._handle_command_error, invoker)
         d.addErrback(self._handle_other_errors, invoker)
         # Make sure this ends up in the console, too.
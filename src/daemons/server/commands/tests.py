@@ -1,8 +1,11 @@
 from twisted.internet.defer import inlineCallbacks
+
+import settings
 from src.utils.test_utils import DottTestCase
 from src.daemons.server.commands.parser import CommandParser, ParsedCommand
 from src.daemons.server.commands.cmdtable import CommandTable, DuplicateCommandException
 from src.daemons.server.commands.command import BaseCommand
+from src.game.commands.general import CmdExamine
 
 
 class CommandTableTests(DottTestCase):
@@ -138,4 +141,81 @@ class CommandParserTests(DottTestCase):
         parsed = self.parser.parse(";'s face is weird.")
         self.assertEquals(parsed.command_str, 'emote')
         self.assertEquals(parsed.arguments, ["'s", 'face', 'is', 'weird.'])
-        self.assertEquals(parsed.switches, {'nospace'})
\ No newline at end of file
+        self.assertEquals(parsed.switches, {'nospace'})
+
+
+class CommandHandlerTests(DottTestCase):
+
+    @inlineCallbacks
+    def test_match_user_input_to_exit(self):
+        """
+        Exit aliases typed as commands should resolve to the exit in the
+        invoker's location, and follow alias changes.
+        """
+
+        room1 = yield self.object_store.create_object(settings.ROOM_PARENT, name='Room 1')
+        room2 = yield self.object_store.create_object(settings.ROOM_PARENT, name='Room 2')
+        player = yield self.object_store.create_object(
+            settings.THING_PARENT,
+            location_id=room1.id,
+            name='Player')
+        test_exit = yield self.object_store.create_object(
+            settings.EXIT_PARENT,
+            location_id=room1.id,
+            destination_id=room2.id,
+            aliases=['N', 'north'],
+            name='North Exit')
+        parser = self.command_handler.parser
+        match_exit = self.command_handler._match_user_input_to_exit
+
+        self.assertEqual(test_exit, match_exit(player, parser.parse('n')))
+        self.assertEqual(test_exit, match_exit(player, parser.parse('NORTH')))
+        self.assertEqual(None, match_exit(player, parser.parse('south')))
+
+        test_exit.aliases = ['s']
+        self.assertEqual(None, match_exit(player, parser.parse('n')))
+        self.assertEqual(test_exit, match_exit(player, parser.parse('s')))
+
+        # Players in other rooms don't see the exit.
+        player.set_location(room2)
+        self.assertEqual(None, match_exit(player, parser.parse('s')))
+
+    @inlineCallbacks
+    def test_hydrate_surroundings(self):
+        """
+        The invoker's surroundings are hydrated before a command runs.
+        Anything further afield is left to the commands that target it.
+        """
+
+        # Bounded-memory mode leaves skeletons alone until they're needed.
+        self.patch(settings, 'OBJECT_PAYLOAD_CACHE_SIZE', 100)
+        yield self.recreate_object_store()
+
+        room1 = yield self.object_store.create_object(
+            settings.ROOM_PARENT, name='Room 1', description='Close by.')
+        room2 = yield self.object_store.create_object(
+            settings.ROOM_PARENT, name='Room 2', description='Far away.')
+        thing = yield self.object_store.create_object(
+            settings.THING_PARENT,
+            location_id=room2.id,
+            description='A thing.',
+            name='Thing')
+        admin = yield self.object_store.create_object(
+            'src.game.parents.base_objects.player.AdminPlayerObject',
+            location_id=room1.id,
+            name='Admin')
+
+        yield self.object_store.load_objects()
+        admin = self.object_store.get_object(admin.id)
+        thing = self.object_store.get_object(thing.id)
+        room1 = self.object_store.get_object(room1.id)
+
+        yield self.command_handler._hydrate_surroundings(admin, None)
+        self.assertEqual(room1.description, 'Close by.')
+        self.assertFalse(thing.is_hydrated)
+
+        # Examining it from afar hydrates it.
+        parsed_command = self.command_handler.parser.parse(
+            'examine #%d' % thing.id)
+        yield CmdExamine().func(admin, parsed_command)
+        self.assertEqual(thing.description, 'A thing.')
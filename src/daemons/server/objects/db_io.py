@@ -1,38 +1,44 @@
 """
 This module manages all I/O from the DB, and handles the population of the
-InMemoryObjectStore.
+InMemoryObjectStore. :py:class:`BaseDBManager` is the interface the store
+talks to, and :py:class:`DBManager` is the Postgres implementation of it.
 """
 
-from psycopg2.extras import Json
+import json
 
 from twisted.internet.defer import inlineCallbacks, returnValue
 
+import settings
 from src.daemons.server.objects.parent_loader.exceptions import InvalidParent
 from src.utils import logger
-from src.utils.db import txPGDictConnection, get_db_connection_kwargs
+from src.utils.db import KeyedLock, PreparedStatement, get_db_pool, \
+    get_select_columns, row_to_kwargs
 
 
-class DBManager(object):
+# Stands in for attributes that aren't set, since None is a valid value.
+_MISSING = object()
+
+
+class BaseDBManager(object):
     """
     This class serves as an abstraction layer between the ObjectStore
-    and the underlying database. It handles the loading of objects at
-    server start time, and all CRUD operations on the DB side. DBManager is
-    allowed to manipulate the self.store._objects dict.
+    and whatever it is persisted to. It handles the loading of objects at
+    server start time, and all CRUD operations on the storage side.
+    Sub-classes implement this for a particular storage engine, and are
+    picked by ``settings.DB_BACKEND``. Anything that touches storage
+    returns a Deferred.
     """
 
-    # TODO: Add created_by_id column.
-    # TODO: Add home_id column.
-    # TODO: Add flags column?
+    # If False, nothing written survives a restart.
+    IS_PERSISTENT = True
 
-    # This is the base SELECT statement we'll use in a few methods for
-    # retrieving one or all object rows. To retrieve a subset, tack on a
-    # WHERE clause by string concatenation.
-    BASE_OBJECT_SELECT = (
-        "SELECT id, name, parent, location_id,"
-        " originally_controlled_by_account_id, controlled_by_account_id,"
-        " description, internal_description, zone_id, aliases, destination_id, "
-        " attributes, created_time "
-        "FROM dott_objects"
+    # The columns that save_object() may write to. Objects keep track of which
+    # of these have changed, and only those are written.
+    OBJECT_COLUMNS = (
+        'name', 'parent', 'location_id', 'base_type',
+        'originally_controlled_by_account_id', 'controlled_by_account_id',
+        'description', 'zone_id', 'aliases', 'destination_id',
+        'internal_description', 'attributes',
     )
 
     def __init__(self, mud_service, parent_loader, db_mode):
@@ -43,52 +49,180 @@ class DBManager(object):
         """
 
         self._db_mode = db_mode
-        # This eventually contains a txpostgres Connection object, which is
-        # where we can query.
-        self._db = None
         self._parent_loader = parent_loader
         self._mud_service = mud_service
 
-    @inlineCallbacks
     def prepare_and_load(self):
         """
-        Gets a connection set up.
+        Gets the storage engine ready for use.
+
+        :rtype: Deferred
+        :returns: A Deferred that fires with True if there was nothing
+            stored yet, and the starter room needs to be created.
         """
 
-        # Instantiate the connection to Postgres.
-        self._db = txPGDictConnection()
-        conn_info = get_db_connection_kwargs(db_mode=self._db_mode)
-        yield self._db.connect(**conn_info)
+        raise NotImplementedError('Over-ride in sub-class.')
 
-    @inlineCallbacks
-    def load_objects_into_store(self, loader_func):
+    def load_objects_into_store(self, loader_func, skeleton=False):
         """
-        Loads all of the objects from the DB into RAM.
+        Loads all of the stored objects into RAM.
 
         :param function loader_func: The function to run on the instantiated
             BaseObject sub-classes.
+        :keyword bool skeleton: If True, leave out the descriptions and
+            attributes. The objects will need to be passed through
+            :py:meth:`hydrate_objects` later on.
+        :rtype: Deferred
         """
 
-        logger.info("Loading objects into store.")
+        raise NotImplementedError('Over-ride in sub-class.')
 
-        results = yield self._db.runQuery(self.BASE_OBJECT_SELECT)
+    def get_change_counter(self):
+        """
+        :rtype: Deferred
+        :returns: A Deferred that fires with a counter that goes up every
+            time a stored object changes.
+        """
 
-        for row in results:
-            # Given an object ID and a JSON str, load this object into the store.
-            loader_func(self.instantiate_object_from_row(row))
+        raise NotImplementedError('Over-ride in sub-class.')
+
+    def hydrate_objects(self, objects, bulk=False):
+        """
+        Loads the descriptions and attributes of skeleton-loaded objects.
+
+        :param list objects: The objects to hydrate.
+        :keyword bool bulk: If True, this is background work that nobody
+            is waiting on.
+        :rtype: Deferred
+        """
+
+        raise NotImplementedError('Over-ride in sub-class.')
+
+    def save_object(self, obj):
+        """
+        Saves an object. New objects are given an ID and stored in full.
+        For existing objects, only what has changed since the last load or
+        save needs to be written.
+
+        :param BaseObject obj: The object to save.
+        :rtype: Deferred
+        :returns: A Deferred that fires with the saved object.
+        """
+
+        raise NotImplementedError('Over-ride in sub-class.')
+
+    def save_objects(self, objects):
+        """
+        Saves a batch of existing objects. Either all of them are saved or
+        none are.
+
+        :param list objects: The objects to save. These must have IDs.
+        :rtype: Deferred
+        """
+
+        raise NotImplementedError('Over-ride in sub-class.')
+
+    def allocate_object_ids(self, count):
+        """
+        Reserves a run of new object IDs, so objects can reference each
+        other before any of them are stored.
+
+        :param int count: The number of IDs to reserve.
+        :rtype: Deferred
+        :returns: A Deferred that fires with a list of unused object IDs.
+        """
+
+        raise NotImplementedError('Over-ride in sub-class.')
+
+    def insert_objects(self, objects):
+        """
+        Stores a batch of new objects, which already have IDs from
+        :py:meth:`allocate_object_ids`. They may refer to each other.
+
+        :param list objects: The objects to insert.
+        :rtype: Deferred
+        """
+
+        raise NotImplementedError('Over-ride in sub-class.')
+
+    def destroy_object(self, obj):
+        """
+        :param BaseObject obj: The object to delete.
+        :rtype: Deferred
+        """
+
+        raise NotImplementedError('Over-ride in sub-class.')
+
+    def find_ids_by_attributes(self, criteria):
+        """
+        Finds stored objects whose attributes contain ``criteria``. Nested
+        values match if they're contained in the stored ones.
+
+        :param dict criteria: The attribute names and values to look for.
+        :rtype: Deferred
+        :returns: A Deferred that fires with the IDs of the matching
+            objects, in ascending order.
+        """
+
+        raise NotImplementedError('Over-ride in sub-class.')
+
+    def destroy_objects(self, obj_ids):
+        """
+        Deletes a batch of objects. Either all of them are deleted or none
+        are.
+
+        :param list obj_ids: The IDs of the objects to delete.
+        :rtype: Deferred
+        """
+
+        raise NotImplementedError('Over-ride in sub-class.')
 
-    def instantiate_object_from_row(self, row):
+    def is_controlled_by_account(self, obj_id):
+        """
+        :param int obj_id: The ID of the object to check.
+        :rtype: Deferred
+        :returns: A Deferred that fires with True if an account is currently
+            controlling the object.
+        """
+
+        raise NotImplementedError('Over-ride in sub-class.')
+
+    def unset_zones(self, obj_ids):
+        """
+        Un-sets the zone of a batch of objects.
+
+        :param list obj_ids: The IDs of the objects to un-zone.
+        :rtype: Deferred
+        """
+
+        raise NotImplementedError('Over-ride in sub-class.')
+
+    def reload_object(self, obj):
+        """
+        :param BaseObject obj: The object to re-load.
+        :rtype: Deferred
+        :returns: A Deferred that fires with a newly loaded copy of the
+            object, or None if it isn't stored.
+        """
+
+        raise NotImplementedError('Over-ride in sub-class.')
+
+    def instantiate_object(self, row, skeleton=False):
         """
         This loads the parent class, instantiates the object through the
         parent class (passing the values from the DB as constructor kwargs).
 
-        :param row: the txPG row representing this object.
+        :param dict row: The object's values, keyed by column name.
+        :keyword bool skeleton: If True, the descriptions and attributes
+            were left out.
         :rtype: BaseObject
         :returns: The newly loaded object.
         """
 
-        # psycopg2 handles the JSON adaptation.
-        row['attributes'] = row['attributes'] or {}
+        # Attributes come back decoded, unless we're loading the raw text
+        # for the object to decode later on.
+        if 'attributes' in row:
+            row['attributes'] = row['attributes'] or {}
 
         # Loads the parent class so we can instantiate the object.
         try:
@@ -105,79 +239,440 @@ class DBManager(object):
         # Instantiate the object, using the values from the DB as kwargs.
         return parent(
             self._mud_service,
+            hydrated=not skeleton,
             **row
         )
 
+    def _get_column_value(self, obj, column):
+        """
+        :param BaseObject obj: The object being saved.
+        :param str column: One of :py:attr:`OBJECT_COLUMNS`.
+        :returns: The query parameter to save the column's value with.
+        """
+
+        if column == 'attributes':
+            return obj.get_serialized_attributes()
+        return getattr(obj, column)
+
+
+class DBManager(BaseDBManager):
+    """
+    The Postgres storage engine, which is the default. All access goes
+    through the process's connection pools.
+    """
+
+    # TODO: Add created_by_id column.
+    # TODO: Add home_id column.
+    # TODO: Add flags column?
+
+    # This is the base SELECT statement we'll use in a few methods for
+    # retrieving one or all object rows. To retrieve a subset, tack on a
+    # WHERE clause by string concatenation.
+    BASE_OBJECT_SELECT = (
+        "SELECT id, name, parent, location_id,"
+        " originally_controlled_by_account_id, controlled_by_account_id,"
+        " description, internal_description, zone_id, aliases, destination_id, "
+        " attributes, created_time "
+        "FROM dott_objects"
+    )
+    # Same as above, but the attributes come back as the raw JSON text.
+    # Objects decode it the first time their attributes are accessed.
+    LAZY_OBJECT_SELECT = BASE_OBJECT_SELECT.replace(
+        " attributes,", " attributes::text AS raw_attributes,")
+    # Just enough to place objects in the world and route commands. The
+    # rest of each row is filled in later by hydrate_objects().
+    SKELETON_OBJECT_SELECT = (
+        "SELECT id, name, parent, location_id,"
+        " originally_controlled_by_account_id, controlled_by_account_id,"
+        " zone_id, aliases, destination_id, created_time "
+        "FROM dott_objects"
+    )
+    # Rows come back as tuples. These are the column names, in order.
+    SKELETON_COLUMNS = get_select_columns(SKELETON_OBJECT_SELECT)
+    # The columns that SKELETON_OBJECT_SELECT leaves out.
+    PAYLOAD_SELECT = (
+        "SELECT id, description, internal_description, attributes "
+        "FROM dott_objects WHERE id = ANY(%s)"
+    )
+    LAZY_PAYLOAD_SELECT = PAYLOAD_SELECT.replace(
+        " attributes ", " attributes::text AS raw_attributes ")
+
+    INSERT_OBJECT = PreparedStatement(
+        'dott_insert_object',
+        "INSERT INTO dott_objects (%s) VALUES (%s) RETURNING id" % (
+            ', '.join(BaseDBManager.OBJECT_COLUMNS),
+            ', '.join(['%s'] * len(BaseDBManager.OBJECT_COLUMNS)),
+        )
+    )
+
+    def __init__(self, mud_service, parent_loader, db_mode):
+        """
+        :param ParentLoader parent_loader: A reference to a ParentLoader instance.
+        :param MudService mud_service: A reference to the top-level MudService.
+        :param str db_mode: Either 'test' or 'production'.
+        """
+
+        super(DBManager, self).__init__(mud_service, parent_loader, db_mode)
+        # These eventually contain the process's interactive and bulk
+        # connection pools, which is where we can query.
+        self._db = None
+        self._bulk_db = None
+        # Keeps saves of the same object from overtaking each other on
+        # different pooled connections.
+        self._save_lock = KeyedLock()
+        if settings.LAZY_ATTRIBUTE_DECODING:
+            self._object_select = self.LAZY_OBJECT_SELECT
+            payload_select = self.LAZY_PAYLOAD_SELECT
+            statement_suffix = '_lazy'
+        else:
+            self._object_select = self.BASE_OBJECT_SELECT
+            payload_select = self.PAYLOAD_SELECT
+            statement_suffix = ''
+        self._object_columns = get_select_columns(self._object_select)
+        self._payload_columns = get_select_columns(payload_select)
+        # The hot queries are prepared once per connection, and executed
+        # by name from then on.
+        self._reload_statement = PreparedStatement(
+            'dott_select_object' + statement_suffix,
+            self._object_select + " WHERE id=%s")
+        self._payload_statement = PreparedStatement(
+            'dott_select_payload' + statement_suffix, payload_select)
+        # Partial UPDATE statements, keyed by the tuple of columns written.
+        self._update_statements = {}
+
+    @inlineCallbacks
+    def prepare_and_load(self):
+        """
+        Gets the connection pools set up.
+        """
+
+        self._db = yield get_db_pool(self._db_mode, 'interactive')
+        self._bulk_db = yield get_db_pool(self._db_mode, 'bulk')
+
+    @inlineCallbacks
+    def load_objects_into_store(self, loader_func, skeleton=False):
+        """
+        Loads all of the objects from the DB into RAM.
+
+        :param function loader_func: The function to run on the instantiated
+            BaseObject sub-classes.
+        :keyword bool skeleton: If True, leave out the descriptions and
+            attributes. The objects will need to be passed through
+            :py:meth:`hydrate_objects` later on.
+        """
+
+        logger.info("Loading objects into store.")
+
+        if skeleton:
+            query = self.SKELETON_OBJECT_SELECT
+        else:
+            query = self._object_select
+
+        num_loaded = yield self._bulk_db.runInteraction(
+            self._stream_objects, query, loader_func, skeleton)
+        logger.info("Loaded %d objects." % num_loaded)
+
+    @inlineCallbacks
+    def _stream_objects(self, cursor, query, loader_func, skeleton):
+        """
+        Runs ``query`` through a server-side cursor, instantiating objects a
+        batch at a time. Only one batch of rows is held in memory at once,
+        and the reactor gets to run while each batch is fetched. This needs
+        to run in a transaction, via ``runInteraction``.
+
+        :param Cursor cursor: The transaction's cursor.
+        :param str query: The object SELECT to run.
+        :param function loader_func: The function to run on the instantiated
+            BaseObject sub-classes.
+        :param bool skeleton: Whether ``query`` selects skeleton rows.
+        :rtype: int
+        :returns: The number of objects loaded.
+        """
+
+        yield cursor.execute("SELECT count(*) FROM dott_objects")
+        num_total = cursor.fetchone()[0]
+        yield cursor.execute(
+            "DECLARE dott_object_load NO SCROLL CURSOR FOR " + query)
+
+        fetch_query = "FETCH FORWARD %d FROM dott_object_load" % (
+            settings.OBJECT_LOAD_BATCH_SIZE)
+        num_loaded = 0
+        last_logged_percent = 0
+        while True:
+            yield cursor.execute(fetch_query)
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            for row in rows:
+                loader_func(self.instantiate_object_from_row(row, skeleton=skeleton))
+            num_loaded += len(rows)
+
+            # Log roughly every 10%, so big games aren't silent for ages.
+            percent = num_loaded * 100 / max(num_total, 1)
+            if percent - last_logged_percent >= 10:
+                logger.info("Loaded %d/%d objects (%d%%)." % (
+                    num_loaded, num_total, percent))
+                last_logged_percent = percent
+
+        yield cursor.execute("CLOSE dott_object_load")
+        returnValue(num_loaded)
+
+    @inlineCallbacks
+    def get_change_counter(self):
+        """
+        Every statement that changes ``dott_objects`` bumps a counter in
+        the DB. Comparing this to a previous value tells us whether
+        anything has changed in the meantime.
+
+        :rtype: int
+        :returns: The current value of the object change counter.
+        """
+
+        results = yield self._db.runQuery(
+            "SELECT last_value, is_called FROM dott_objects_change_seq")
+        last_value, is_called = results[0]
+        # A fresh sequence reports 1 for last_value, before it's been used.
+        returnValue(last_value if is_called else 0)
+
+    @inlineCallbacks
+    def hydrate_objects(self, objects, bulk=False):
+        """
+        Loads the descriptions and attributes of skeleton-loaded objects.
+
+        :param list objects: The objects to hydrate.
+        :keyword bool bulk: If True, use the bulk connection pool. This is
+            for background work that nobody is waiting on.
+        """
+
+        objects_by_id = dict((obj.id, obj) for obj in objects)
+        db = self._bulk_db if bulk else self._db
+        results = yield db.runPreparedQuery(
+            self._payload_statement, (objects_by_id.keys(),))
+
+        for row in results:
+            payload = row_to_kwargs(self._payload_columns, row)
+            obj = objects_by_id[payload.pop('id')]
+            obj.hydrate(**payload)
+
+    def instantiate_object_from_row(self, row, skeleton=False):
+        """
+        Instantiates an object from a tuple row, as returned by the object
+        SELECT this manager uses.
+
+        :param tuple row: The row representing this object.
+        :keyword bool skeleton: If True, this is a row from
+            :py:attr:`SKELETON_OBJECT_SELECT`.
+        :rtype: BaseObject
+        :returns: The newly loaded object.
+        """
+
+        columns = self.SKELETON_COLUMNS if skeleton else self._object_columns
+        return self.instantiate_object(
+            row_to_kwargs(columns, row), skeleton=skeleton)
+
+    def _get_update_statement(self, obj, dirty_fields):
+        """
+        Gets an UPDATE that only writes the columns that have changed. If
+        only some attributes were changed through
+        :py:meth:`BaseObject.set_attribute` or
+        :py:meth:`BaseObject.delete_attribute`, just those keys are patched
+        with ``jsonb_set`` and ``-``. There is one prepared statement per
+        combination of columns and attribute changes, though only a handful
+        of combinations come up in practice.
+
+        :param BaseObject obj: The object being saved.
+        :param set dirty_fields: The names of the columns to write, plus
+            ``('attributes', attr_name)`` tuples.
+        :rtype: tuple
+        :returns: A ``(PreparedStatement, params)`` tuple.
+        """
+
+        columns = tuple(column for column in self.OBJECT_COLUMNS
+                        if column in dirty_fields)
+        params = [self._get_column_value(obj, column) for column in columns]
+
+        # 's' for each attribute that is set, 'd' for each that is deleted.
+        attribute_ops = ''
+        if 'attributes' not in dirty_fields:
+            attr_names = sorted(
+                field[1] for field in dirty_fields if isinstance(field, tuple))
+            for attr_name in attr_names:
+                value = obj.get_attribute(attr_name, _MISSING)
+                if value is _MISSING:
+                    attribute_ops += 'd'
+                    params.append(attr_name)
+                else:
+                    attribute_ops += 's'
+                    params.extend([[attr_name], json.dumps(value)])
+        params.append(obj.id)
+
+        statement = self._update_statements.get((columns, attribute_ops))
+        if statement is None:
+            assignments = ['%s=%%s' % column for column in columns]
+            if attribute_ops:
+                expression = "COALESCE(attributes, '{}')"
+                for op in attribute_ops:
+                    if op == 's':
+                        expression = "jsonb_set(%s, %%s::text[], %%s::jsonb)" % (
+                            expression)
+                    else:
+                        expression = "(%s - %%s::text)" % expression
+                assignments.append('attributes=%s' % expression)
+
+            # Named after a bitmask of the columns, in OBJECT_COLUMNS order.
+            column_mask = sum(
+                1 << i for i, column in enumerate(self.OBJECT_COLUMNS)
+                if column in columns)
+            name = 'dott_update_object_%x' % column_mask
+            if attribute_ops:
+                name += '_' + attribute_ops
+            statement = PreparedStatement(
+                name,
+                "UPDATE dott_objects SET %s WHERE id=%%s" % ', '.join(
+                    assignments))
+            self._update_statements[(columns, attribute_ops)] = statement
+
+        return statement, params
+
     @inlineCallbacks
     def save_object(self, obj):
         """
-        Saves an object to the DB. The ``attributes`` attribute on each object is
-        the raw dict that gets saved to and loaded from the DB entry.
+        Saves an object to the DB. New objects are inserted in full. For
+        existing objects, only the columns that have changed since the last
+        load or save are written, and nothing is done if none have.
+
+        :param BaseObject obj: The object to save to the DB.
+        """
+
+        if obj.id is None:
+            yield self._save_object(obj)
+        else:
+            yield self._save_lock.run(obj.id, self._save_object, obj)
+        returnValue(obj)
+
+    @inlineCallbacks
+    def _save_object(self, obj):
+        """
+        Does the work for :py:meth:`save_object`.
 
         :param BaseObject obj: The object to save to the DB.
         """
 
-        attributes = obj.attributes
+        dirty_fields = obj.pop_dirty_fields()
+        try:
+            yield self._write_object(obj, dirty_fields)
+        except Exception:
+            # Nothing was written, so these still need to be.
+            obj.mark_dirty(*dirty_fields)
+            raise
+
+    @inlineCallbacks
+    def _write_object(self, obj, dirty_fields):
+        """
+        Writes out an object's changed columns, or inserts it if it's new.
+
+        :param BaseObject obj: The object to save to the DB.
+        :param set dirty_fields: The names of the columns that have changed.
+        """
 
         if not obj.id:
-            result = yield self._db.runQuery(
-                "INSERT INTO dott_objects"
-                "  (name, parent, location_id, base_type, "
-                "   originally_controlled_by_account_id, "
-                "   controlled_by_account_id, description, zone_id, "
-                "   aliases, destination_id, internal_description, attributes) "
-                "  VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) "
-                " RETURNING id",
-                (
-                    obj.name,
-                    obj.parent,
-                    obj.location_id,
-                    obj.base_type,
-                    obj.originally_controlled_by_account_id,
-                    obj.controlled_by_account_id,
-                    obj.description,
-                    obj.zone_id,
-                    obj.aliases,
-                    obj.destination_id,
-                    obj.internal_description,
-                    Json(attributes),
-                )
+            result = yield self._db.runPreparedQuery(
+                self.INSERT_OBJECT,
+                [self._get_column_value(obj, column)
+                 for column in self.OBJECT_COLUMNS]
             )
             inserted_id = result[0][0]
             obj.id = inserted_id
-        else:
-            yield self._db.runOperation(
-                "UPDATE dott_objects SET "
-                "  name=%s,"
-                "  parent=%s,"
-                "  location_id=%s,"
-                "  base_type=%s,"
-                "  originally_controlled_by_account_id=%s,"
-                "  controlled_by_account_id=%s,"
-                "  description=%s,"
-                "  zone_id=%s,"
-                "  aliases=%s,"
-                "  destination_id=%s,"
-                "  internal_description=%s,"
-                "  attributes=%s "
-                " WHERE ID=%s",
-                (
-                    obj.name,
-                    obj.parent,
-                    obj.location_id,
-                    obj.base_type,
-                    obj.originally_controlled_by_account_id,
-                    obj.controlled_by_account_id,
-                    obj.description,
-                    obj.zone_id,
-                    obj.aliases,
-                    obj.destination_id,
-                    obj.internal_description,
-                    Json(attributes),
-                    obj.id
-                )
+        elif dirty_fields:
+            statement, params = self._get_update_statement(obj, dirty_fields)
+            yield self._db.runPreparedOperation(statement, params)
+
+    @inlineCallbacks
+    def save_objects(self, objects):
+        """
+        Saves a batch of existing objects to the DB in a single round trip.
+        Postgres runs the statements in one implicit transaction, so either
+        all of them are saved or none are. As with :py:meth:`save_object`,
+        only changed columns are written.
+
+        :param list objects: The objects to save. These must have already
+            been inserted, and so have IDs.
+        """
+
+        executions = []
+        popped = []
+        for obj in objects:
+            dirty_fields = obj.pop_dirty_fields()
+            if not dirty_fields:
+                continue
+            popped.append((obj, dirty_fields))
+            executions.append(self._get_update_statement(obj, dirty_fields))
+
+        if not executions:
+            return
+
+        try:
+            yield self._bulk_db.runPreparedOperations(executions)
+        except Exception:
+            for obj, dirty_fields in popped:
+                obj.mark_dirty(*dirty_fields)
+            raise
+
+    @inlineCallbacks
+    def allocate_object_ids(self, count):
+        """
+        Reserves a run of new object IDs in a single round trip, so objects
+        can reference each other before any of them are inserted.
+
+        :param int count: The number of IDs to reserve.
+        :rtype: list
+        :returns: A list of ``count`` unused object IDs.
+        """
+
+        if not count:
+            returnValue([])
+
+        results = yield self._bulk_db.runQuery(
+            "SELECT nextval('dott_objects_id_seq')"
+            "  FROM generate_series(1, %s)",
+            (count,)
+        )
+        # nextval() returns a bigint, which comes back as a long.
+        returnValue([int(row[0]) for row in results])
+
+    @inlineCallbacks
+    def insert_objects(self, objects):
+        """
+        Inserts a batch of new objects with a single multi-row INSERT. The
+        objects must already have IDs from :py:meth:`allocate_object_ids`.
+        Since foreign keys are checked at the end of the statement, objects
+        may refer to others in the same batch, in any order.
+
+        :param list objects: The objects to insert.
+        """
+
+        if not objects:
+            return
+
+        columns = ('id',) + self.OBJECT_COLUMNS
+        row_placeholder = '(%s)' % ', '.join(['%s'] * len(columns))
+        query = "INSERT INTO dott_objects (%s) VALUES %s" % (
+            ', '.join(columns),
+            ', '.join([row_placeholder] * len(objects)),
+        )
+        params = []
+        for obj in objects:
+            params.append(obj.id)
+            params.extend(
+                self._get_column_value(obj, column)
+                for column in self.OBJECT_COLUMNS
             )
-        returnValue(obj)
+
+        yield self._bulk_db.runOperation(query, params)
+        # Everything was just written out in full.
+        for obj in objects:
+            obj.pop_dirty_fields()
 
     @inlineCallbacks
     def destroy_object(self, obj):
@@ -191,6 +686,72 @@ class DBManager(object):
             "DELETE FROM dott_objects WHERE id=%s", (obj.id,)
         )
 
+    @inlineCallbacks
+    def find_ids_by_attributes(self, criteria):
+        """
+        Finds objects whose attributes contain ``criteria``, using jsonb
+        containment (``@>``), which is backed by a GIN index. This runs in
+        the DB, so doesn't need any of the objects to be hydrated. Nested
+        values match if they're contained in the stored ones, so
+        ``{'DOCKABLE_IDS': [42]}`` finds every object whose DOCKABLE_IDS
+        list includes 42.
+
+        .. note:: This only sees what has been saved.
+
+        :param dict criteria: The attribute names and values to look for.
+        :rtype: list
+        :returns: The IDs of the matching objects, in ascending order.
+        """
+
+        results = yield self._bulk_db.runQuery(
+            "SELECT id FROM dott_objects WHERE attributes @> %s ORDER BY id",
+            (json.dumps(criteria),)
+        )
+        returnValue([row[0] for row in results])
+
+    @inlineCallbacks
+    def destroy_objects(self, obj_ids):
+        """
+        Deletes a batch of objects from the DB with a single statement, so
+        either all of them are deleted or none are. Objects may refer to
+        each other, as long as nothing outside the batch refers to them.
+
+        :param list obj_ids: The IDs of the objects to delete.
+        """
+
+        yield self._bulk_db.runOperation(
+            "DELETE FROM dott_objects WHERE id = ANY(%s)", (list(obj_ids),)
+        )
+
+    @inlineCallbacks
+    def is_controlled_by_account(self, obj_id):
+        """
+        :param int obj_id: The ID of the object to check.
+        :rtype: bool
+        :returns: True if an account's currently_controlling_id refers to
+            the object.
+        """
+
+        results = yield self._db.runQuery(
+            "SELECT 1 FROM dott_accounts WHERE currently_controlling_id=%s"
+            "  LIMIT 1",
+            (obj_id,)
+        )
+        returnValue(bool(results))
+
+    @inlineCallbacks
+    def unset_zones(self, obj_ids):
+        """
+        Un-sets the zone of a batch of objects with a single statement.
+
+        :param list obj_ids: The IDs of the objects to un-zone.
+        """
+
+        yield self._bulk_db.runOperation(
+            "UPDATE dott_objects SET zone_id = NULL WHERE id = ANY(%s)",
+            (list(obj_ids),)
+        )
+
     @inlineCallbacks
     def reload_object(self, obj):
         """
@@ -201,10 +762,8 @@ class DBManager(object):
         :returns: The newly re-loaded object.
         """
 
-        modified_query = "{base_query} WHERE id=%s".format(
-            base_query=self.BASE_OBJECT_SELECT
-        )
-        results = yield self._db.runQuery(modified_query, (obj.id,))
+        results = yield self._db.runPreparedQuery(
+            self._reload_statement, (obj.id,))
 
         for row in results:
             returnValue(self.instantiate_object_from_row(row))
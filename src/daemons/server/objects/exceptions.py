@@ -20,4 +20,13 @@ class ObjectHasZoneMembers(BaseException):
     cause zone members to start freaking out.
     """
 
-    pass
\ No newline at end of file
+    pass
+
+
+class ObjectIsReferenced(BaseException):
+    """
+    Raised when an object being deleted is still referred to by another
+    object or an account, such as by being its location.
+    """
+
+    pass
@@ -0,0 +1,171 @@
+"""
+In-memory secondary indexes for the object store. These let the
+:py:class:`ObjectStore` answer questions like "what is inside of this
+object?" without walking every object in the game.
+"""
+
+
+def get_trigrams(text):
+    """
+    Breaks a string up into the set of three-character sequences found in
+    each of its words. Words are padded with a space on either end, so that
+    short words still produce trigrams, and word boundaries count for
+    something when comparing two strings.
+
+    :param str text: The string to break up. This should already have
+        been normalized (lower-cased, punctuation stripped).
+    :rtype: set
+    :returns: A set of three-character strings.
+    """
+
+    trigrams = set()
+    for word in text.split():
+        padded = ' %s ' % word
+        for i in range(len(padded) - 2):
+            trigrams.add(padded[i:i + 3])
+    return trigrams
+
+
+class ObjectIndex(object):
+    """
+    Maps a key (calculated from an object by a key function) to the set of
+    IDs of all objects that currently have that key. The key each object was
+    last filed under is remembered, so an object can be re-indexed after its
+    values change without the caller knowing what they used to be.
+
+    .. note:: Indexes only store object IDs. Resolving the IDs back to
+        object instances is up to the object store.
+    """
+
+    def __init__(self, key_func):
+        """
+        :param function key_func: Given a ``BaseObject`` sub-class instance,
+            return the key to file the object under. If this returns ``None``,
+            the object is left out of the index.
+        """
+
+        self._key_func = key_func
+        # Keys are index keys, values are sets of object IDs.
+        self._members = {}
+        # Keys are object IDs, values are the index key they're filed under.
+        self._keys_by_id = {}
+
+    def __contains__(self, key):
+        return key in self._members
+
+    def update(self, obj):
+        """
+        Files (or re-files) an object under its current key.
+
+        :param BaseObject obj: The object to index.
+        """
+
+        new_key = self._key_func(obj)
+        old_key = self._keys_by_id.get(obj.id)
+        if new_key == old_key and obj.id in self._keys_by_id:
+            # Nothing changed, nothing to do.
+            return
+
+        self.remove_id(obj.id)
+        if new_key is None:
+            return
+
+        self._members.setdefault(new_key, set()).add(obj.id)
+        self._keys_by_id[obj.id] = new_key
+
+    def remove_id(self, obj_id):
+        """
+        Drops an object ID from the index.
+
+        :param int obj_id: The ID of the object to remove.
+        """
+
+        try:
+            old_key = self._keys_by_id.pop(obj_id)
+        except KeyError:
+            # Wasn't indexed to begin with.
+            return
+
+        members = self._members[old_key]
+        members.discard(obj_id)
+        if not members:
+            # Don't let empty sets pile up for every key ever used.
+            del self._members[old_key]
+
+    def get(self, key):
+        """
+        :param key: The index key to look up.
+        :rtype: set
+        :returns: A copy of the set of object IDs filed under ``key``. This
+            is safe to hang on to while objects are being created or
+            destroyed.
+        """
+
+        return set(self._members.get(key, ()))
+
+    def get_live(self, key):
+        """
+        Like :py:meth:`get`, but returns the index's own set instead of a
+        copy. Use this when intersecting large sets, and never modify or
+        hold on to the return value.
+
+        :param key: The index key to look up.
+        :rtype: set or frozenset
+        :returns: The set of object IDs filed under ``key``.
+        """
+
+        return self._members.get(key, frozenset())
+
+    def clear(self):
+        """
+        Empties the index out completely.
+        """
+
+        self._members = {}
+        self._keys_by_id = {}
+
+
+class MultiKeyObjectIndex(ObjectIndex):
+    """
+    An :py:class:`ObjectIndex` whose key function returns an iterable of
+    keys, filing each object under every one of them. For example, an object
+    can be filed under each class in its inheritance chain.
+    """
+
+    def update(self, obj):
+        """
+        Files (or re-files) an object under its current keys.
+
+        :param BaseObject obj: The object to index.
+        """
+
+        new_keys = frozenset(self._key_func(obj) or ())
+        old_keys = self._keys_by_id.get(obj.id, frozenset())
+        if new_keys == old_keys:
+            return
+
+        for key in old_keys - new_keys:
+            members = self._members[key]
+            members.discard(obj.id)
+            if not members:
+                del self._members[key]
+        for key in new_keys - old_keys:
+            self._members.setdefault(key, set()).add(obj.id)
+
+        if new_keys:
+            self._keys_by_id[obj.id] = new_keys
+        else:
+            self._keys_by_id.pop(obj.id, None)
+
+    def remove_id(self, obj_id):
+        """
+        Drops an object ID from the index.
+
+        :param int obj_id: The ID of the object to remove.
+        """
+
+        for key in self._keys_by_id.pop(obj_id, ()):
+            members = self._members[key]
+            members.discard(obj_id)
+            if not members:
+                del self._members[key]
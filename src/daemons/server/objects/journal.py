@@ -0,0 +1,353 @@
+"""
+A local, append-only journal of object saves and destroys. In write-behind
+mode, the store appends a record of each of these before it returns, and the actual DB writes happen on the next flush. Once a flush
+succeeds, the records it covered are dropped. Anything still in the journal
+on start-up didn't make it into the DB, and is replayed.
+
+Appends are fsynced in groups. The first append after a sync schedules the
+next one, and every append in between waits on it. So a save costs a local
+write and a share of one fsync, rather than a round trip to the DB. The
+writes and fsyncs happen in a thread, so they don't hold up the reactor.
+
+Each record is a pickled ``(op, obj_id, values)`` tuple, framed by its
+length and a CRC, so a record that was only partly written when the process
+died can be told apart from a good one.
+"""
+
+import cPickle
+import os
+import struct
+import time
+import zlib
+
+from twisted.internet import reactor
+from twisted.internet.defer import Deferred, DeferredLock, \
+    inlineCallbacks, succeed
+from twisted.internet.threads import deferToThread
+
+from src.utils import logger
+
+# Payload length, CRC32 of the payload.
+RECORD_HEADER_FORMAT = '>II'
+RECORD_HEADER_SIZE = struct.calcsize(RECORD_HEADER_FORMAT)
+
+# Record ops.
+SAVE = 's'
+DESTROY = 'd'
+
+# Everything that is recorded for a save, besides the attributes.
+# These are the constructor kwargs the object is re-instantiated with.
+RECORD_FIELDS = (
+    'name', 'parent', 'location_id', 'originally_controlled_by_account_id',
+    'controlled_by_account_id', 'description', 'internal_description',
+    'zone_id', 'aliases', 'destination_id',
+)
+
+
+def get_object_values(obj):
+    """
+    :param BaseObject obj: A fully hydrated object.
+    :rtype: tuple
+    :returns: The values of :py:data:`RECORD_FIELDS`, followed by the
+        attributes as JSON text.
+    """
+
+    values = [getattr(obj, field) for field in RECORD_FIELDS]
+    values.append(obj.get_serialized_attributes())
+    return tuple(values)
+
+
+def get_object_kwargs(obj_id, values):
+    """
+    The reverse of :py:func:`get_object_values`. The keys match the column
+    names of the rows from :py:class:`BaseDBManager`, so they can be fed
+    through the same instantiation code.
+
+    :param int obj_id: The object's ID.
+    :param tuple values: As returned by :py:func:`get_object_values`.
+    :rtype: dict
+    """
+
+    kwargs = dict(zip(RECORD_FIELDS, values))
+    kwargs['id'] = obj_id
+    kwargs['raw_attributes'] = values[-1]
+    return kwargs
+
+
+def read_records(path):
+    """
+    Reads every intact record out of a journal. Reading stops at the first
+    record that was cut short or doesn't match its CRC, since nothing after
+    it can be trusted.
+
+    :param str path: The journal file to read.
+    :rtype: list
+    :returns: A list of ``(op, obj_id, values)`` tuples, oldest first.
+        ``values`` is ``None`` for destroys.
+    """
+
+    try:
+        with open(path, 'rb') as journal_file:
+            data = journal_file.read()
+    except IOError:
+        return []
+
+    records = []
+    offset = 0
+    while offset < len(data):
+        header = data[offset:offset + RECORD_HEADER_SIZE]
+        if len(header) < RECORD_HEADER_SIZE:
+            break
+        length, crc = struct.unpack(RECORD_HEADER_FORMAT, header)
+        start = offset + RECORD_HEADER_SIZE
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload) & 0xffffffff != crc:
+            break
+        records.append(cPickle.loads(payload))
+        offset = start + length
+
+    if offset < len(data):
+        logger.warning(
+            "Ignoring %d bytes of incomplete records at the end of the "
+            "object journal: %s" % (len(data) - offset, path))
+    return records
+
+
+class MutationJournal(object):
+    """
+    Appends records to the journal file, and fsyncs them in groups. The
+    :py:class:`ObjectStore` decides what is recorded, and when records can
+    be dropped.
+    """
+
+    def __init__(self, path, sync_delay):
+        """
+        :param str path: Where to keep the journal.
+        :param float sync_delay: How long to wait after an append before
+            fsyncing, to give others a chance to join in, in seconds.
+        """
+
+        self.path = path
+        self._sync_delay = sync_delay
+        self._file = None
+        # Bytes in the journal, including appends that aren't synced yet.
+        self.size = 0
+        # Framed records that haven't been written to the file yet.
+        self._unwritten = []
+        # Deferreds waiting on the next fsync.
+        self._sync_waiters = []
+        self._sync_call = None
+        # The file is only touched by one thread at a time, under this lock.
+        self._file_lock = DeferredLock()
+        self.appends = 0
+        self.syncs = 0
+        # Wall clock times, in seconds.
+        self.max_sync_time = 0.0
+        self.total_sync_time = 0.0
+
+    def __len__(self):
+        return self.size
+
+    def open(self):
+        """
+        Opens the journal for appending, creating it if need be.
+        """
+
+        self._file = open(self.path, 'ab')
+        self.size = os.path.getsize(self.path)
+
+    @inlineCallbacks
+    def close(self):
+        """
+        Syncs anything that is waiting, and closes the journal.
+
+        :rtype: Deferred
+        """
+
+        if self._file is None:
+            return
+        yield self.sync()
+        self._file.close()
+        self._file = None
+
+    def read_records(self):
+        """
+        :rtype: list
+        :returns: Every intact record in the journal, as with
+            :py:func:`read_records`.
+        """
+
+        return read_records(self.path)
+
+    def append_save(self, obj):
+        """
+        :param BaseObject obj: A fully hydrated object that was saved.
+        :rtype: Deferred
+        :returns: A Deferred that fires once the record is synced.
+        """
+
+        return self._append((SAVE, obj.id, get_object_values(obj)))
+
+    def append_destroy(self, obj_id):
+        """
+        :param int obj_id: The ID of a destroyed object.
+        :rtype: Deferred
+        :returns: A Deferred that fires once the record is synced.
+        """
+
+        return self._append((DESTROY, obj_id, None))
+
+    def _append(self, record):
+        """
+        Buffers a record, to be written by the next group sync.
+
+        :param tuple record: An ``(op, obj_id, values)`` tuple.
+        :rtype: Deferred
+        """
+
+        payload = cPickle.dumps(record, cPickle.HIGHEST_PROTOCOL)
+        self._unwritten.append(struct.pack(
+            RECORD_HEADER_FORMAT, len(payload), zlib.crc32(payload) & 0xffffffff))
+        self._unwritten.append(payload)
+        self.size += RECORD_HEADER_SIZE + len(payload)
+        self.appends += 1
+
+        waiter = Deferred()
+        self._sync_waiters.append(waiter)
+        if self._sync_call is None:
+            self._sync_call = reactor.callLater(
+                self._sync_delay, self._scheduled_sync)
+        return waiter
+
+    def _scheduled_sync(self):
+        """
+        Runs the group sync. Any failure has already been handed to the
+        appends that were waiting on it.
+        """
+
+        self.sync().addErrback(lambda failure: None)
+
+    def sync(self):
+        """
+        Writes and fsyncs everything appended so far, then lets the appends
+        that were waiting on it return. If this fails, so do they.
+
+        :rtype: Deferred
+        :returns: A Deferred that fires once the sync is done.
+        """
+
+        if self._sync_call is not None:
+            if self._sync_call.active():
+                self._sync_call.cancel()
+            self._sync_call = None
+
+        waiters = self._sync_waiters
+        self._sync_waiters = []
+        if not waiters:
+            # Wait for any sync that is already running.
+            return self._file_lock.run(succeed, None)
+
+        data = ''.join(self._unwritten)
+        self._unwritten = []
+        start_time = time.time()
+
+        def on_synced(_):
+            sync_time = time.time() - start_time
+            self.syncs += 1
+            self.max_sync_time = max(self.max_sync_time, sync_time)
+            self.total_sync_time += sync_time
+            for waiter in waiters:
+                waiter.callback(None)
+
+        def on_failed(failure):
+            logger.error("Syncing the object journal failed: %s" %
+                         failure.getErrorMessage())
+            for waiter in waiters:
+                waiter.errback(failure)
+            return failure
+
+        d = self._file_lock.run(deferToThread, self._write_and_sync, data)
+        d.addCallbacks(on_synced, on_failed)
+        return d
+
+    def _write_and_sync(self, data):
+        """
+        Runs in a thread. Writes records out to the journal, and fsyncs it.
+
+        :param str data: The framed records to write.
+        """
+
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    @inlineCallbacks
+    def truncate_to(self, position):
+        """
+        Drops every record before ``position``, which should be a value
+        :py:attr:`size` had earlier. Records appended since are moved to the
+        front of the journal. This is done by writing a new file and moving
+        it into place, so a crash part of the way through leaves either the
+        old journal or the new one.
+
+        :param int position: The size of the journal when the oldest record
+            that should be kept was appended.
+        :rtype: Deferred
+        """
+
+        # Everything before position needs to be in the file. Anything
+        # appended from here on stays in memory until the next sync.
+        yield self.sync()
+        if not position:
+            return
+        yield self._file_lock.run(deferToThread, self._rewrite_from, position)
+        self.size -= position
+
+    def _rewrite_from(self, position):
+        """
+        Runs in a thread. Does the work for :py:meth:`truncate_to`.
+
+        :param int position: The offset of the first byte to keep.
+        """
+
+        with open(self.path, 'rb') as journal_file:
+            journal_file.seek(position)
+            remaining = journal_file.read()
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as tmp_file:
+            tmp_file.write(remaining)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        self._file.close()
+        os.rename(tmp_path, self.path)
+        # Make sure the rename itself is durable.
+        dir_fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        self._file = open(self.path, 'ab')
+
+    def get_stats(self):
+        """
+        :rtype: dict
+        :returns: The journal's size in bytes, plus append, sync, and sync
+            latency figures since start-up.
+        """
+
+        if self.syncs:
+            avg_sync_time = self.total_sync_time / self.syncs
+            avg_group_size = float(self.appends) / self.syncs
+        else:
+            avg_sync_time = 0.0
+            avg_group_size = 0.0
+
+        return {
+            'size': self.size,
+            'appends': self.appends,
+            'syncs': self.syncs,
+            'avg_group_size': avg_group_size,
+            'max_sync_time': self.max_sync_time,
+            'avg_sync_time': avg_sync_time,
+        }
@@ -0,0 +1,320 @@
+"""
+An in-process storage engine for the ObjectStore, which keeps everything in
+plain dicts. Nothing survives a restart, so this is meant for tests,
+benchmarks, and load tests, where it takes the DB out of the picture.
+"""
+
+import datetime
+import json
+
+from twisted.internet.defer import succeed
+
+import settings
+from src.daemons.server.objects.db_io import BaseDBManager, _MISSING
+from src.utils import logger
+
+
+def _json_contains(stored, criteria):
+    """
+    Works like jsonb's ``@>`` operator, so :py:meth:`find_ids_by_attributes`
+    matches the same objects under either engine.
+
+    :param stored: A decoded JSON value.
+    :param criteria: The decoded JSON value to look for in ``stored``.
+    :rtype: bool
+    """
+
+    if isinstance(criteria, dict):
+        if not isinstance(stored, dict):
+            return False
+        for key, value in criteria.items():
+            if key not in stored or not _json_contains(stored[key], value):
+                return False
+        return True
+    if isinstance(criteria, list):
+        if not isinstance(stored, list):
+            return False
+        for value in criteria:
+            if not any(_json_contains(item, value) for item in stored):
+                return False
+        return True
+    return stored == criteria
+
+
+class MemoryDBManager(BaseDBManager):
+    """
+    Stores each object as a dict of its column values, keyed by ID.
+    Attributes are kept as JSON text, like they are in the DB, so objects
+    never share state with what's stored. Foreign keys aren't enforced.
+    """
+
+    IS_PERSISTENT = False
+
+    # The columns that skeleton loads leave out.
+    PAYLOAD_COLUMNS = ('description', 'internal_description', 'attributes')
+
+    def __init__(self, mud_service, parent_loader, db_mode):
+        """
+        :param ParentLoader parent_loader: A reference to a ParentLoader instance.
+        :param MudService mud_service: A reference to the top-level MudService.
+        :param str db_mode: Either 'test' or 'production'.
+        """
+
+        super(MemoryDBManager, self).__init__(mud_service, parent_loader, db_mode)
+        # Keys are object IDs, values are dicts of column values.
+        self._rows = {}
+        self._last_id = 0
+        # Bumped on every write, like the DB's change sequence.
+        self._change_counter = 0
+
+    def prepare_and_load(self):
+        """
+        Nothing to set up. Outside of tests, this always starts out empty,
+        so the starter room is needed.
+        """
+
+        return succeed(self._db_mode == 'production' and not self._rows)
+
+    def load_objects_into_store(self, loader_func, skeleton=False):
+        """
+        Instantiates every stored object, in ID order.
+
+        :param function loader_func: The function to run on the instantiated
+            BaseObject sub-classes.
+        :keyword bool skeleton: If True, leave out the descriptions and
+            attributes.
+        """
+
+        logger.info("Loading objects into store.")
+        for obj_id in sorted(self._rows):
+            loader_func(self._instantiate_stored_object(obj_id, skeleton))
+        logger.info("Loaded %d objects." % len(self._rows))
+        return succeed(None)
+
+    def get_change_counter(self):
+        """
+        :rtype: int
+        :returns: The number of writes so far.
+        """
+
+        return succeed(self._change_counter)
+
+    def hydrate_objects(self, objects, bulk=False):
+        """
+        Fills in the descriptions and attributes of skeleton-loaded objects.
+
+        :param list objects: The objects to hydrate.
+        :keyword bool bulk: Ignored, there's no contention to avoid.
+        """
+
+        for obj in objects:
+            row = self._rows.get(obj.id)
+            if row is not None:
+                obj.hydrate(**self._get_payload_kwargs(row))
+        return succeed(None)
+
+    def save_object(self, obj):
+        """
+        Stores an object. New objects are given an ID.
+
+        :param BaseObject obj: The object to save.
+        """
+
+        dirty_fields = obj.pop_dirty_fields()
+        if not obj.id:
+            self._last_id += 1
+            obj.id = self._last_id
+            self._insert_row(obj)
+        elif dirty_fields:
+            self._update_row(obj, dirty_fields)
+        return succeed(obj)
+
+    def save_objects(self, objects):
+        """
+        :param list objects: The objects to save. These must have IDs.
+        """
+
+        for obj in objects:
+            dirty_fields = obj.pop_dirty_fields()
+            if dirty_fields:
+                self._update_row(obj, dirty_fields)
+        return succeed(None)
+
+    def allocate_object_ids(self, count):
+        """
+        :param int count: The number of IDs to reserve.
+        :rtype: list
+        :returns: A list of ``count`` unused object IDs.
+        """
+
+        obj_ids = range(self._last_id + 1, self._last_id + count + 1)
+        self._last_id += count
+        return succeed(obj_ids)
+
+    def insert_objects(self, objects):
+        """
+        :param list objects: The objects to insert, which already have IDs.
+        """
+
+        for obj in objects:
+            self._insert_row(obj)
+            obj.pop_dirty_fields()
+        return succeed(None)
+
+    def destroy_object(self, obj):
+        """
+        :param BaseObject obj: The object to delete.
+        """
+
+        return self.destroy_objects([obj.id])
+
+    def find_ids_by_attributes(self, criteria):
+        """
+        Finds objects whose stored attributes contain ``criteria``. This
+        has to decode every object's attributes, unlike the DB, which has
+        an index for it.
+
+        :param dict criteria: The attribute names and values to look for.
+        :rtype: list
+        :returns: The IDs of the matching objects, in ascending order.
+        """
+
+        return succeed([
+            obj_id for obj_id in sorted(self._rows)
+            if _json_contains(
+                json.loads(self._rows[obj_id]['attributes'] or '{}'), criteria)
+        ])
+
+    def destroy_objects(self, obj_ids):
+        """
+        :param list obj_ids: The IDs of the objects to delete.
+        """
+
+        for obj_id in obj_ids:
+            self._rows.pop(obj_id, None)
+        self._change_counter += 1
+        return succeed(None)
+
+    def is_controlled_by_account(self, obj_id):
+        """
+        Accounts are kept by a separate store, which this one can't see, so
+        this is always False.
+
+        :param int obj_id: The ID of the object to check.
+        """
+
+        return succeed(False)
+
+    def unset_zones(self, obj_ids):
+        """
+        :param list obj_ids: The IDs of the objects to un-zone.
+        """
+
+        for obj_id in obj_ids:
+            if obj_id in self._rows:
+                self._rows[obj_id]['zone_id'] = None
+        self._change_counter += 1
+        return succeed(None)
+
+    def reload_object(self, obj):
+        """
+        :param BaseObject obj: The object to re-load.
+        :rtype: BaseObject or None
+        :returns: A newly loaded copy of the object.
+        """
+
+        if obj.id not in self._rows:
+            return succeed(None)
+        return succeed(self._instantiate_stored_object(obj.id))
+
+    def _get_stored_value(self, obj, column):
+        """
+        :param BaseObject obj: The object being saved.
+        :param str column: One of :py:attr:`OBJECT_COLUMNS`.
+        :returns: The value to store, copied if it's mutable.
+        """
+
+        value = self._get_column_value(obj, column)
+        if isinstance(value, list):
+            return list(value)
+        return value
+
+    def _insert_row(self, obj):
+        """
+        :param BaseObject obj: The object to store in full.
+        """
+
+        row = dict(
+            (column, self._get_stored_value(obj, column))
+            for column in self.OBJECT_COLUMNS
+        )
+        row['id'] = obj.id
+        row['created_time'] = datetime.datetime.utcnow()
+        self._rows[obj.id] = row
+        self._change_counter += 1
+
+    def _update_row(self, obj, dirty_fields):
+        """
+        Writes out an object's changed columns. Individually changed
+        attributes are patched into the stored ones, same as the DB does.
+
+        :param BaseObject obj: The object being saved.
+        :param set dirty_fields: The names of the columns that have changed,
+            plus ``('attributes', attr_name)`` tuples.
+        """
+
+        row = self._rows.get(obj.id)
+        if row is None:
+            return
+
+        for column in self.OBJECT_COLUMNS:
+            if column in dirty_fields:
+                row[column] = self._get_stored_value(obj, column)
+        if 'attributes' not in dirty_fields:
+            attr_names = [
+                field[1] for field in dirty_fields if isinstance(field, tuple)]
+            if attr_names:
+                attributes = json.loads(row['attributes'] or '{}')
+                for attr_name in attr_names:
+                    value = obj.get_attribute(attr_name, _MISSING)
+                    if value is _MISSING:
+                        attributes.pop(attr_name, None)
+                    else:
+                        attributes[attr_name] = value
+                row['attributes'] = json.dumps(attributes)
+        self._change_counter += 1
+
+    def _get_payload_kwargs(self, row):
+        """
+        :param dict row: A stored object.
+        :rtype: dict
+        :returns: The object's description and attributes, as kwargs for
+            its constructor or :py:meth:`BaseObject.hydrate`.
+        """
+
+        kwargs = {
+            'description': row['description'],
+            'internal_description': row['internal_description'],
+        }
+        if settings.LAZY_ATTRIBUTE_DECODING:
+            kwargs['raw_attributes'] = row['attributes']
+        else:
+            kwargs['attributes'] = json.loads(row['attributes'] or '{}')
+        return kwargs
+
+    def _instantiate_stored_object(self, obj_id, skeleton=False):
+        """
+        :param int obj_id: The ID of the stored object to instantiate.
+        :keyword bool skeleton: If True, leave out the descriptions and
+            attributes.
+        :rtype: BaseObject
+        """
+
+        row = self._rows[obj_id]
+        kwargs = dict(
+            (column, value) for column, value in row.items()
+            if column not in self.PAYLOAD_COLUMNS and column != 'base_type'
+        )
+        if not skeleton:
+            kwargs.update(self._get_payload_kwargs(row))
+        return self.instantiate_object(kwargs, skeleton=skeleton)
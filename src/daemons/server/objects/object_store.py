@@ -3,12 +3,157 @@ The object store is an abstraction layer for managing in-game objects
 (rooms, things, exits, players, etc).
 """
 
+import heapq
+import time
+from collections import defaultdict
+from itertools import islice
+from operator import attrgetter, itemgetter
+
 from fuzzywuzzy import fuzz
-from twisted.internet.defer import inlineCallbacks, returnValue
+from fuzzywuzzy import utils as fuzz_utils
+from twisted.internet.defer import inlineCallbacks, returnValue, \
+    DeferredLock, succeed
+from twisted.internet.task import cooperate, LoopingCall
 
+import settings
 from src.daemons.server.objects.db_io import DBManager
-from src.daemons.server.objects.exceptions import NoSuchObject
+from src.daemons.server.objects.exceptions import NoSuchObject, \
+    ObjectHasZoneMembers, ObjectIsReferenced
+from src.daemons.server.objects.indexes import ObjectIndex, MultiKeyObjectIndex, \
+    get_trigrams
+from src.daemons.server.objects.journal import MutationJournal, SAVE, \
+    DESTROY, get_object_kwargs
+from src.daemons.server.objects.memory_db_io import MemoryDBManager
 from src.daemons.server.objects.parent_loader.loader import ParentLoader
+from src.daemons.server.objects.payload_cache import PayloadCache
+from src.daemons.server.objects.write_behind import WriteBehindQueue
+from src.daemons.server.objects import snapshot
+from src.utils import logger
+from src.utils.db import get_db_backend
+
+
+def _get_location_index_key(obj):
+    """
+    Key function for the location index.
+
+    :param BaseObject obj: The object being indexed.
+    :rtype: int or None
+    :returns: The ID of the object's location, or ``None`` if it has none.
+    """
+
+    if obj.base_type == 'room':
+        # Rooms never have a location, regardless of what location_id says.
+        return None
+    return obj.location_id
+
+
+def _get_destination_index_key(obj):
+    """
+    Key function for the exit destination index.
+
+    :param BaseObject obj: The object being indexed.
+    :rtype: int or None
+    :returns: The ID of the exit's destination, or ``None`` if this isn't
+        an exit or it leads nowhere.
+    """
+
+    if obj.base_type != 'exit':
+        return None
+    return obj.destination_id
+
+
+def _get_parent_class_index_keys(obj):
+    """
+    Key function for the parent class index. Objects are filed under every
+    class they inherit from, so a ``SolarSystemPlaceObject`` also shows up
+    under ``ThingObject`` and ``BaseObject``.
+
+    :param BaseObject obj: The object being indexed.
+    :rtype: list
+    :returns: The classes in the object's method resolution order.
+    """
+
+    return [cls for cls in type(obj).__mro__ if cls is not object]
+
+
+def _get_location_alias_index_keys(obj):
+    """
+    Key function for the location alias index. Objects are filed under a
+    ``(location_id, alias)`` tuple for each of their (lower-cased) aliases.
+
+    :param BaseObject obj: The object being indexed.
+    :rtype: list
+    :returns: A list of ``(location_id, alias)`` tuples.
+    """
+
+    location_id = _get_location_index_key(obj)
+    if location_id is None:
+        return []
+    return [(location_id, alias) for alias in obj.lowercase_aliases]
+
+
+def _get_exit_alias_index_keys(obj):
+    """
+    Key function for the exit alias index. Same as the location alias
+    index, but limited to exits. This is what the command handler consults
+    on every line of input.
+
+    :param BaseObject obj: The object being indexed.
+    :rtype: list
+    :returns: A list of ``(location_id, alias)`` tuples.
+    """
+
+    if obj.base_type != 'exit':
+        return []
+    return _get_location_alias_index_keys(obj)
+
+
+def _get_attribute_index_keys(obj):
+    """
+    Key function for the attribute index. Only the attributes named in the
+    object's ``indexed_attributes`` are looked at. Objects with a non-empty
+    value are filed under an ``(attr_name,)`` key, plus an
+    ``(attr_name, value)`` key for the value (or each member of a list value).
+
+    :param BaseObject obj: The object being indexed.
+    :rtype: list
+    :returns: A list of attribute key tuples.
+    """
+
+    if not obj.indexed_attributes:
+        # Don't touch the attributes dict of objects that index nothing.
+        return []
+
+    keys = []
+    for attr_name in obj.indexed_attributes:
+        value = obj.get_attribute(attr_name)
+        if value is None or value == [] or value == {} or value == '':
+            continue
+        keys.append((attr_name,))
+
+        values = value if isinstance(value, list) else [value]
+        for member in values:
+            if isinstance(member, (list, dict)):
+                # Nested structures can't be hashed, and aren't indexed.
+                continue
+            keys.append((attr_name, member))
+    return keys
+
+
+def _get_name_trigram_index_keys(obj):
+    """
+    Key function for the name trigram index. Covers both the object's name
+    and its aliases.
+
+    :param BaseObject obj: The object being indexed.
+    :rtype: set
+    :returns: The trigrams found in the object's name and aliases.
+    """
+
+    trigrams = get_trigrams(obj.normalized_name)
+    for alias in obj.lowercase_aliases:
+        trigrams |= get_trigrams(fuzz_utils.full_process(alias))
+    return trigrams
 
 
 class ObjectStore(object):
@@ -17,13 +162,24 @@ class ObjectStore(object):
     game. An "object" can be stuff like a room or a thing.
 
     Objects are persisted to a DB via the :py:attr:`db_manager` attribute,
-    which is a reference to a :py:class:`src.server.objects.db_io.DBManager`
-    instance.
+    which is a reference to a
+    :py:class:`src.daemons.server.objects.db_io.BaseDBManager` sub-class
+    instance, picked by ``settings.DB_BACKEND``.
 
     .. note:: This class should know nothing about the DB that backs it.
         Make sure to keep any DB-related things out of here.
     """
 
+    # global_name_search() fuzzy matches at most this many of the objects
+    # that share the most name trigrams with the query.
+    NAME_SEARCH_MAX_CANDIDATES = 200
+    # Storage backend names, as used in settings.DB_BACKEND, mapped to the
+    # BaseDBManager sub-classes that implement them.
+    DB_MANAGERS = {
+        'postgres': DBManager,
+        'memory': MemoryDBManager,
+    }
+
     def __init__(self, mud_service, db_mode='production'):
         """
         :param MudService mud_service: The MudService class running the game.
@@ -37,9 +193,96 @@ class ObjectStore(object):
         # Keys are object IDs, values are the parent instances (children of
         # src.game.parents.base_objects.base.BaseObject)
         self._objects = {}
+        # Secondary indexes over self._objects. Keys are index names,
+        # values are ObjectIndex instances.
+        self._indexes = {
+            # Location ID -> IDs of the objects inside of it.
+            'location': ObjectIndex(_get_location_index_key),
+            # Zone master object ID -> IDs of the zone's members.
+            'zone': ObjectIndex(attrgetter('zone_id')),
+            # Destination ID -> IDs of the exits that lead to it.
+            'destination': ObjectIndex(_get_destination_index_key),
+            # Account ID -> IDs of the objects the account controls.
+            'controlled_by_account': ObjectIndex(
+                attrgetter('controlled_by_account_id')),
+            # Account ID -> IDs of the objects the account first controlled.
+            'originally_controlled_by_account': ObjectIndex(
+                attrgetter('originally_controlled_by_account_id')),
+            # Base type ('room', 'exit', etc) -> IDs of objects of that type.
+            'base_type': ObjectIndex(attrgetter('base_type')),
+            # Parent class -> IDs of objects that are instances of it,
+            # including through inheritance.
+            'parent_class': MultiKeyObjectIndex(_get_parent_class_index_keys),
+            # (Location ID, lower-cased alias) -> IDs of the objects in the
+            # location with that alias.
+            'location_alias': MultiKeyObjectIndex(_get_location_alias_index_keys),
+            # Same as above, but only for exits.
+            'exit_alias': MultiKeyObjectIndex(_get_exit_alias_index_keys),
+            # (Attribute name,) or (attribute name, value) -> IDs of the
+            # objects with the value. Only covers each parent's
+            # indexed_attributes.
+            'attribute': MultiKeyObjectIndex(_get_attribute_index_keys),
+            # Name/alias trigram -> IDs of objects whose name or aliases
+            # contain it. Used to narrow down fuzzy name searches.
+            'name_trigram': MultiKeyObjectIndex(_get_name_trigram_index_keys),
+        }
+
+        # IDs of objects that were loaded as skeletons, and still need their
+        # descriptions and attributes loaded.
+        self._unhydrated_ids = set()
+        # The CooperativeTask that works through _unhydrated_ids in the
+        # background after a skeleton load.
+        self._hydration_task = None
+        # In bounded-memory mode, this decides which objects get to keep
+        # their payloads. Otherwise, every payload stays loaded once it has
+        # been hydrated.
+        if settings.OBJECT_PAYLOAD_CACHE_SIZE:
+            self._payload_cache = PayloadCache(
+                settings.OBJECT_PAYLOAD_CACHE_SIZE)
+        else:
+            self._payload_cache = None
+
+        # In write-behind mode, saves of existing objects are queued up here
+        # and written in batches every WRITE_BEHIND_INTERVAL seconds.
+        if settings.WRITE_BEHIND_INTERVAL:
+            self._write_behind = WriteBehindQueue()
+        else:
+            self._write_behind = None
+        # Keeps the periodic flush and the one on shutdown from overlapping.
+        self._flush_lock = DeferredLock()
+        self._flush_loop = None
 
         # DB abstraction layer.
-        self.db_manager = DBManager(mud_service, self.parent_loader, db_mode)
+        db_manager_class = self.DB_MANAGERS[get_db_backend(db_mode)]
+        self.db_manager = db_manager_class(
+            mud_service, self.parent_loader, db_mode)
+
+        if db_mode == 'production':
+            snapshot_file = settings.OBJECT_SNAPSHOT_FILE
+            journal_file = settings.OBJECT_JOURNAL_FILE
+            if not self.db_manager.IS_PERSISTENT:
+                # Nothing would be left to check them against on restart.
+                snapshot_file = journal_file = None
+        else:
+            snapshot_file = settings.TEST_OBJECT_SNAPSHOT_FILE
+            journal_file = settings.TEST_OBJECT_JOURNAL_FILE
+
+        # Where the store is snapshotted to on shutdown, and loaded from on
+        # boot, if the snapshot is still current. None disables this.
+        self._snapshot_path = snapshot_file
+        # The DB's change counter, as of this store's last write. If the
+        # DB's counter has moved on by the time we snapshot, something else
+        # changed dott_objects, and the snapshot would be stale.
+        self._own_change_counter = None
+
+        # If set, saves and destroys are appended here before they return,
+        # and only written to the DB on the next flush. This needs
+        # write-behind mode.
+        if journal_file and self._write_behind is not None:
+            self._journal = MutationJournal(
+                journal_file, settings.OBJECT_JOURNAL_SYNC_DELAY)
+        else:
+            self._journal = None
 
     @inlineCallbacks
     def prep_and_load(self):
@@ -55,6 +298,42 @@ class ObjectStore(object):
             parent_path = 'src.game.parents.base_objects.room.RoomObject'
             yield self.create_object(parent_path, name='And so it begins...')
 
+        yield self.load_objects()
+        if self._journal is not None:
+            self._journal.open()
+            yield self.replay_journal()
+        yield self._record_own_writes()
+
+        if self._write_behind is not None:
+            self._flush_loop = LoopingCall(self.flush_pending_saves)
+            self._flush_loop.start(settings.WRITE_BEHIND_INTERVAL, now=False)
+
+    @inlineCallbacks
+    def close(self):
+        """
+        Stops the periodic flush, and closes the journal. Queued saves are
+        left alone, so call :py:meth:`flush_pending_saves` first to write
+        them out.
+        """
+
+        if self._flush_loop is not None and self._flush_loop.running:
+            self._flush_loop.stop()
+        if self._journal is not None:
+            yield self._journal.close()
+
+    @inlineCallbacks
+    def load_objects(self):
+        """
+        Loads every object from the DB into the store. If
+        ``settings.SKELETON_OBJECT_LOAD`` is on, only the fields needed to
+        place objects in the world are loaded up front. Descriptions and
+        attributes are then filled in by a background task, or sooner via
+        :py:meth:`hydrate_objects` for objects that are needed right away.
+        In bounded-memory mode (``settings.OBJECT_PAYLOAD_CACHE_SIZE``),
+        objects are always loaded as skeletons, and are only hydrated on
+        demand.
+        """
+
         def loader_func(obj):
             """
             This function runs on each object instantiated from the DB at
@@ -63,8 +342,271 @@ class ObjectStore(object):
             :param BaseObject obj: The object to load into the store.
             """
             self._objects[obj.id] = obj
+            self.reindex_object(obj)
+            if not obj.is_hydrated:
+                self._unhydrated_ids.add(obj.id)
+
+        skeleton = settings.SKELETON_OBJECT_LOAD or \
+            self._payload_cache is not None
+        loaded_from_snapshot = yield self.load_objects_from_snapshot(
+            loader_func, skeleton=skeleton)
+        if not loaded_from_snapshot:
+            yield self.db_manager.load_objects_into_store(
+                loader_func, skeleton=skeleton)
 
-        yield self.db_manager.load_objects_into_store(loader_func)
+        # find() can't see the attributes of skeletons, so objects with
+        # indexed attributes have to be hydrated before we go live. These
+        # are never evicted from the payload cache.
+        yield self.hydrate_objects([
+            obj for obj in self._get_objects_for_ids(self._unhydrated_ids)
+            if obj.indexed_attributes
+        ])
+        if self._payload_cache is None:
+            self._start_background_hydration()
+
+    @inlineCallbacks
+    def load_objects_from_snapshot(self, loader_func, skeleton=False):
+        """
+        Loads every object from the snapshot written on the last graceful
+        shutdown, if there is one and nothing in the DB has changed since.
+
+        :param function loader_func: The function to run on each of the
+            instantiated objects.
+        :keyword bool skeleton: If True, leave the descriptions and
+            attributes out, even if the snapshot has them.
+        :rtype: bool
+        :returns: True if the objects were loaded, False if the caller
+            needs to load them from the DB instead.
+        """
+
+        if not self._snapshot_path:
+            returnValue(False)
+
+        snapshot_counter = snapshot.read_snapshot_counter(self._snapshot_path)
+        if snapshot_counter is None:
+            returnValue(False)
+
+        try:
+            db_counter = yield self.db_manager.get_change_counter()
+        except Exception:
+            logger.warning("Unable to read the object change counter, "
+                           "ignoring the object snapshot.")
+            returnValue(False)
+        if db_counter != snapshot_counter:
+            logger.info("Object snapshot is out of date, loading from the DB.")
+            returnValue(False)
+
+        logger.info("Loading objects from snapshot.")
+        for row in snapshot.read_snapshot_rows(self._snapshot_path):
+            row_is_skeleton = skeleton or not row.pop('hydrated')
+            if row_is_skeleton:
+                for field in ('description', 'internal_description',
+                              'raw_attributes'):
+                    row.pop(field, None)
+            loader_func(self.db_manager.instantiate_object(
+                row, skeleton=row_is_skeleton))
+        returnValue(True)
+
+    @inlineCallbacks
+    def write_snapshot(self):
+        """
+        Snapshots every object in the store to disk, to be loaded by
+        :py:meth:`load_objects_from_snapshot` on the next boot. This is
+        taken from memory, not the DB, and should only be done on graceful
+        shutdown, once all pending saves have gone through. If any writes
+        are still queued, any object has changes that aren't in the DB yet,
+        or the DB has been changed by something other than this store, no
+        snapshot is written, and the next boot loads from the DB.
+        """
+
+        if not self._snapshot_path:
+            return
+
+        if self._write_behind:
+            logger.warning("%d objects are still waiting to be written, "
+                           "skipping the object snapshot." %
+                           len(self._write_behind))
+            return
+
+        num_unsaved = sum(
+            1 for obj in self._objects.itervalues() if obj.is_dirty)
+        if num_unsaved:
+            logger.warning("%d objects have unsaved changes, skipping the "
+                           "object snapshot." % num_unsaved)
+            return
+
+        try:
+            db_counter = yield self.db_manager.get_change_counter()
+        except Exception:
+            logger.warning("Unable to read the object change counter, "
+                           "skipping the object snapshot.")
+            return
+        if db_counter != self._own_change_counter:
+            logger.warning("Objects were changed in the DB by something "
+                           "other than this server, skipping the object "
+                           "snapshot.")
+            return
+
+        logger.info("Writing object snapshot to %s" % self._snapshot_path)
+        snapshot.write_snapshot(
+            self._snapshot_path, db_counter, self._objects.itervalues())
+
+    @inlineCallbacks
+    def _record_own_writes(self):
+        """
+        Remembers the DB's change counter. This is called after each of the
+        store's own writes, so that :py:meth:`write_snapshot` can tell
+        whether anything else has written to the DB since. Does nothing
+        unless snapshots are enabled.
+        """
+
+        if not self._snapshot_path:
+            return
+
+        try:
+            self._own_change_counter = \
+                yield self.db_manager.get_change_counter()
+        except Exception:
+            # Without a counter, no snapshot is written.
+            logger.warning("Unable to read the object change counter.")
+            self._own_change_counter = None
+
+    def _start_background_hydration(self):
+        """
+        Hydrates all remaining skeleton objects, a batch at a time, without
+        holding up the reactor.
+        """
+
+        if not self._unhydrated_ids:
+            return
+
+        logger.info("Hydrating %d objects in the background." % len(
+            self._unhydrated_ids))
+
+        def hydrate_batches():
+            batch_size = settings.OBJECT_HYDRATION_BATCH_SIZE
+            while self._unhydrated_ids:
+                batch_ids = list(islice(self._unhydrated_ids, batch_size))
+                yield self.hydrate_objects(
+                    self._get_objects_for_ids(batch_ids), bulk=True)
+
+        def on_done(result):
+            logger.info("All objects hydrated.")
+
+        def on_error(failure):
+            logger.error("Background object hydration failed.")
+            logger.error(failure.getTraceback())
+
+        self._hydration_task = cooperate(hydrate_batches())
+        d = self._hydration_task.whenDone()
+        d.addCallbacks(on_done, on_error)
+
+    @inlineCallbacks
+    def hydrate_objects(self, objects, bulk=False):
+        """
+        Makes sure that the descriptions and attributes of the given
+        objects are loaded. Objects that are already hydrated are skipped,
+        so this is cheap to call once everything has been hydrated. In
+        bounded-memory mode, this also marks the objects as recently used,
+        and may evict the payloads of others.
+
+        :param iterable objects: The objects to hydrate.
+        :keyword bool bulk: If True, load them over the bulk connection
+            pool, rather than the interactive one.
+        """
+
+        if not self._unhydrated_ids and self._payload_cache is None:
+            return
+
+        to_load = []
+        in_use_ids = set()
+        for obj in objects:
+            if obj.id in self._unhydrated_ids:
+                to_load.append(obj)
+            elif self._payload_cache is not None and obj.id in self._payload_cache:
+                self._payload_cache.hits += 1
+                self._payload_cache.touch(obj.id)
+            in_use_ids.add(obj.id)
+
+        if to_load:
+            yield self.db_manager.hydrate_objects(to_load, bulk=bulk)
+            for obj in to_load:
+                self._unhydrated_ids.discard(obj.id)
+                self.reindex_object(obj, 'attribute')
+                if self._payload_cache is not None:
+                    self._payload_cache.misses += 1
+                    self._cache_payload(obj)
+
+        self._evict_payloads(in_use_ids)
+
+    def _cache_payload(self, obj):
+        """
+        Starts tracking a hydrated object in the payload cache.
+        Objects with indexed attributes aren't tracked, and so are never
+        evicted, since find() relies on their attributes being loaded.
+
+        :param BaseObject obj: The object whose payload was just loaded
+            or saved.
+        """
+
+        if self._payload_cache is not None and not obj.indexed_attributes:
+            self._payload_cache.touch(obj.id)
+
+    def _evict_payloads(self, in_use_ids=()):
+        """
+        Drops the least recently used payloads until the payload cache is
+        back within its size limit. Objects that may have unsaved changes
+        (including any whose attributes dict was handed out since the last
+        save) are skipped, and stay loaded until they are saved.
+
+        :keyword set in_use_ids: IDs of objects that must not be evicted,
+            since they were just asked for.
+        """
+
+        if self._payload_cache is None:
+            return
+
+        excess = len(self._payload_cache) - self._payload_cache.max_size
+        if excess <= 0:
+            return
+
+        to_evict = []
+        for obj_id in self._payload_cache.get_eviction_candidates():
+            if obj_id in in_use_ids or self._objects[obj_id].is_payload_dirty:
+                continue
+            if self._write_behind is not None and obj_id in self._write_behind:
+                # Still needs to be written out.
+                continue
+            to_evict.append(obj_id)
+            if len(to_evict) == excess:
+                break
+
+        for obj_id in to_evict:
+            self._objects[obj_id].dehydrate()
+            self._unhydrated_ids.add(obj_id)
+            self._payload_cache.discard(obj_id)
+            self._payload_cache.evictions += 1
+
+    def get_payload_cache_stats(self):
+        """
+        :rtype: dict or None
+        :returns: The payload cache's size and hit, miss, and eviction
+            counts, or ``None`` if the store isn't in bounded-memory mode.
+        """
+
+        if self._payload_cache is None:
+            return None
+        return self._payload_cache.get_stats()
+
+    @property
+    def is_fully_hydrated(self):
+        """
+        :rtype: bool
+        :returns: True if no skeleton objects are left to hydrate. This
+            is rarely the case in bounded-memory mode.
+        """
+
+        return not self._unhydrated_ids
 
     @inlineCallbacks
     def create_object(self, parent_path, name, **kwargs):
@@ -92,32 +634,470 @@ class ObjectStore(object):
 
         returnValue(obj)
 
+    @inlineCallbacks
+    def create_objects(self, specs):
+        """
+        Creates and saves a batch of new objects, with one query to reserve
+        their IDs and one multi-row INSERT. This is a lot quicker than calling
+        :py:meth:`create_object` in a loop when generating large areas.
+
+        Each spec is a dict with ``parent`` and ``name`` keys, plus any
+        additional attributes, as with :py:meth:`create_object`. The
+        ``location_id``, ``zone_id``, and ``destination_id`` values may be
+        another spec dict from the same batch, to refer to that object::
+
+            system = {'parent': settings.ROOM_PARENT, 'name': 'Sol'}
+            planet = {
+                'parent': settings.THING_PARENT, 'name': 'Earth',
+                'location_id': system, 'zone_id': system,
+            }
+            system_obj, planet_obj = yield store.create_objects(
+                [system, planet])
+
+        :param list specs: A list of dicts describing the new objects.
+        :raises: ValueError if a spec refers to one outside of the batch.
+        :rtype: list
+        :returns: The newly created objects, in the same order as ``specs``.
+        """
+
+        # Load parents first, so a bad path doesn't burn through IDs.
+        #noinspection PyPep8Naming
+        parent_classes = [
+            self.parent_loader.load_parent(spec['parent']) for spec in specs
+        ]
+        yield self._flush_journaled_writes()
+        obj_ids = yield self.db_manager.allocate_object_ids(len(specs))
+        ids_by_spec = dict(
+            (id(spec), obj_id) for spec, obj_id in zip(specs, obj_ids))
+
+        objects = []
+        for spec, NewObject, obj_id in zip(specs, parent_classes, obj_ids):
+            kwargs = dict(spec)
+            parent_path = kwargs.pop('parent')
+            name = kwargs.pop('name')
+            for field in ('location_id', 'zone_id', 'destination_id'):
+                value = kwargs.get(field)
+                if not isinstance(value, dict):
+                    continue
+                try:
+                    kwargs[field] = ids_by_spec[id(value)]
+                except KeyError:
+                    raise ValueError(
+                        "%s of '%s' refers to an object outside of the "
+                        "batch." % (field, name))
+            objects.append(NewObject(
+                self._mud_service,
+                id=obj_id,
+                name=name,
+                parent=parent_path,
+                **kwargs
+            ))
+
+        yield self.db_manager.insert_objects(objects)
+        yield self._record_own_writes()
+        for obj in objects:
+            self._objects[obj.id] = obj
+            self.reindex_object(obj)
+            self._cache_payload(obj)
+        self._evict_payloads(in_use_ids=set(obj_ids))
+
+        returnValue(objects)
+
     @inlineCallbacks
     def save_object(self, obj):
         """
-        Saves an object to the DB.
+        Saves an object to the DB. In write-behind mode, existing objects are
+        only queued up to be written on the next flush. If the store keeps a
+        journal, the save returns once it has been recorded in the journal.
+        New objects are always inserted straight away, since their IDs may
+        be stored elsewhere (such as an account's) as soon as this returns.
 
         :param BaseObject obj: The object to save to the DB.
         """
 
+        if self._write_behind is not None and obj.id is not None \
+           and self._objects.get(obj.id) is obj:
+            if self._journal is not None:
+                # The record needs the description and attributes, too.
+                yield self.hydrate_objects([obj])
+                synced = self._journal.append_save(obj)
+            else:
+                synced = succeed(None)
+            self._write_behind.add(obj.id)
+            self.reindex_object(obj)
+            yield synced
+            returnValue(obj)
+
+        # Skeletons would overwrite their descriptions and attributes.
+        yield self.hydrate_objects([obj])
         saved_obj = yield self.db_manager.save_object(obj)
+        yield self._record_own_writes()
         self._objects[saved_obj.id] = saved_obj
+        self.reindex_object(saved_obj)
+        self._cache_payload(saved_obj)
+        self._evict_payloads(in_use_ids=(saved_obj.id,))
         returnValue(saved_obj)
 
+    def flush_pending_saves(self):
+        """
+        Writes every object that is waiting in the write-behind queue out to
+        the DB, in batches of ``settings.WRITE_BEHIND_BATCH_SIZE``. This runs
+        periodically in write-behind mode, and should also be called before
+        shutting down. If a batch fails, its objects are retried one at a
+        time, and those that still fail are re-queued. Objects that fail
+        ``settings.WRITE_BEHIND_MAX_ATTEMPTS`` flushes in a row are logged
+        and dropped.
+
+        :rtype: Deferred
+        :returns: A Deferred that fires with True if nothing is left in the
+            queue, or False if some writes were re-queued or the flush
+            failed. Errors are logged, never raised.
+        """
+
+        if self._write_behind is None:
+            return succeed(True)
+
+        def on_error(failure):
+            # Raising would stop the flush loop for good.
+            logger.error("Flushing queued saves failed.")
+            logger.error(failure.getTraceback())
+            return False
+
+        d = self._flush_lock.run(self._flush_pending_saves)
+        d.addErrback(on_error)
+        return d
+
+    @inlineCallbacks
+    def _flush_pending_saves(self):
+        """
+        Does the work for :py:meth:`flush_pending_saves`. Deletes go last,
+        since saves may move objects out of the way first. Write errors are
+        logged rather than raised, and anything else is caught by
+        :py:meth:`flush_pending_saves`, so the flush loop keeps going.
+        Afterwards, the journal records it covered are dropped. Anything
+        that was re-queued has been journaled again by then.
+
+        :rtype: bool
+        :returns: True if nothing was re-queued.
+        """
+
+        # Everything journaled before this point is covered by this flush.
+        if self._journal is not None:
+            journal_position = self._journal.size
+        obj_ids, destroy_ids = self._write_behind.pop_all()
+        # Objects may have been destroyed since they were queued.
+        objects = [self._objects[obj_id] for obj_id in sorted(obj_ids)
+                   if obj_id in self._objects]
+        destroy_ids = sorted(destroy_ids)
+        num_objects = len(objects) + len(destroy_ids)
+        num_requeued = 0
+        if num_objects:
+            start_time = time.time()
+            try:
+                # Skeletons would overwrite their descriptions and attributes.
+                yield self.hydrate_objects(objects)
+            except Exception:
+                logger.trace("Flushing %d objects failed, re-queueing." %
+                             num_objects)
+                self._write_behind.requeue(
+                    [obj.id for obj in objects], destroy_ids=destroy_ids)
+                returnValue(False)
+
+            failed_saves = []
+            batch_size = settings.WRITE_BEHIND_BATCH_SIZE
+            for i in range(0, len(objects), batch_size):
+                batch_failures = yield self._write_isolating_failures(
+                    self.db_manager.save_objects, objects[i:i + batch_size])
+                failed_saves.extend(batch_failures)
+            failed_destroy_ids = yield self._write_isolating_failures(
+                self.db_manager.destroy_objects, destroy_ids)
+            yield self._record_own_writes()
+
+            failed_ids = set(obj.id for obj in failed_saves)
+            num_requeued += self._requeue_failed_writes(
+                [obj.id for obj in failed_saves], SAVE)
+            num_requeued += self._requeue_failed_writes(
+                failed_destroy_ids, DESTROY)
+
+            written_ids = obj_ids - failed_ids
+            self._write_behind.record_success(written_ids)
+            self._write_behind.record_success(
+                set(destroy_ids) - set(failed_destroy_ids))
+            for obj_id in written_ids:
+                if obj_id in self._objects:
+                    self._cache_payload(self._objects[obj_id])
+            self._write_behind.record_flush(
+                num_objects - len(failed_ids) - len(failed_destroy_ids),
+                time.time() - start_time)
+            self._evict_payloads()
+
+        if self._journal is not None:
+            # Re-queued writes were journaled again, after this position.
+            yield self._journal.truncate_to(journal_position)
+        returnValue(not num_requeued)
+
+    @inlineCallbacks
+    def _write_isolating_failures(self, write_func, items):
+        """
+        Writes a batch in one go. If that fails, each item is retried on its
+        own, so one bad row can't hold up the rest of the batch.
+
+        :param callable write_func: Takes a list of items, and returns a
+            Deferred that fires once they're written.
+        :param list items: The objects (or IDs) to write.
+        :rtype: list
+        :returns: The items that couldn't be written.
+        """
+
+        if not items:
+            returnValue([])
+        try:
+            yield write_func(items)
+        except Exception:
+            if len(items) == 1:
+                logger.trace("Writing %r failed." % items[0])
+                returnValue(items)
+            logger.trace("Writing a batch of %d failed, retrying them one "
+                         "at a time." % len(items))
+        else:
+            returnValue([])
+
+        failed = []
+        for item in items:
+            try:
+                yield write_func([item])
+            except Exception:
+                logger.trace("Writing %r failed." % item)
+                failed.append(item)
+        returnValue(failed)
+
+    def _requeue_failed_writes(self, obj_ids, op):
+        """
+        Re-queues writes that failed, unless they've failed too many
+        flushes in a row, in which case they are logged and dropped. If the
+        store keeps a journal, the re-queued writes are recorded again, so
+        the records the flush covered can still be dropped.
+
+        :param list obj_ids: The IDs of the objects that weren't written.
+        :param str op: The journal op of the writes: either ``SAVE`` or
+            ``DESTROY``.
+        :rtype: int
+        :returns: The number of writes that were re-queued.
+        """
+
+        if op == SAVE:
+            # They may have been destroyed while the flush was running.
+            obj_ids = [obj_id for obj_id in obj_ids if obj_id in self._objects]
+
+        requeue_ids = []
+        for obj_id in obj_ids:
+            attempts = self._write_behind.record_failure(obj_id)
+            if attempts >= settings.WRITE_BEHIND_MAX_ATTEMPTS:
+                logger.error(
+                    "Giving up on writing object %s after %d failed flushes. "
+                    "Its changes are only in memory." % (obj_id, attempts))
+                self._write_behind.record_dropped(obj_id)
+            else:
+                requeue_ids.append(obj_id)
+
+        if op == SAVE:
+            self._write_behind.requeue(requeue_ids)
+        else:
+            self._write_behind.requeue((), destroy_ids=requeue_ids)
+
+        if self._journal is not None:
+            for obj_id in requeue_ids:
+                if op == SAVE:
+                    synced = self._journal.append_save(self._objects[obj_id])
+                else:
+                    synced = self._journal.append_destroy(obj_id)
+                # Sync failures are logged by the journal.
+                synced.addErrback(lambda failure: None)
+        return len(requeue_ids)
+
+    def _flush_journaled_writes(self):
+        """
+        Bulk operations go straight to the DB, so anything the journal has
+        queued up needs writing first. Otherwise, a queued save could
+        bring back a zone they un-set, for example.
+
+        :rtype: Deferred
+        """
+
+        if self._journal is None:
+            return succeed(None)
+        return self.flush_pending_saves()
+
+    @inlineCallbacks
+    def replay_journal(self):
+        """
+        Writes whatever is left in the journal out to the DB, then empties
+        the journal. This runs at start-up, after the objects are loaded.
+        Anything in the journal was never flushed, so it's newer than what
+        was loaded. Each object's latest record wins, and is written in
+        full.
+        """
+
+        records = self._journal.read_records()
+        if records:
+            yield self._replay_journal_records(records)
+        # This also gets rid of any incomplete record at the end, which
+        # would otherwise hide everything appended after it.
+        yield self._journal.truncate_to(self._journal.size)
+
+    @inlineCallbacks
+    def _replay_journal_records(self, records):
+        """
+        Does the work for :py:meth:`replay_journal`.
+
+        :param list records: The journal's records, oldest first.
+        """
+
+        logger.info("Replaying %d object journal records." % len(records))
+        # Keys are object IDs, values are each object's latest values, or
+        # None if it was destroyed.
+        latest_values = {}
+        for op, obj_id, values in records:
+            latest_values[obj_id] = None if op == DESTROY else values
+
+        inserts = []
+        objects = []
+        destroy_ids = []
+        for obj_id in sorted(latest_values):
+            values = latest_values[obj_id]
+            loaded_obj = self._objects.get(obj_id)
+            if values is None:
+                if loaded_obj is not None:
+                    destroy_ids.append(obj_id)
+                    self._forget_object_id(obj_id)
+                continue
+
+            obj = self.db_manager.instantiate_object(
+                get_object_kwargs(obj_id, values))
+            if loaded_obj is None:
+                inserts.append(obj)
+            else:
+                obj.created_time = loaded_obj.created_time
+                obj.mark_dirty(*self.db_manager.OBJECT_COLUMNS)
+                objects.append(obj)
+            self._objects[obj_id] = obj
+            self._unhydrated_ids.discard(obj_id)
+            self.reindex_object(obj)
+            self._cache_payload(obj)
+
+        # Records that can't be written are logged and skipped, rather than
+        # holding up start-up.
+        failed_inserts = yield self._write_isolating_failures(
+            self.db_manager.insert_objects, inserts)
+        for obj in failed_inserts:
+            logger.error("Skipping the journaled save of object %s, which "
+                         "couldn't be re-inserted." % obj.id)
+            # It's not in the DB, so it shouldn't be in the store either.
+            self._forget_object_id(obj.id)
+        batch_size = settings.WRITE_BEHIND_BATCH_SIZE
+        for i in range(0, len(objects), batch_size):
+            failed_saves = yield self._write_isolating_failures(
+                self.db_manager.save_objects, objects[i:i + batch_size])
+            for obj in failed_saves:
+                logger.error("Skipping the journaled save of object %s." % obj.id)
+        failed_destroy_ids = yield self._write_isolating_failures(
+            self.db_manager.destroy_objects, destroy_ids)
+        for obj_id in failed_destroy_ids:
+            logger.error("Skipping the journaled destroy of object %s." % obj_id)
+        self._evict_payloads()
+
+    def get_journal_stats(self):
+        """
+        :rtype: dict or None
+        :returns: The journal's size, and append and sync figures, or
+            ``None`` if the store doesn't keep a journal.
+        """
+
+        if self._journal is None:
+            return None
+        return self._journal.get_stats()
+
+    def get_write_behind_stats(self):
+        """
+        :rtype: dict or None
+        :returns: The write-behind queue depth, and flush counts and
+            latencies, or ``None`` if the store isn't in write-behind mode.
+        """
+
+        if self._write_behind is None:
+            return None
+        return self._write_behind.get_stats()
+
     @inlineCallbacks
     def destroy_object(self, obj):
         """
         Destroys an object by yanking it from :py:attr:`_objects` and the DB.
+        If the store keeps a journal, the delete is queued for the next
+        flush, and this returns once it has been recorded.
 
         :param BaseObject obj: The object to destroy.
+        :raises: ObjectIsReferenced or ObjectHasZoneMembers if the store
+            keeps a journal, and the DB would refuse the delete.
         """
 
-        yield self.db_manager.destroy_object(obj)
+        if self._journal is not None:
+            # The DB's foreign keys won't see this until the next flush, so
+            # it gets the same checks up front.
+            yield self._check_journaled_destroy(obj)
+            synced = self._journal.append_destroy(obj.id)
+            self._write_behind.add_destroy(obj.id)
+            self._forget_object_id(obj.id)
+            yield synced
+            return
 
-        # Clear the object out of the store, mark it for GC.
-        del self._objects[obj.id]
+        yield self.db_manager.destroy_object(obj)
+        yield self._record_own_writes()
+        self._forget_object_id(obj.id)
         del obj
 
+    @inlineCallbacks
+    def _check_journaled_destroy(self, obj):
+        """
+        Makes sure nothing still refers to an object that is about to be
+        destroyed. Everything but accounts is checked against the store,
+        which already reflects any journaled writes.
+
+        :param BaseObject obj: The object to be destroyed.
+        :raises: ObjectIsReferenced or ObjectHasZoneMembers if anything
+            refers to it.
+        """
+
+        if self._indexes['location'].get_live(obj.id):
+            raise ObjectIsReferenced(
+                "Object #%d still has contents." % obj.id)
+        if self._indexes['zone'].get_live(obj.id):
+            raise ObjectHasZoneMembers(
+                "Object #%d has zone members. @zmo/empty first, or use "
+                "@zmo/delete instead." % obj.id)
+        if self._indexes['destination'].get_live(obj.id):
+            raise ObjectIsReferenced(
+                "Object #%d still has exits leading to it." % obj.id)
+        is_controlled = yield self.db_manager.is_controlled_by_account(obj.id)
+        if is_controlled:
+            raise ObjectIsReferenced(
+                "Object #%d is controlled by an account." % obj.id)
+
+    def _forget_object_id(self, obj_id):
+        """
+        Clears an object that has been deleted from the DB out of the store,
+        marking it for GC.
+
+        :param int obj_id: The ID of the deleted object.
+        """
+
+        del self._objects[obj_id]
+        self._unindex_object_id(obj_id)
+        self._unhydrated_ids.discard(obj_id)
+        if self._payload_cache is not None:
+            self._payload_cache.discard(obj_id)
+        if self._write_behind is not None:
+            self._write_behind.discard(obj_id)
+
     @inlineCallbacks
     def reload_object(self, obj):
         """
@@ -128,10 +1108,61 @@ class ObjectStore(object):
         :returns: The newly re-loaded object.
         """
 
+        yield self._flush_journaled_writes()
         reloaded_obj = yield self.db_manager.reload_object(obj)
+        if self._write_behind is not None:
+            # Anything that was waiting to be written is lost.
+            self._write_behind.discard(reloaded_obj.id)
         self._objects[reloaded_obj.id] = reloaded_obj
+        self._unhydrated_ids.discard(reloaded_obj.id)
+        self.reindex_object(reloaded_obj)
+        self._cache_payload(reloaded_obj)
+        self._evict_payloads(in_use_ids=(reloaded_obj.id,))
         returnValue(reloaded_obj)
 
+    def reindex_object(self, obj, *index_names):
+        """
+        Brings the store's secondary indexes up to date for an object. This
+        needs to be called whenever one of the indexed values changes.
+        Objects that aren't (or are no longer) members of the store are
+        ignored.
+
+        :param BaseObject obj: The object to re-index.
+        :param str index_names: If provided, only re-calculate these indexes.
+            Otherwise, every index is updated.
+        """
+
+        if obj.id is None or self._objects.get(obj.id) is not obj:
+            # Not yet saved, or this is a stale instance that has since been
+            # replaced via a reload.
+            return
+
+        index_names = index_names or self._indexes.keys()
+        for index_name in index_names:
+            self._indexes[index_name].update(obj)
+
+    def _unindex_object_id(self, obj_id):
+        """
+        Drops an object ID from all of the store's secondary indexes.
+
+        :param int obj_id: The ID of the object to remove.
+        """
+
+        for index in self._indexes.values():
+            index.remove_id(obj_id)
+
+    def _get_objects_for_ids(self, obj_ids):
+        """
+        Resolves an iterable of object IDs to a list of objects, sorted
+        by ID.
+
+        :param iterable obj_ids: The object IDs to resolve.
+        :rtype: list
+        :returns: A list of BaseObject sub-class instances.
+        """
+
+        return [self._objects[obj_id] for obj_id in sorted(obj_ids)]
+
     def get_object(self, obj_id):
         """
         Given an object ID, return the object's instance.
@@ -153,6 +1184,32 @@ class ObjectStore(object):
                 'No such object with ID: %s' % str(obj_id)
             )
 
+    def object_exists(self, obj_id):
+        """
+        :param int obj_id: The object ID to check.
+        :rtype: bool
+        :returns: True if an object with the given ID is in the store.
+        """
+
+        return obj_id in self._objects
+
+    def is_player(self, obj_id):
+        """
+        :param int obj_id: The object ID to check.
+        :rtype: bool
+        :returns: True if the given ID belongs to a player object.
+        """
+
+        return obj_id in self._indexes['base_type'].get_live('player')
+
+    def get_player_objects(self):
+        """
+        :rtype: list
+        :returns: All player objects in the game, sorted by ID.
+        """
+
+        return self.find(base_type='player')
+
     def get_object_contents(self, obj):
         """
         Returns all objects inside of the specified object.
@@ -163,22 +1220,195 @@ class ObjectStore(object):
             is ``obj``.
         """
 
-        return [omatch for omatch in self._objects.values() if omatch.location == obj]
+        return self._get_objects_for_ids(self._indexes['location'].get(obj.id))
+
+    def find(self, parent=None, base_type=None, location=None, zone=None,
+             controlled_by_account=None, originally_controlled_by_account=None,
+             has_attribute=None, attributes=None):
+        """
+        Finds all objects matching every one of the given criteria. This
+        intersects the store's indexes rather than scanning every object.
+
+        :keyword parent: Only match instances of this parent. May be either
+            the parent class itself or its full Python path. Sub-classes
+            of the parent are also matched.
+        :type parent: type or str
+        :keyword str base_type: Only match objects with this base type
+            (room, thing, exit, or player).
+        :keyword location: Only match objects inside of this location.
+        :type location: BaseObject or int
+        :keyword zone: Only match members of this zone.
+        :type zone: BaseObject or int
+        :keyword int controlled_by_account: Only match objects controlled
+            by the account with this ID.
+        :keyword int originally_controlled_by_account: Only match objects
+            originally controlled by the account with this ID.
+        :keyword str has_attribute: Only match objects with a non-empty value
+            for this attribute.
+        :keyword dict attributes: Only match objects whose attributes have
+            these values. Keys are attribute names, values are the value
+            to match. If the object's value is a list, it only has to contain
+            the value to match.
+
+        .. note:: The attribute criteria only work on attributes listed in
+            the parent's ``indexed_attributes``. Anything else never matches.
+        :rtype: list
+        :returns: A list of matching ``BaseObject`` sub-class instances,
+            sorted by ID. If no criteria are given, all objects are returned.
+        """
+
+        if isinstance(parent, basestring):
+            parent = self.parent_loader.load_parent(parent)
+
+        criteria = [
+            ('parent_class', parent),
+            ('base_type', base_type),
+            ('location', getattr(location, 'id', location)),
+            ('zone', getattr(zone, 'id', zone)),
+            ('controlled_by_account', controlled_by_account),
+            ('originally_controlled_by_account', originally_controlled_by_account),
+        ]
+        if has_attribute is not None:
+            criteria.append(('attribute', (has_attribute,)))
+        for attr_name, attr_value in (attributes or {}).items():
+            criteria.append(('attribute', (attr_name, attr_value)))
+
+        candidate_sets = [
+            self._indexes[index_name].get_live(key)
+            for index_name, key in criteria if key is not None
+        ]
+
+        if not candidate_sets:
+            return self._get_objects_for_ids(self._objects.keys())
+
+        # Start with the smallest set, so the intersections stay cheap.
+        candidate_sets.sort(key=len)
+        matches = set(candidate_sets[0])
+        for candidate_set in candidate_sets[1:]:
+            if not matches:
+                break
+            matches.intersection_update(candidate_set)
+
+        return self._get_objects_for_ids(matches)
 
-    def global_name_search(self, name):
+    def find_by_alias(self, location, alias):
         """
-        Does a global name search of all objects. Compares input to the name
-        odata key on all objects.
+        Finds the objects in a location that have the given alias. This is
+        a single index lookup, regardless of how crowded the location is.
+
+        :param location: The location whose contents to search.
+        :type location: BaseObject or int
+        :param str alias: The alias to look for. Not case sensitive.
+        :rtype: list
+        :returns: A list of ``BaseObject`` sub-class instances with the alias,
+            sorted by ID.
+        """
+
+        location_id = getattr(location, 'id', location)
+        return self._get_objects_for_ids(
+            self._indexes['location_alias'].get_live((location_id, alias.lower())))
+
+    def find_exit_by_alias(self, location, alias):
+        """
+        Finds an exit in a location by one of its aliases.
+
+        :param location: The location whose exits to search.
+        :type location: BaseObject or int
+        :param str alias: The alias to look for. Not case sensitive.
+        :rtype: ExitObject or None
+        :returns: The matching exit (lowest ID, if there are several), or
+            ``None`` if there is no such exit.
+        """
+
+        location_id = getattr(location, 'id', location)
+        exit_ids = self._indexes['exit_alias'].get_live((location_id, alias.lower()))
+        if not exit_ids:
+            return None
+        return self._objects[min(exit_ids)]
+
+    def global_name_search(self, name, limit=50):
+        """
+        Does a global fuzzy search of all objects' names and aliases. Rather
+        than fuzzy matching against every object in the store, the name
+        trigram index is used to pick out the objects that share the most
+        trigrams with ``name``. Only those candidates are fuzzy matched.
+        Queries shorter than a trigram can't be narrowed down this way, so
+        every object whose name or aliases contain them is a candidate.
 
         :param str name: The name to search for.
-        :returns: A generator of ``BaseObject`` matches.
+        :keyword int limit: The maximum number of matches to return.
+        :rtype: list
+        :returns: A list of ``BaseObject`` matches, best match first.
         """
 
-        #noinspection PyShadowingBuiltins
-        for id, obj in self._objects.iteritems():
-            ratio = fuzz.partial_ratio(name, obj.name)
-            if ratio > 50:
-                yield obj
+        query = fuzz_utils.full_process(name)
+        scored_matches = []
+        if len(query) < 3:
+            # Every candidate contains the query, so they all match. The
+            # closer the whole name is to the query, the better.
+            for obj_id in self._get_substring_match_ids(query):
+                obj = self._objects[obj_id]
+                ratio = max(
+                    fuzz.ratio(query, term)
+                    for term in [obj.normalized_name] + list(obj.lowercase_aliases)
+                )
+                scored_matches.append((-ratio, obj_id, obj))
+        else:
+            for obj_id in self._get_trigram_candidate_ids(query):
+                obj = self._objects[obj_id]
+                ratio = max(
+                    fuzz.partial_ratio(name, term)
+                    for term in [obj.name] + obj.aliases
+                )
+                if ratio > 50:
+                    # Sort on ratio (descending), then ID (ascending).
+                    scored_matches.append((-ratio, obj_id, obj))
+
+        scored_matches.sort()
+        return [obj for _, _, obj in scored_matches[:limit]]
+
+    def _get_trigram_candidate_ids(self, query):
+        """
+        :param str query: A normalized name query, at least three
+            characters long.
+        :rtype: list
+        :returns: The IDs of the objects that share the most trigrams with
+            ``query``, at most :py:attr:`NAME_SEARCH_MAX_CANDIDATES`.
+        """
+
+        trigram_index = self._indexes['name_trigram']
+        # Keys are object IDs, values are the number of trigrams shared
+        # with the query.
+        shared_counts = defaultdict(int)
+        for trigram in get_trigrams(query):
+            for obj_id in trigram_index.get_live(trigram):
+                shared_counts[obj_id] += 1
+
+        candidates = heapq.nlargest(
+            self.NAME_SEARCH_MAX_CANDIDATES,
+            shared_counts.iteritems(),
+            key=itemgetter(1),
+        )
+        return [obj_id for obj_id, _ in candidates]
+
+    def _get_substring_match_ids(self, query):
+        """
+        Scans every object for names and aliases that contain ``query``.
+        This is only used for queries too short to have trigrams of their
+        own, which the index can't narrow down.
+
+        :param str query: A normalized name query.
+        :rtype: list
+        :returns: The IDs of the matching objects.
+        """
+
+        if not query:
+            return []
+        return [
+            obj_id for obj_id, obj in self._objects.iteritems()
+            if query in obj.normalized_name or any(
+                query in alias for alias in obj.lowercase_aliases)
+        ]
 
     def find_exits_linked_to_obj(self, obj):
         """
@@ -193,22 +1423,8 @@ class ObjectStore(object):
             # Exits can't be linked to one another, this ends up being invalid.
             return []
 
-        # We could use a generator for this, but then we couldn't iterate
-        # and delete as we went, as this would change the size of self._objects
-        # during the iteration (causing an exception). So store in list.
-        linked_exits = []
-        #noinspection PyShadowingBuiltins
-        for id, db_obj in self._objects.iteritems():
-            if not db_obj.base_type == 'exit':
-                # Not an exit, not interested.
-                continue
-
-            destination = db_obj.destination
-            if destination and destination.id == obj.id:
-                # This object's destination matches the specified object's ID.
-                linked_exits.append(db_obj)
-
-        return linked_exits
+        return self._get_objects_for_ids(
+            self._indexes['destination'].get(obj.id))
 
     def find_objects_in_zone(self, obj):
         """
@@ -219,18 +1435,7 @@ class ObjectStore(object):
         :return: A list of the object's zone members.
         """
 
-        # We could use a generator for this, but then we couldn't iterate
-        # and delete as we went, as this would change the size of self._objects
-        # during the iteration (causing an exception). So store in list.
-        zone_members = []
-        #noinspection PyShadowingBuiltins
-        for id, db_obj in self._objects.iteritems():
-            zone = db_obj.zone
-            if zone and zone.id == obj.id:
-                # This object's zone matches the specified object's ID.
-                zone_members.append(db_obj)
-
-        return zone_members
+        return self._get_objects_for_ids(self._indexes['zone'].get(obj.id))
 
     @inlineCallbacks
     def empty_out_zone(self, obj):
@@ -244,9 +1449,16 @@ class ObjectStore(object):
         """
 
         members = self.find_objects_in_zone(obj)
+        if not members:
+            returnValue(members)
+
+        yield self._flush_journaled_writes()
+        yield self.db_manager.unset_zones([member.id for member in members])
+        yield self._record_own_writes()
         for member in members:
             member.zone = None
-            yield member.save()
+            # Already written out above. Anything else stays dirty.
+            member.mark_clean('zone_id')
         returnValue(members)
 
     @inlineCallbacks
@@ -254,16 +1466,40 @@ class ObjectStore(object):
         """
         Given a ZMO, destroy all members and the ZMO itself. No survivors.
 
+        Everything is deleted in one go. As with
+        :py:meth:`BaseObject.destroy`, exits leading to any of the condemned
+        objects are destroyed along with them.
+
         :param BaseObject obj: The ZMO to completely eradicate.
+        :raises: ObjectHasZoneMembers if any of the members are themselves
+            ZMOs for objects outside of this zone.
+        :raises: ObjectIsReferenced if anything outside of this zone is
+            located inside one of the members.
         :rtype: list
         :returns: A list of IDs of the deleted objects (ZMO included).
         """
 
-        members = self.find_objects_in_zone(obj)
-        deleted_ids = []
-        for member in members:
-            deleted_ids.append(member.id)
-            yield member.destroy()
+        zone_index = self._indexes['zone']
+        deleted_ids = sorted(zone_index.get(obj.id))
         deleted_ids.append(obj.id)
-        yield obj.destroy()
+
+        condemned_ids = set(deleted_ids)
+        for obj_id in deleted_ids:
+            if self._objects[obj_id].base_type not in ['exit', 'player']:
+                condemned_ids.update(self._indexes['destination'].get(obj_id))
+        for obj_id in condemned_ids:
+            if not zone_index.get_live(obj_id) <= condemned_ids:
+                raise ObjectHasZoneMembers(
+                    "Object #%d has zone members outside of the zone being "
+                    "razed. @zmo/empty it first." % obj_id)
+            if not self._indexes['location'].get_live(obj_id) <= condemned_ids:
+                raise ObjectIsReferenced(
+                    "Object #%d has contents from outside of the zone being "
+                    "razed. Move them out first." % obj_id)
+
+        yield self._flush_journaled_writes()
+        yield self.db_manager.destroy_objects(condemned_ids)
+        yield self._record_own_writes()
+        for obj_id in condemned_ids:
+            self._forget_object_id(obj_id)
         returnValue(deleted_ids)
\ No newline at end of file
@@ -0,0 +1,81 @@
+"""
+Bookkeeping for the object store's bounded-memory mode, where only the most
+recently used objects keep their descriptions and attributes in memory.
+"""
+
+from collections import OrderedDict
+
+
+class PayloadCache(object):
+    """
+    Tracks the IDs of objects whose payloads (descriptions and attributes)
+    are resident, least recently used first. This only decides *which*
+    objects to evict. The actual loading and dropping of payloads is left to
+    the :py:class:`ObjectStore`.
+    """
+
+    def __init__(self, max_size):
+        """
+        :param int max_size: The number of objects to keep payloads for.
+        """
+
+        self.max_size = max_size
+        # Object IDs, least recently used first. The values are unused.
+        self._ids = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, obj_id):
+        return obj_id in self._ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def touch(self, obj_id):
+        """
+        Marks an object as the most recently used.
+
+        :param int obj_id: The ID of the object that was used.
+        """
+
+        self._ids.pop(obj_id, None)
+        self._ids[obj_id] = None
+
+    def discard(self, obj_id):
+        """
+        Stops tracking an object.
+
+        :param int obj_id: The ID of the object to forget about.
+        """
+
+        self._ids.pop(obj_id, None)
+
+    def get_eviction_candidates(self):
+        """
+        :rtype: generator
+        :returns: Object IDs, least recently used first, or nothing if the
+            cache isn't over its maximum size. Don't modify the cache while
+            iterating over this.
+        """
+
+        excess = len(self._ids) - self.max_size
+        if excess <= 0:
+            return
+        for obj_id in self._ids:
+            yield obj_id
+
+    def get_stats(self):
+        """
+        :rtype: dict
+        :returns: The cache's current size, its maximum size, and hit, miss,
+            and eviction counts since start-up.
+        """
+
+        return {
+            'size': len(self._ids),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
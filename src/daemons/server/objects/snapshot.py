@@ -0,0 +1,113 @@
+"""
+On-disk snapshots of the object store. A snapshot is written on graceful
+shutdown and read on the next boot, which is a lot quicker than selecting
+and instantiating every object from the DB.
+
+Each snapshot is tagged with the DB's object change counter at the time it
+was written. If anything has changed in ``dott_objects`` since then, the
+counters won't match, and the snapshot is ignored.
+"""
+
+import cPickle
+import mmap
+import os
+import struct
+
+from src.utils import logger
+
+# Identifies snapshot files, and the version of the format below.
+SNAPSHOT_MAGIC = 'DOTTSNAP'
+SNAPSHOT_VERSION = 1
+# Magic, format version, DB change counter.
+HEADER_FORMAT = '>8sIq'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+# Fields that every object in the snapshot has.
+SKELETON_FIELDS = (
+    'id', 'name', 'parent', 'location_id', 'originally_controlled_by_account_id',
+    'controlled_by_account_id', 'zone_id', 'aliases', 'destination_id',
+    'created_time',
+)
+
+
+def get_object_row(obj):
+    """
+    Converts an object into the dict that is stored in a snapshot. The keys
+    match the column names of the rows from :py:class:`DBManager`, so they
+    can be fed through the same instantiation code.
+
+    :param BaseObject obj: The object to convert.
+    :rtype: dict
+    """
+
+    row = dict((field, getattr(obj, field)) for field in SKELETON_FIELDS)
+    row['hydrated'] = obj.is_hydrated
+    if obj.is_hydrated:
+        row['description'] = obj.description
+        row['internal_description'] = obj.internal_description
+        row['raw_attributes'] = obj.get_serialized_attributes()
+    return row
+
+
+def write_snapshot(path, change_counter, objects):
+    """
+    Writes a snapshot of the given objects. The file is written under a
+    temporary name, then moved into place, so a crash part of the way
+    through can't leave a truncated snapshot behind.
+
+    :param str path: Where to write the snapshot.
+    :param int change_counter: The DB's object change counter.
+    :param iterable objects: The objects to write.
+    """
+
+    rows = [get_object_row(obj) for obj in objects]
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as snapshot_file:
+        snapshot_file.write(struct.pack(
+            HEADER_FORMAT, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, change_counter))
+        cPickle.dump(rows, snapshot_file, cPickle.HIGHEST_PROTOCOL)
+    os.rename(tmp_path, path)
+
+
+def read_snapshot_counter(path):
+    """
+    :param str path: The snapshot file to read.
+    :rtype: int or None
+    :returns: The change counter the snapshot was written with, or ``None``
+        if there is no usable snapshot at ``path``.
+    """
+
+    try:
+        with open(path, 'rb') as snapshot_file:
+            header = snapshot_file.read(HEADER_SIZE)
+    except IOError:
+        return None
+
+    if len(header) != HEADER_SIZE:
+        return None
+    magic, version, change_counter = struct.unpack(HEADER_FORMAT, header)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        logger.warning("Ignoring unrecognized object snapshot: %s" % path)
+        return None
+    return change_counter
+
+
+def read_snapshot_rows(path):
+    """
+    Reads the objects out of a snapshot. The file is memory-mapped rather
+    than read into a string first. Check :py:func:`read_snapshot_counter`
+    before calling this.
+
+    :param str path: The snapshot file to read.
+    :rtype: list
+    :returns: A list of dicts, as made by :py:func:`get_object_row`.
+    """
+
+    with open(path, 'rb') as snapshot_file:
+        snapshot_map = mmap.mmap(
+            snapshot_file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            snapshot_map.seek(HEADER_SIZE)
+            return cPickle.load(snapshot_map)
+        finally:
+            snapshot_map.close()
@@ -2,11 +2,22 @@
 Object store tests.
 """
 
-from twisted.internet.defer import inlineCallbacks, returnValue
+import os
+import tempfile
+
+from twisted.internet.defer import inlineCallbacks, fail
 
 import settings
-from src.utils.test_utils import DottTestCase
-from src.daemons.server.objects.exceptions import ObjectHasZoneMembers, NoSuchObject
+from src.utils.db import PreparedStatement, get_db_pool_stats
+from src.utils.test_utils import DottTestCase, requires_postgres
+from src.daemons.server.objects.exceptions import ObjectHasZoneMembers, \
+    ObjectIsReferenced, NoSuchObject
+from src.daemons.server.objects import snapshot
+from src.daemons.server.objects.journal import MutationJournal, SAVE, \
+    read_records
+from src.daemons.server.objects.memory_db_io import MemoryDBManager
+from src.game.parents.base_objects.thing import ThingObject
+from src.game.parents.space.solar_system import SolarSystemPlaceObject
 
 
 #noinspection PyProtectedMember
@@ -55,6 +66,26 @@ class GeneralObjectStoreTests(DottTestCase):
                 num_found += 1
         self.assertEqual(num_found, 3)
 
+        # The best match should come first, and the limit should be obeyed.
+        matches3 = self.object_store.global_name_search('funny room', limit=1)
+        self.assertListEqual(matches3, [room3])
+
+        # Queries shorter than a trigram still match part of a name.
+        self.assertIn(room3, self.object_store.global_name_search('fu'))
+        self.assertIn(room2, self.object_store.global_name_search('th'))
+        self.assertNotIn(room1, self.object_store.global_name_search('fu'))
+
+        # Renames and aliases are picked up by the index on save.
+        room2.name = 'Broom closet'
+        room2.aliases = ['mops']
+        yield room2.save()
+        self.assertIn(room2, self.object_store.global_name_search('closet'))
+        self.assertIn(room2, self.object_store.global_name_search('mops'))
+
+        # Destroyed objects drop out of the results.
+        yield room1.destroy()
+        self.assertNotIn(room1, self.object_store.global_name_search('some'))
+
     @inlineCallbacks
     def test_find_exits_linked_to_obj(self):
         """
@@ -78,6 +109,803 @@ class GeneralObjectStoreTests(DottTestCase):
         self.assertEqual(exits[0].id, test_exit.id)
         self.assertEqual(len(exits), 1)
 
+        # Re-linking the exit should move it over in the destination index.
+        test_exit.destination = room1
+        self.assertListEqual(self.object_store.find_exits_linked_to_obj(room2), [])
+        self.assertListEqual(
+            self.object_store.find_exits_linked_to_obj(room1), [test_exit])
+
+    @inlineCallbacks
+    def test_get_object_contents(self):
+        """
+        Makes sure the location index follows objects around as they are
+        moved and destroyed.
+        """
+
+        room1 = yield self.object_store.create_object(settings.ROOM_PARENT, name='Room 1')
+        room2 = yield self.object_store.create_object(settings.ROOM_PARENT, name='Room 2')
+        thing = yield self.object_store.create_object(
+            settings.THING_PARENT,
+            location_id=room1.id,
+            name='Thing')
+        self.assertListEqual(self.object_store.get_object_contents(room1), [thing])
+
+        thing.set_location(room2)
+        self.assertListEqual(self.object_store.get_object_contents(room1), [])
+        self.assertListEqual(self.object_store.get_object_contents(room2), [thing])
+
+        yield thing.destroy()
+        self.assertListEqual(self.object_store.get_object_contents(room2), [])
+
+    @inlineCallbacks
+    def test_find(self):
+        """
+        Tests the index-backed find() method, including parent class
+        inheritance and intersection of multiple criteria.
+        """
+
+        room1 = yield self.object_store.create_object(settings.ROOM_PARENT, name='Room 1')
+        room2 = yield self.object_store.create_object(settings.ROOM_PARENT, name='Room 2')
+        thing = yield self.object_store.create_object(
+            settings.THING_PARENT,
+            location_id=room1.id,
+            name='Thing')
+        place = yield self.object_store.create_object(
+            'src.game.parents.space.solar_system.SolarSystemPlaceObject',
+            location_id=room1.id,
+            name='Place')
+        test_exit = yield self.object_store.create_object(
+            settings.EXIT_PARENT,
+            location_id=room1.id,
+            destination_id=room2.id,
+            name='Test Exit')
+
+        # Sub-classes of ThingObject count as things.
+        self.assertListEqual(
+            self.object_store.find(parent=ThingObject, location=room1),
+            [thing, place])
+        self.assertListEqual(
+            self.object_store.find(parent=SolarSystemPlaceObject),
+            [place])
+        # Parent paths work as well as classes.
+        self.assertListEqual(
+            self.object_store.find(parent=settings.EXIT_PARENT, location=room1),
+            [test_exit])
+        self.assertListEqual(
+            self.object_store.find(base_type='exit', location=room1.id),
+            [test_exit])
+        self.assertListEqual(
+            self.object_store.find(base_type='thing', location=room2), [])
+
+        yield place.destroy()
+        self.assertListEqual(
+            self.object_store.find(parent=SolarSystemPlaceObject), [])
+
+    @inlineCallbacks
+    def test_account_and_player_lookups(self):
+        """
+        Tests the account control indexes and the player registry.
+        """
+
+        account = yield self.account_store.create_account(
+            'TestPlayer', 'password', 'test@example.com')
+        room = yield self.object_store.create_object(settings.ROOM_PARENT, name='Room')
+        player = yield self.object_store.create_object(
+            'src.game.parents.base_objects.player.PlayerObject',
+            location_id=room.id,
+            originally_controlled_by_account_id=account.id,
+            controlled_by_account_id=account.id,
+            name='TestPlayer')
+
+        self.assertTrue(self.object_store.object_exists(player.id))
+        self.assertTrue(self.object_store.is_player(player.id))
+        self.assertFalse(self.object_store.is_player(room.id))
+        self.assertListEqual(self.object_store.get_player_objects(), [player])
+        self.assertListEqual(
+            self.object_store.find(controlled_by_account=account.id), [player])
+        self.assertListEqual(
+            self.object_store.find(
+                originally_controlled_by_account=account.id, location=room),
+            [player])
+
+        yield player.destroy()
+        self.assertFalse(self.object_store.object_exists(player.id))
+        self.assertFalse(self.object_store.is_player(player.id))
+        self.assertListEqual(
+            self.object_store.find(controlled_by_account=account.id), [])
+
+    @inlineCallbacks
+    def test_find_by_indexed_attribute(self):
+        """
+        Parents may declare indexed attributes, which find() can then query.
+        """
+
+        system = yield self.object_store.create_object(
+            'src.game.parents.space.solar_system.SolarSystemObject',
+            name='System')
+        place = yield self.object_store.create_object(
+            'src.game.parents.space.solar_system.SolarSystemPlaceObject',
+            location_id=system.id,
+            name='Place')
+        hangar = yield self.object_store.create_object(
+            'src.game.parents.space.hangar.RoomHangarObject', name='Hangar')
+        planet = yield self.object_store.create_object(
+            'src.game.parents.space.solar_system.PlanetObject',
+            location_id=place.id,
+            attributes={'DOCKABLE_IDS': [hangar.id]},
+            name='Planet')
+        ship = yield self.object_store.create_object(
+            'src.game.parents.space.ships.ship_classes.base.BaseSpaceShipObject',
+            location_id=place.id,
+            name='Ship')
+        # Plain things don't index DOCKABLE_IDS.
+        yield self.object_store.create_object(
+            settings.THING_PARENT,
+            location_id=place.id,
+            attributes={'DOCKABLE_IDS': [hangar.id]},
+            name='Thing')
+
+        self.assertListEqual(
+            self.object_store.find(location=place, has_attribute='DOCKABLE_IDS'),
+            [planet])
+        self.assertListEqual(
+            self.object_store.find(attributes={'DOCKABLE_IDS': hangar.id}),
+            [planet])
+        # Docking lists come from the index.
+        grouped_hangars, hangar_ids = place.get_dockable_obj_list(ship)
+        self.assertDictEqual(grouped_hangars, {planet.id: [hangar]})
+        self.assertListEqual(hangar_ids, [hangar.id])
+
+        # Changes are picked up on save.
+        planet.attributes['DOCKABLE_IDS'] = [43]
+        yield planet.save()
+        self.assertListEqual(
+            self.object_store.find(attributes={'DOCKABLE_IDS': hangar.id}), [])
+        self.assertListEqual(
+            self.object_store.find(attributes={'DOCKABLE_IDS': 43}), [planet])
+
+        planet.attributes['DOCKABLE_IDS'] = []
+        yield planet.save()
+        self.assertListEqual(
+            self.object_store.find(has_attribute='DOCKABLE_IDS'), [])
+
+    @inlineCallbacks
+    def test_lazy_attribute_decoding(self):
+        """
+        Objects loaded from the DB keep their attributes as JSON text until
+        they're accessed, and write untouched text back as-is.
+        """
+
+        thing = yield self.object_store.create_object(
+            settings.THING_PARENT,
+            attributes={'color': 'red'},
+            name='Thing')
+        thing = yield self.object_store.reload_object(thing)
+        self.assertIsNotNone(thing.get_raw_attributes())
+
+        # Saving without touching the attributes re-uses the text.
+        yield thing.save()
+        thing = yield self.object_store.reload_object(thing)
+        self.assertDictEqual(thing.attributes, {'color': 'red'})
+        self.assertIsNone(thing.get_raw_attributes())
+
+        # get_attributes() only reads.
+        thing = yield self.object_store.reload_object(thing)
+        self.assertDictEqual(thing.get_attributes(), {'color': 'red'})
+        self.assertFalse(thing.is_payload_dirty)
+
+        # Changes made to the dict directly are saved in full.
+        thing.attributes['color'] = 'blue'
+        thing.attributes['size'] = 'large'
+        self.assertTrue(thing.is_payload_dirty)
+        yield thing.save()
+        thing = yield self.object_store.reload_object(thing)
+        self.assertDictEqual(thing.attributes, {'color': 'blue', 'size': 'large'})
+
+    @inlineCallbacks
+    def test_create_objects(self):
+        """
+        Bulk creation, with objects referring to others in the same batch.
+        """
+
+        # The children come first, to make sure order doesn't matter.
+        room = {'parent': settings.ROOM_PARENT, 'name': 'Bulk Room'}
+        thing = {
+            'parent': settings.THING_PARENT,
+            'name': 'Bulk Thing',
+            'location_id': room,
+            'zone_id': room,
+            'description': 'Made in bulk.',
+        }
+        exit_spec = {
+            'parent': settings.EXIT_PARENT,
+            'name': 'Bulk Exit',
+            'location_id': room,
+            'destination_id': room,
+        }
+        thing_obj, exit_obj, room_obj = yield self.object_store.create_objects(
+            [thing, exit_spec, room])
+
+        self.assertEqual(thing_obj.location_id, room_obj.id)
+        self.assertEqual(thing_obj.zone_id, room_obj.id)
+        self.assertEqual(exit_obj.destination_id, room_obj.id)
+        self.assertEqual(
+            self.object_store.get_object_contents(room_obj),
+            [thing_obj, exit_obj])
+        self.assertFalse(thing_obj.is_payload_dirty)
+
+        reloaded = yield self.object_store.db_manager.reload_object(thing_obj)
+        self.assertEqual(reloaded.location_id, room_obj.id)
+        self.assertEqual(reloaded.description, 'Made in bulk.')
+
+        stray = {'parent': settings.THING_PARENT, 'name': 'Stray', 'location_id': {}}
+        yield self.assertFailure(
+            self.object_store.create_objects([stray]), ValueError)
+
+    @requires_postgres
+    @inlineCallbacks
+    def test_connection_pools(self):
+        """
+        Bulk work doesn't hold up interactive saves, and saves of the same
+        object are written in order.
+        """
+
+        room = yield self.object_store.create_object(settings.ROOM_PARENT, name='Room')
+        db_manager = self.object_store.db_manager
+        slow_query = db_manager._bulk_db.runQuery("SELECT pg_sleep(0.5)")
+        slow_results = []
+        slow_query.addCallback(slow_results.append)
+
+        room.name = 'Renamed Once'
+        first_save = room.save()
+        room.name = 'Renamed Twice'
+        yield room.save()
+        yield first_save
+        self.assertListEqual(slow_results, [])
+        reloaded = yield db_manager.reload_object(room)
+        self.assertEqual(reloaded.name, 'Renamed Twice')
+
+        yield slow_query
+        stats = get_db_pool_stats('test')
+        self.assertEqual(stats['interactive']['size'],
+                         settings.DB_POOL_SIZES['interactive'])
+        self.assertEqual(stats['bulk']['in_use'], 0)
+        self.assertTrue(stats['interactive']['requests'] >= 3)
+
+    @requires_postgres
+    @inlineCallbacks
+    def test_prepared_statements(self):
+        """
+        Hot queries are prepared once per connection, then run by name.
+        """
+
+        statement = PreparedStatement(
+            'test_statement', "SELECT %s::int + %s::int, '100%%'")
+        self.assertEqual(
+            statement.prepare_sql,
+            "PREPARE test_statement AS SELECT $1::int + $2::int, '100%'")
+        self.assertEqual(statement.execute_sql, "EXECUTE test_statement (%s, %s)")
+
+        room = yield self.object_store.create_object(settings.ROOM_PARENT, name='Room')
+        db_manager = self.object_store.db_manager
+        for name in ('Renamed', 'Renamed Again'):
+            room.name = name
+            yield room.save()
+        reloaded = yield db_manager.reload_object(room)
+        self.assertEqual(reloaded.name, 'Renamed Again')
+
+        update_statement, _ = db_manager._get_update_statement(room, set(['name']))
+        self.assertEqual(update_statement.name, 'dott_update_object_1')
+        prepared = set()
+        for conn in db_manager._db.connections:
+            prepared |= conn.prepared_statements
+        self.assertIn(update_statement.name, prepared)
+        self.assertIn(db_manager.INSERT_OBJECT.name, prepared)
+
+    @requires_postgres
+    @inlineCallbacks
+    def test_partial_updates(self):
+        """
+        Saves only write the columns that have changed.
+        """
+
+        room1 = yield self.object_store.create_object(settings.ROOM_PARENT, name='Room 1')
+        room2 = yield self.object_store.create_object(settings.ROOM_PARENT, name='Room 2')
+        thing = yield self.object_store.create_object(
+            settings.THING_PARENT,
+            location_id=room1.id,
+            description='Original.',
+            name='Thing')
+        db_manager = self.object_store.db_manager
+        yield db_manager._db.runOperation(
+            "UPDATE dott_objects SET description='Edited elsewhere.' WHERE id=%s",
+            (thing.id,))
+
+        thing.set_location(room2)
+        yield thing.save()
+        reloaded = yield db_manager.reload_object(thing)
+        self.assertEqual(reloaded.location_id, room2.id)
+        self.assertEqual(reloaded.description, 'Edited elsewhere.')
+
+        # Nothing changed, so nothing is written.
+        counter = yield db_manager.get_change_counter()
+        yield thing.save()
+        new_counter = yield db_manager.get_change_counter()
+        self.assertEqual(counter, new_counter)
+
+    @requires_postgres
+    @inlineCallbacks
+    def test_attribute_patching(self):
+        """
+        Individually set attributes are patched into the stored jsonb,
+        rather than overwriting the whole document, and attribute
+        containment queries run in the DB.
+        """
+
+        thing = yield self.object_store.create_object(
+            settings.THING_PARENT,
+            attributes={'a': 1, 'b': 2, 'DOCKABLE_IDS': [41, 42]},
+            name='Thing')
+        other = yield self.object_store.create_object(
+            settings.THING_PARENT,
+            attributes={'DOCKABLE_IDS': [43]},
+            name='Other')
+        db_manager = self.object_store.db_manager
+        yield db_manager._db.runOperation(
+            "UPDATE dott_objects SET attributes = attributes || '{\"c\": 3}'"
+            " WHERE id=%s", (thing.id,))
+
+        thing.set_attribute('a', {'nested': True})
+        thing.delete_attribute('b')
+        self.assertTrue(thing.is_payload_dirty)
+        yield thing.save()
+        reloaded = yield db_manager.reload_object(thing)
+        self.assertDictEqual(reloaded.attributes, {
+            'a': {'nested': True}, 'c': 3, 'DOCKABLE_IDS': [41, 42]})
+
+        found = yield db_manager.find_ids_by_attributes({'DOCKABLE_IDS': [42]})
+        self.assertListEqual(found, [thing.id])
+        found = yield db_manager.find_ids_by_attributes({'DOCKABLE_IDS': []})
+        self.assertListEqual(found, [thing.id, other.id])
+
+    @inlineCallbacks
+    def test_memory_backend(self):
+        """
+        The in-process backend patches attributes and matches attribute
+        containment the same way Postgres does.
+        """
+
+        db_manager = MemoryDBManager(
+            self.mud_service, self.object_store.parent_loader, 'test')
+        self.object_store.db_manager = db_manager
+        thing = yield self.object_store.create_object(
+            settings.THING_PARENT,
+            attributes={'a': 1, 'b': 2, 'DOCKABLE_IDS': [41, 42]},
+            name='Thing')
+        other = yield self.object_store.create_object(
+            settings.THING_PARENT,
+            attributes={'DOCKABLE_IDS': [43]},
+            name='Other')
+        db_manager._rows[thing.id]['attributes'] = \
+            '{"a": 1, "b": 2, "c": 3, "DOCKABLE_IDS": [41, 42]}'
+
+        counter = yield db_manager.get_change_counter()
+        thing.set_attribute('a', {'nested': True})
+        thing.delete_attribute('b')
+        yield thing.save()
+        reloaded = yield db_manager.reload_object(thing)
+        self.assertDictEqual(reloaded.attributes, {
+            'a': {'nested': True}, 'c': 3, 'DOCKABLE_IDS': [41, 42]})
+        new_counter = yield db_manager.get_change_counter()
+        self.assertEqual(new_counter, counter + 1)
+
+        found = yield db_manager.find_ids_by_attributes({'DOCKABLE_IDS': [42]})
+        self.assertListEqual(found, [thing.id])
+        found = yield db_manager.find_ids_by_attributes({'DOCKABLE_IDS': []})
+        self.assertListEqual(found, [thing.id, other.id])
+
+        yield self.object_store.destroy_object(other)
+        reloaded = yield db_manager.reload_object(other)
+        self.assertIsNone(reloaded)
+
+
+#noinspection PyProtectedMember
+class SkeletonLoadTests(DottTestCase):
+    """
+    Testing of skeleton loads, and of the hydration that follows.
+    """
+
+    @inlineCallbacks
+    def test_skeleton_load(self):
+        """
+        Skeleton loads leave out descriptions and attributes, which are
+        then filled in on demand or by the background hydration task.
+        """
+
+        room = yield self.object_store.create_object(
+            settings.ROOM_PARENT, name='Room', description='A room.')
+        thing = yield self.object_store.create_object(
+            settings.THING_PARENT,
+            location_id=room.id,
+            description='A thing.',
+            attributes={'color': 'red'},
+            name='Thing')
+
+        self.patch(settings, 'SKELETON_OBJECT_LOAD', True)
+        # Make the streaming load take more than one batch.
+        self.patch(settings, 'OBJECT_LOAD_BATCH_SIZE', 1)
+        yield self.recreate_object_store()
+        room = self.object_store.get_object(room.id)
+        thing = self.object_store.get_object(thing.id)
+        self.assertFalse(self.object_store.is_fully_hydrated)
+        self.assertFalse(room.is_hydrated)
+        self.assertIsNone(room.description)
+        self.assertListEqual(self.object_store.get_object_contents(room), [thing])
+
+        # Saving a skeleton hydrates it first, so nothing is lost.
+        room.name = 'Renamed room'
+        yield room.save()
+        self.assertTrue(room.is_hydrated)
+        room = yield self.object_store.reload_object(room)
+        self.assertEqual(room.description, 'A room.')
+
+        yield self.object_store._hydration_task.whenDone()
+        self.assertTrue(self.object_store.is_fully_hydrated)
+        self.assertEqual(thing.description, 'A thing.')
+        self.assertDictEqual(thing.attributes, {'color': 'red'})
+
+
+class PayloadCacheTests(DottTestCase):
+    """
+    Testing of bounded-memory mode.
+    """
+
+    @inlineCallbacks
+    def test_payload_cache(self):
+        """
+        In bounded-memory mode, least recently used payloads are dropped,
+        unless they have unsaved changes.
+        """
+
+        thing_ids = []
+        for num in range(3):
+            thing = yield self.object_store.create_object(
+                settings.THING_PARENT,
+                description='Thing %d.' % num,
+                name='Thing %d' % num)
+            thing_ids.append(thing.id)
+
+        self.patch(settings, 'OBJECT_PAYLOAD_CACHE_SIZE', 2)
+        yield self.recreate_object_store()
+        thing1, thing2, thing3 = [
+            self.object_store.get_object(obj_id) for obj_id in thing_ids]
+
+        yield self.object_store.hydrate_objects([thing1])
+        yield self.object_store.hydrate_objects([thing2])
+        yield self.object_store.hydrate_objects([thing1])
+        yield self.object_store.hydrate_objects([thing3])
+        # thing2 was the least recently used.
+        self.assertFalse(thing2.is_hydrated)
+        self.assertIsNone(thing2.description)
+        self.assertEqual(thing1.description, 'Thing 0.')
+        self.assertEqual(thing3.description, 'Thing 2.')
+        self.assertDictEqual(self.object_store.get_payload_cache_stats(), {
+            'size': 2, 'max_size': 2, 'hits': 1, 'misses': 3, 'evictions': 1,
+        })
+
+        # Unsaved changes keep thing1 around, even though it's the oldest.
+        thing1.description = 'Changed.'
+        yield self.object_store.hydrate_objects([thing2])
+        self.assertEqual(thing1.description, 'Changed.')
+        self.assertFalse(thing3.is_hydrated)
+
+        # Once saved, it's fair game again.
+        yield thing1.save()
+        yield self.object_store.hydrate_objects([thing3])
+        self.assertFalse(thing2.is_hydrated)
+        yield self.object_store.hydrate_objects([thing2, thing3])
+        self.assertFalse(thing1.is_hydrated)
+        yield self.object_store.hydrate_objects([thing1])
+        self.assertEqual(thing1.description, 'Changed.')
+
+        # So do changes made to the attributes dict directly.
+        thing2.attributes['color'] = 'green'
+        yield self.object_store.hydrate_objects([thing3])
+        yield self.object_store.hydrate_objects([thing1])
+        self.assertTrue(thing2.is_hydrated)
+        yield thing2.save()
+        thing2 = yield self.object_store.reload_object(thing2)
+        self.assertDictEqual(thing2.attributes, {'color': 'green'})
+
+
+class SnapshotTests(DottTestCase):
+    """
+    Testing of object store snapshots.
+    """
+
+    @inlineCallbacks
+    def setUp(self):
+        yield super(SnapshotTests, self).setUp()
+
+        snapshot_fd, self.snapshot_path = tempfile.mkstemp()
+        os.close(snapshot_fd)
+        self.addCleanup(os.remove, self.snapshot_path)
+        self.patch(settings, 'TEST_OBJECT_SNAPSHOT_FILE', self.snapshot_path)
+        yield self.recreate_object_store()
+
+    @inlineCallbacks
+    def test_snapshot(self):
+        """
+        Snapshots can be loaded in place of the DB, until the DB changes.
+        """
+
+        room = yield self.object_store.create_object(
+            settings.ROOM_PARENT, name='Room', description='A room.')
+        thing = yield self.object_store.create_object(
+            settings.THING_PARENT,
+            location_id=room.id,
+            aliases=['widget'],
+            attributes={'color': 'red'},
+            name='Thing')
+
+        # Unsaved changes would be stamped with a counter that doesn't
+        # cover them, so nothing is written.
+        thing.name = 'Unsaved'
+        yield self.object_store.write_snapshot()
+        self.assertEqual(os.path.getsize(self.snapshot_path), 0)
+
+        thing.name = 'Thing'
+        yield thing.save()
+        yield self.object_store.write_snapshot()
+
+        loaded = {}
+        def loader_func(obj):
+            loaded[obj.id] = obj
+        was_loaded = yield self.object_store.load_objects_from_snapshot(loader_func)
+        self.assertTrue(was_loaded)
+        self.assertEqual(loaded[room.id].description, 'A room.')
+        self.assertEqual(loaded[thing.id].location_id, room.id)
+        self.assertListEqual(loaded[thing.id].aliases, ['widget'])
+        self.assertDictEqual(loaded[thing.id].attributes, {'color': 'red'})
+        self.assertEqual(loaded[thing.id].created_time, thing.created_time)
+
+        # Writes that didn't go through the store may not be reflected in
+        # memory, so the snapshot is skipped, and the old one goes stale.
+        snapshot_counter = snapshot.read_snapshot_counter(self.snapshot_path)
+        thing.name = 'Renamed Elsewhere'
+        yield self.object_store.db_manager.save_object(thing)
+        yield self.object_store.write_snapshot()
+        self.assertEqual(
+            snapshot.read_snapshot_counter(self.snapshot_path), snapshot_counter)
+        was_loaded = yield self.object_store.load_objects_from_snapshot(loader_func)
+        self.assertFalse(was_loaded)
+
+        # Any change to the DB makes the snapshot stale.
+        thing.name = 'Renamed'
+        yield thing.save()
+        was_loaded = yield self.object_store.load_objects_from_snapshot(loader_func)
+        self.assertFalse(was_loaded)
+
+
+class WriteBehindTests(DottTestCase):
+    """
+    Testing of write-behind mode.
+    """
+
+    @inlineCallbacks
+    def setUp(self):
+        yield super(WriteBehindTests, self).setUp()
+
+        # Long enough that only the tests' own flushes run.
+        self.patch(settings, 'WRITE_BEHIND_INTERVAL', 60)
+        yield self.recreate_object_store()
+
+    @inlineCallbacks
+    def test_write_behind(self):
+        """
+        In write-behind mode, saves are queued and coalesced until the
+        next flush.
+        """
+
+        room1 = yield self.object_store.create_object(settings.ROOM_PARENT, name='Room 1')
+        room2 = yield self.object_store.create_object(settings.ROOM_PARENT, name='Room 2')
+        thing = yield self.object_store.create_object(
+            settings.THING_PARENT, location_id=room1.id, name='Thing')
+
+        thing.set_location(room2)
+        yield thing.save()
+        thing.description = 'Moved twice.'
+        yield thing.save()
+        yield room1.save()
+        stats = self.object_store.get_write_behind_stats()
+        self.assertEqual(stats['queue_depth'], 2)
+        self.assertEqual(stats['coalesced_saves'], 1)
+
+        # Nothing has hit the DB yet.
+        reloaded = yield self.object_store.db_manager.reload_object(thing)
+        self.assertEqual(reloaded.location_id, room1.id)
+
+        yield self.object_store.flush_pending_saves()
+        reloaded = yield self.object_store.db_manager.reload_object(thing)
+        self.assertEqual(reloaded.location_id, room2.id)
+        self.assertEqual(reloaded.description, 'Moved twice.')
+        stats = self.object_store.get_write_behind_stats()
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertEqual(stats['flushes'], 1)
+        self.assertEqual(stats['objects_flushed'], 2)
+
+    @inlineCallbacks
+    def test_write_behind_failures(self):
+        """
+        One object that can't be written doesn't hold up the rest of its
+        batch, and is dropped after failing too many flushes in a row.
+        """
+
+        snapshot_fd, snapshot_path = tempfile.mkstemp()
+        os.close(snapshot_fd)
+        self.addCleanup(os.remove, snapshot_path)
+        self.patch(settings, 'TEST_OBJECT_SNAPSHOT_FILE', snapshot_path)
+        self.patch(settings, 'WRITE_BEHIND_MAX_ATTEMPTS', 2)
+        yield self.recreate_object_store()
+
+        room = yield self.object_store.create_object(settings.ROOM_PARENT, name='Room')
+        good = yield self.object_store.create_object(settings.THING_PARENT, name='Good')
+        bad = yield self.object_store.create_object(settings.THING_PARENT, name='Bad')
+
+        db_manager = self.object_store.db_manager
+        save_objects = db_manager.save_objects
+        def failing_save_objects(objects):
+            if bad in objects:
+                raise ValueError('Bad row.')
+            return save_objects(objects)
+        self.patch(db_manager, 'save_objects', failing_save_objects)
+
+        good.set_location(room)
+        yield good.save()
+        bad.set_location(room)
+        yield bad.save()
+        all_written = yield self.object_store.flush_pending_saves()
+        self.assertFalse(all_written)
+        reloaded = yield db_manager.reload_object(good)
+        self.assertEqual(reloaded.location_id, room.id)
+        stats = self.object_store.get_write_behind_stats()
+        self.assertEqual(stats['queue_depth'], 1)
+
+        # Nothing can be snapshotted while the write is pending.
+        yield self.object_store.write_snapshot()
+        self.assertEqual(os.path.getsize(snapshot_path), 0)
+
+        all_written = yield self.object_store.flush_pending_saves()
+        self.assertTrue(all_written)
+        stats = self.object_store.get_write_behind_stats()
+        self.assertEqual(stats['queue_depth'], 0)
+        self.assertEqual(stats['dropped_writes'], 1)
+
+
+class JournalTests(DottTestCase):
+    """
+    Testing of the mutation journal, in write-behind mode.
+    """
+
+    @inlineCallbacks
+    def setUp(self):
+        yield super(JournalTests, self).setUp()
+
+        journal_fd, self.journal_path = tempfile.mkstemp()
+        os.close(journal_fd)
+        self.addCleanup(os.remove, self.journal_path)
+        # Long enough that only the tests' own flushes run.
+        self.patch(settings, 'WRITE_BEHIND_INTERVAL', 60)
+        self.patch(settings, 'TEST_OBJECT_JOURNAL_FILE', self.journal_path)
+        self.patch(settings, 'OBJECT_JOURNAL_SYNC_DELAY', 0)
+        yield self.recreate_object_store()
+
+    @inlineCallbacks
+    def test_journal(self):
+        """
+        When journaling, saves and destroys return once they're in the
+        journal. Whatever didn't make it into the DB is replayed from the
+        journal on the next start-up.
+        """
+
+        room = yield self.object_store.create_object(settings.ROOM_PARENT, name='Room')
+        doomed = yield self.object_store.create_object(settings.THING_PARENT, name='Doomed')
+        thing = yield self.object_store.create_object(
+            settings.THING_PARENT,
+            location_id=room.id,
+            attributes={'color': 'red'},
+            name='Thing')
+        # New objects are inserted straight away, since their IDs may be
+        # stored elsewhere, like on an account.
+        reloaded = yield self.object_store.db_manager.reload_object(thing)
+        self.assertEqual(reloaded.name, 'Thing')
+
+        thing.set_attribute('color', 'blue')
+        yield thing.save()
+        room.description = 'Journaled.'
+        yield room.save()
+        yield doomed.destroy()
+        # Destroys get the same checks as the DB's foreign keys.
+        yield self.assertFailure(room.destroy(), ObjectIsReferenced)
+        self.assertEqual(len(read_records(self.journal_path)), 3)
+        self.assertEqual(self.object_store.get_journal_stats()['syncs'], 3)
+        # Nothing else has hit the DB yet.
+        reloaded = yield self.object_store.db_manager.reload_object(thing)
+        self.assertDictEqual(reloaded.attributes, {'color': 'red'})
+
+        # Simulate a crash, with half of a record written at the end, and
+        # start up a new store.
+        yield self.object_store.close()
+        with open(self.journal_path, 'ab') as journal_file:
+            journal_file.write('\x00\x00\x01')
+        yield self.recreate_object_store()
+        self.assertEqual(self.object_store.get_journal_stats()['size'], 0)
+
+        reloaded = yield self.object_store.db_manager.reload_object(thing)
+        self.assertEqual(reloaded.location_id, room.id)
+        self.assertDictEqual(reloaded.attributes, {'color': 'blue'})
+        reloaded = yield self.object_store.db_manager.reload_object(room)
+        self.assertEqual(reloaded.description, 'Journaled.')
+        reloaded = yield self.object_store.db_manager.reload_object(doomed)
+        self.assertIsNone(reloaded)
+        self.assertRaises(NoSuchObject, self.object_store.get_object, doomed.id)
+
+        # A successful flush empties the journal out, too.
+        thing = self.object_store.get_object(thing.id)
+        thing.name = 'Renamed'
+        yield thing.save()
+        self.assertNotEqual(self.object_store.get_journal_stats()['size'], 0)
+        yield self.object_store.flush_pending_saves()
+        self.assertEqual(self.object_store.get_journal_stats()['size'], 0)
+        reloaded = yield self.object_store.db_manager.reload_object(thing)
+        self.assertEqual(reloaded.name, 'Renamed')
+
+    @inlineCallbacks
+    def test_journal_failures(self):
+        """
+        A save that can't be written doesn't hold up the rest, and is kept
+        in the journal until it is. Journal errors are logged, rather than
+        stopping the flush loop.
+        """
+
+        db_manager = self.object_store.db_manager
+        save_objects = db_manager.save_objects
+        def failing_save_objects(objects):
+            if any(obj.name == 'Bad' for obj in objects):
+                raise ValueError('Bad row.')
+            return save_objects(objects)
+        self.patch(db_manager, 'save_objects', failing_save_objects)
+        good = yield self.object_store.create_object(settings.THING_PARENT, name='Good')
+        bad = yield self.object_store.create_object(settings.THING_PARENT, name='Bad')
+        good.description = 'Good.'
+        yield good.save()
+        bad.description = 'Bad.'
+        yield bad.save()
+        all_written = yield self.object_store.flush_pending_saves()
+        self.assertFalse(all_written)
+        reloaded = yield db_manager.reload_object(good)
+        self.assertEqual(reloaded.description, 'Good.')
+        self.assertListEqual(
+            [(op, obj_id) for op, obj_id, _ in read_records(self.journal_path)],
+            [(SAVE, bad.id)])
+
+        db_manager.save_objects = save_objects
+        all_written = yield self.object_store.flush_pending_saves()
+        self.assertTrue(all_written)
+        self.assertEqual(self.object_store.get_journal_stats()['size'], 0)
+        reloaded = yield db_manager.reload_object(bad)
+        self.assertEqual(reloaded.description, 'Bad.')
+
+        def failing_truncate_to(journal, position):
+            return fail(IOError('Disk full.'))
+        self.patch(MutationJournal, 'truncate_to', failing_truncate_to)
+        good.description = 'Still good.'
+        yield good.save()
+        all_written = yield self.object_store.flush_pending_saves()
+        self.assertFalse(all_written)
+        reloaded = yield db_manager.reload_object(good)
+        self.assertEqual(reloaded.description, 'Still good.')
+
 
 class ZoneTests(DottTestCase):
     """
@@ -113,6 +941,20 @@ class ZoneTests(DottTestCase):
         for member in members:
             self.assertTrue(member.id in member_ids)
 
+    def test_zone_index_follows_set_zone(self):
+        """
+        Changing an object's zone should immediately be reflected in
+        find_objects_in_zone(), before any save happens.
+        """
+
+        self.room2.zone = None
+        self.assertListEqual(
+            self.object_store.find_objects_in_zone(self.zmo), [self.room3])
+
+        self.room2.zone = self.room3
+        self.assertListEqual(
+            self.object_store.find_objects_in_zone(self.room3), [self.room2])
+
     @inlineCallbacks
     def test_zmo_razing(self):
         """
@@ -131,6 +973,68 @@ class ZoneTests(DottTestCase):
         self.assertRaises(NoSuchObject, self.object_store.get_object, self.room2.id)
         self.assertRaises(NoSuchObject, self.object_store.get_object, self.room3.id)
 
+    @requires_postgres
+    @inlineCallbacks
+    def test_zmo_razing_cascades(self):
+        """
+        Razing takes exits leading into the zone along with it, and refuses
+        to leave objects zoned to a razed object behind.
+        """
+
+        outside = yield self.object_store.create_object(settings.ROOM_PARENT, name='Outside')
+        inbound_exit = yield self.object_store.create_object(
+            settings.EXIT_PARENT,
+            location_id=outside.id,
+            destination_id=self.room2.id,
+            name='Inbound')
+        nested = yield self.object_store.create_object(
+            settings.THING_PARENT,
+            location_id=outside.id,
+            zone_id=self.room3.id,
+            name='Nested')
+
+        yield self.assertFailure(
+            self.object_store.raze_zone(self.zmo), ObjectHasZoneMembers)
+        self.assertEqual(self.object_store.get_object(self.room2.id), self.room2)
+
+        yield self.object_store.empty_out_zone(self.room3)
+        reloaded = yield self.object_store.db_manager.reload_object(nested)
+        self.assertEqual(reloaded.zone_id, None)
+
+        deleted_ids = yield self.object_store.raze_zone(self.zmo)
+        self.assertListEqual(
+            deleted_ids, [self.room2.id, self.room3.id, self.zmo.id])
+        self.assertRaises(
+            NoSuchObject, self.object_store.get_object, inbound_exit.id)
+        self.assertListEqual(self.object_store.get_object_contents(outside), [nested])
+        results = yield self.object_store.db_manager._db.runQuery(
+            "SELECT id FROM dott_objects ORDER BY id")
+        self.assertListEqual(
+            [row[0] for row in results], [outside.id, nested.id])
+
+    @inlineCallbacks
+    def test_zmo_razing_refuses_contents(self):
+        """
+        Razing won't leave objects inside a room that no longer exists.
+        """
+
+        outside = yield self.object_store.create_object(settings.ROOM_PARENT, name='Outside')
+        visitor = yield self.object_store.create_object(
+            settings.THING_PARENT,
+            location_id=self.room2.id,
+            name='Visitor')
+
+        yield self.assertFailure(
+            self.object_store.raze_zone(self.zmo), ObjectIsReferenced)
+        self.assertEqual(self.object_store.get_object(self.room2.id), self.room2)
+
+        visitor.set_location(outside)
+        yield visitor.save()
+        yield self.object_store.raze_zone(self.zmo)
+        self.assertRaises(NoSuchObject, self.object_store.get_object, self.room2.id)
+        reloaded = yield self.object_store.db_manager.reload_object(visitor)
+        self.assertEqual(reloaded.location_id, outside.id)
+
     @inlineCallbacks
     def test_zmo_emptying(self):
         """
@@ -0,0 +1,172 @@
+"""
+Bookkeeping for the object store's write-behind mode, where saves are
+queued up and written to the DB in batches, rather than one at a time.
+When the store keeps a journal, destroys are queued too.
+"""
+
+
+class WriteBehindQueue(object):
+    """
+    Tracks the IDs of objects that are waiting to be written to the DB.
+    Saving an object that is already queued doesn't add another write, so
+    an object that moves ten times between flushes is only written once.
+    The actual writing is left to the :py:class:`ObjectStore`.
+    """
+
+    def __init__(self):
+        self._pending_ids = set()
+        # Destroyed objects that need deleting. Only journaled stores queue
+        # these.
+        self._pending_destroy_ids = set()
+        # Keys are object IDs, values are how many flushes in a row have
+        # failed to write them.
+        self._failure_counts = {}
+        # Number of save() calls, and how many of those were folded into a
+        # write that was already queued.
+        self.saves = 0
+        self.coalesced_saves = 0
+        self.flushes = 0
+        self.objects_flushed = 0
+        # Writes that were given up on after failing too many times.
+        self.dropped_writes = 0
+        # Wall clock times, in seconds.
+        self.last_flush_time = 0.0
+        self.max_flush_time = 0.0
+        self.total_flush_time = 0.0
+
+    def __contains__(self, obj_id):
+        return obj_id in self._pending_ids
+
+    def __len__(self):
+        return len(self._pending_ids) + len(self._pending_destroy_ids)
+
+    def add(self, obj_id):
+        """
+        Queues an object to be written on the next flush.
+
+        :param int obj_id: The ID of the object to write.
+        """
+
+        self.saves += 1
+        if obj_id in self:
+            self.coalesced_saves += 1
+        else:
+            self._pending_ids.add(obj_id)
+
+    def add_destroy(self, obj_id):
+        """
+        Queues an object to be deleted on the next flush. Any writes that
+        were queued for it are dropped.
+
+        :param int obj_id: The ID of the object to delete.
+        """
+
+        self._pending_ids.discard(obj_id)
+        self._pending_destroy_ids.add(obj_id)
+
+    def discard(self, obj_id):
+        """
+        Drops any writes of an object from the queue.
+
+        :param int obj_id: The ID of the object to forget about.
+        """
+
+        self._pending_ids.discard(obj_id)
+
+    def pop_all(self):
+        """
+        Empties the queue out.
+
+        :rtype: tuple
+        :returns: The IDs of the objects that were queued to be saved, and
+            deleted, as a tuple of two sets.
+        """
+
+        pending = (self._pending_ids, self._pending_destroy_ids)
+        self._pending_ids = set()
+        self._pending_destroy_ids = set()
+        return pending
+
+    def requeue(self, obj_ids, destroy_ids=()):
+        """
+        Puts objects back in the queue after a failed flush.
+
+        :param iterable obj_ids: The IDs of the objects to re-queue saves of.
+        :keyword iterable destroy_ids: The IDs of the objects to re-queue
+            deletes of.
+        """
+
+        self._pending_ids.update(obj_ids)
+        self._pending_destroy_ids.update(destroy_ids)
+
+    def record_failure(self, obj_id):
+        """
+        Notes that a flush failed to write an object.
+
+        :param int obj_id: The ID of the object that couldn't be written.
+        :rtype: int
+        :returns: How many flushes in a row have failed to write it.
+        """
+
+        self._failure_counts[obj_id] = self._failure_counts.get(obj_id, 0) + 1
+        return self._failure_counts[obj_id]
+
+    def record_success(self, obj_ids):
+        """
+        Notes that objects were written, which resets their failure counts.
+
+        :param iterable obj_ids: The IDs of the objects that were written.
+        """
+
+        if not self._failure_counts:
+            return
+        for obj_id in obj_ids:
+            self._failure_counts.pop(obj_id, None)
+
+    def record_dropped(self, obj_id):
+        """
+        Notes that a write was given up on, rather than re-queued.
+
+        :param int obj_id: The ID of the object that wasn't written.
+        """
+
+        self._failure_counts.pop(obj_id, None)
+        self.dropped_writes += 1
+
+    def record_flush(self, num_objects, flush_time):
+        """
+        Updates the flush metrics.
+
+        :param int num_objects: The number of objects that were written.
+        :param float flush_time: How long the flush took, in seconds.
+        """
+
+        self.flushes += 1
+        self.objects_flushed += num_objects
+        self.last_flush_time = flush_time
+        self.max_flush_time = max(self.max_flush_time, flush_time)
+        self.total_flush_time += flush_time
+
+    def get_stats(self):
+        """
+        :rtype: dict
+        :returns: The current queue depth, plus save, flush, dropped write,
+            and flush latency figures since start-up.
+        """
+
+        if self.flushes:
+            avg_flush_time = self.total_flush_time / self.flushes
+        else:
+            avg_flush_time = 0.0
+
+        return {
+            'queue_depth': len(self),
+            'saves': self.saves,
+            'coalesced_saves': self.coalesced_saves,
+            'flushes': self.flushes,
+            'objects_flushed': self.objects_flushed,
+            'dropped_writes': self.dropped_writes,
+            'last_flush_time': self.last_flush_time,
+            'max_flush_time': self.max_flush_time,
+            'avg_flush_time': avg_flush_time,
+        }
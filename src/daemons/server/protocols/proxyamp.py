@@ -424,19 +424,29 @@ class ProxyAMP(amp.AMP):
 
         # The root MudService instance.
         service = self.factory._mud_service
+        object_store = service.object_store
 
-        if controlling_id == -1:
-            # Create the new PlayerObject.
-            player_obj = yield service.object_store.create_object(
-                'src.game.parents.base_objects.player.PlayerObject',
-                name=username,
-                originally_controlled_by_account_id=account_id,
-                controlled_by_account_id=account_id,
-                location_id=settings.NEW_PLAYER_LOCATION_ID,
-            )
-            returnValue({'object_id': player_obj.id})
-        else:
+        if controlling_id != -1 and object_store.object_exists(controlling_id):
             returnValue({'object_id': controlling_id})
+
+        # The account has no valid object to control. Before creating a new
+        # PlayerObject, see if the account already has one.
+        existing_players = object_store.find(
+            base_type='player',
+            controlled_by_account=account_id,
+        )
+        if existing_players:
+            returnValue({'object_id': existing_players[0].id})
+
+        # Create the new PlayerObject.
+        player_obj = yield object_store.create_object(
+            'src.game.parents.base_objects.player.PlayerObject',
+            name=username,
+            originally_controlled_by_account_id=account_id,
+            controlled_by_account_id=account_id,
+            location_id=settings.NEW_PLAYER_LOCATION_ID,
+        )
+        returnValue({'object_id': player_obj.id})
     OnSessionConnectToObjectCmd.responder(
         on_session_connect_to_object_command
     )
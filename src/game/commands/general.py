@@ -4,6 +4,8 @@ General commands that are available to everyone.
 
 import json
 
+from twisted.internet.defer import inlineCallbacks
+
 import settings
 from src.daemons.server.commands.command import BaseCommand
 from src.daemons.server.commands.exceptions import CommandError
@@ -18,6 +20,7 @@ class CmdExamine(BaseCommand):
     name = 'examine'
     aliases = ['ex', 'exa']
 
+    @inlineCallbacks
     def func(self, invoker, parsed_cmd):
 
         if not parsed_cmd.arguments:
@@ -37,6 +40,8 @@ class CmdExamine(BaseCommand):
         if not obj_match:
             raise CommandError('No matching object found.')
 
+        # The match may be anywhere, not just near the invoker.
+        yield self.hydrate_targets(invoker, obj_match)
         appearance = self.get_appearance(obj_match, invoker)
 
         invoker.emit_to(appearance)
@@ -78,9 +83,10 @@ class CmdExamine(BaseCommand):
         if obj.internal_description:
             attributes_str += ' Internal Description: %s\n' % obj.internal_description
 
-        if obj.attributes:
+        attributes = obj.get_attributes()
+        if attributes:
             attributes_str += '\n### ATTRIBUTES ###\n'
-            attributes_str += json.dumps(obj.attributes, indent=3)
+            attributes_str += json.dumps(attributes, indent=3)
 
         name = obj.get_appearance_name(invoker=invoker)
         return "%s\n%s" % (name, attributes_str)
@@ -63,7 +63,7 @@ class CmdFind(BaseCommand):
         if search_str.strip() == '':
             raise CommandError('@find requires a name to search for.')
 
-        # Performs a global fuzzy name match. Returns a generator.
+        # Performs a global fuzzy name match. Returns the best matches.
         matches = mud_service.object_store.global_name_search(search_str)
 
         # Buffer for returning everything at once.
@@ -670,7 +670,7 @@ class CmdSet(BaseCommand):
         except ValueError:
             raise CommandError('Invalid JSON value.')
 
-        target_obj.attributes[attr_name] = json_value
+        target_obj.set_attribute(attr_name, json_value)
         yield target_obj.save()
 
         invoker.emit_to(
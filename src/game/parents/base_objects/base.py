@@ -2,6 +2,8 @@
 Contains base level parents that aren't to be used directly.
 """
 
+import json
+
 from twisted.internet.defer import inlineCallbacks, returnValue
 from fuzzywuzzy.process import QRatio
 from fuzzywuzzy import utils as fuzz_utils
@@ -9,6 +11,7 @@ from fuzzywuzzy import utils as fuzz_utils
 from src.daemons.server.ansi import ANSI_HILITE, ANSI_NORMAL
 from src.daemons.server.objects.exceptions import ObjectHasZoneMembers, NoSuchObject
 from src.daemons.server.protocols.proxyamp import EmitToObjectCmd
+from src.utils.general import intern_str
 
 
 #noinspection PyShadowingBuiltins
@@ -18,18 +21,38 @@ class BaseObject(object):
     Things are all considered objects. Behaviors here are very low level.
     """
 
+    # There can be hundreds of thousands of objects in memory, so we skip the
+    # per-instance __dict__. Sub-classes need to declare an empty __slots__
+    # to keep this benefit, and must add any new instance attributes here.
+    __slots__ = (
+        'mud_service', 'id', '_name', '_description', '_internal_description',
+        '_parent', 'location_id', 'destination_id', 'zone_id', '_aliases',
+        '_normalized_name', '_lowercase_aliases',
+        '_originally_controlled_by_account_id', '_controlled_by_account_id',
+        '_attributes', '_raw_attributes', 'created_time', '_hydrated',
+        '_dirty_fields',
+    )
+
+    # The fields that are left out of skeleton loads. See hydrate().
+    PAYLOAD_FIELDS = frozenset(['description', 'internal_description', 'attributes'])
+
     # Holds this object's command table. Any objects inside of this object
     # will check this for command matches before the global table.
     local_command_table = None
     # Same as above, but for admin-only commands.
     local_admin_command_table = None
+    # Attribute names whose values the object store should index, so that
+    # ObjectStore.find() can query them without scanning. Sub-classes
+    # should extend their parent's tuple rather than replace it. List values
+    # are indexed by each of their members. Indexes are updated on save().
+    indexed_attributes = ()
 
     def __init__(self, mud_service, id, parent, name, description=None,
                  internal_description=None,
                  location_id=None, destination_id=None, zone_id=None,
                  aliases=None, originally_controlled_by_account_id=None,
                  controlled_by_account_id=None, attributes=None,
-                 created_time=None):
+                 raw_attributes=None, created_time=None, hydrated=True):
         """
         :param MudService mud_service: The MudService class running the game.
         :param int id: A unique ID for the object, or None if this is
@@ -50,8 +73,14 @@ class BaseObject(object):
         :keyword dict kwargs: All objects are instantiated with the values from
             the DB as kwargs. Since the DB representation of all of an
             objects attributes is just a dict, this works really well.
+        :keyword str raw_attributes: The attributes as un-decoded JSON text.
+            Ignored if ``attributes`` is passed. This is decoded the first
+            time the ``attributes`` property is accessed.
         :keyword datetime.datetime created_time: The time the object was
             created.
+        :keyword bool hydrated: If False, this object was loaded as a
+            skeleton, without its descriptions or attributes. See
+            :py:meth:`hydrate`.
         """
 
         self.mud_service = mud_service
@@ -59,22 +88,35 @@ class BaseObject(object):
         # This mirrors the 'id' field in dott_objects. If this is set to None
         # and the instance is saved, an insert is done.
         self.id = id
-        self.name = name
-        self.description = description
-        self.internal_description = internal_description
-        self.parent = parent
+        self._name = name
+        self._description = description
+        self._internal_description = internal_description
+        # There are only a handful of distinct parents, share the strings.
+        self._parent = intern_str(parent)
         self.location_id = location_id
         self.destination_id = destination_id
         self.zone_id = zone_id
-        self.aliases = aliases or []
-        self.originally_controlled_by_account_id = originally_controlled_by_account_id
-        self.controlled_by_account_id = controlled_by_account_id
+        self._aliases = self._intern_aliases(aliases)
+        # Lazily calculated, normalized forms of the name and aliases. These
+        # are cleared whenever the name or aliases are changed.
+        self._normalized_name = None
+        self._lowercase_aliases = None
+        self._originally_controlled_by_account_id = originally_controlled_by_account_id
+        self._controlled_by_account_id = controlled_by_account_id
         # This stores all of the object's data. This includes core and
-        # userspace attributes.
-        self._attributes = attributes or {}
+        # userspace attributes. Most objects have none, so an empty dict is
+        # only created when the attributes are first accessed.
+        self._attributes = attributes or None
+        self._raw_attributes = None if attributes else raw_attributes
         self.created_time = created_time
+        self._hydrated = hydrated
+        # The names of the DB columns that have changed since the object was
+        # last loaded or saved. None if nothing has changed.
+        self._dirty_fields = None
 
-        assert isinstance(self._attributes, dict)
+        assert self._attributes is None or isinstance(self._attributes, dict)
+        assert self._raw_attributes is None or \
+            isinstance(self._raw_attributes, basestring)
 
     def __str__(self):
         return "<%s: %s (#%d)>" % (self.__class__.__name__, self.name, self.id)
@@ -136,6 +178,7 @@ class BaseObject(object):
         :type obj_or_id: A ``BaseObject`` sub-class or an ``int``.
         """
 
+        self.mark_dirty(attrib_name)
         if isinstance(obj_or_id, int):
             # Already an int, assume this is an object ID.
             setattr(self, attrib_name, obj_or_id)
@@ -148,16 +191,429 @@ class BaseObject(object):
             # Looks like a BaseObject sub-class. Grab the object ID.
             setattr(self, attrib_name, obj_or_id.id)
 
+    def get_name(self):
+        """
+        :rtype: str
+        :returns: The object's name.
+        """
+
+        return self._name
+
+    def set_name(self, name):
+        """
+        Sets the object's name.
+
+        :param str name: The new name.
+        """
+
+        self._name = name
+        self._normalized_name = None
+        self.mark_dirty('name')
+        self._object_store.reindex_object(self, 'name_trigram')
+
+    name = property(get_name, set_name)
+
+    def get_parent(self):
+        """
+        :rtype: str
+        :returns: The full Python path to the object's parent class.
+        """
+
+        return self._parent
+
+    def set_parent(self, parent):
+        """
+        Sets the object's parent. This doesn't take effect until the object
+        has been saved and re-loaded.
+
+        :param str parent: The full Python path to the new parent class.
+        """
+
+        self._parent = intern_str(parent)
+        # The base type comes from the parent class.
+        self.mark_dirty('parent', 'base_type')
+
+    parent = property(get_parent, set_parent)
+
+    def get_originally_controlled_by_account_id(self):
+        """
+        :rtype: int or None
+        :returns: The ID of the account that first controlled this object.
+        """
+
+        return self._originally_controlled_by_account_id
+
+    def set_originally_controlled_by_account_id(self, account_id):
+        """
+        :param account_id: The ID of the account that first controlled this
+            object.
+        :type account_id: int or None
+        """
+
+        self._originally_controlled_by_account_id = account_id
+        self.mark_dirty('originally_controlled_by_account_id')
+
+    originally_controlled_by_account_id = property(
+        get_originally_controlled_by_account_id,
+        set_originally_controlled_by_account_id)
+
+    def get_controlled_by_account_id(self):
+        """
+        :rtype: int or None
+        :returns: The ID of the account currently controlling this object.
+        """
+
+        return self._controlled_by_account_id
+
+    def set_controlled_by_account_id(self, account_id):
+        """
+        :param account_id: The ID of the account controlling this object.
+        :type account_id: int or None
+        """
+
+        self._controlled_by_account_id = account_id
+        self.mark_dirty('controlled_by_account_id')
+
+    controlled_by_account_id = property(
+        get_controlled_by_account_id, set_controlled_by_account_id)
+
+    @staticmethod
+    def _intern_aliases(aliases):
+        """
+        :param list aliases: A list of aliases, or ``None``.
+        :rtype: tuple
+        :returns: The aliases as a tuple of interned strings.
+        """
+
+        if not aliases:
+            return ()
+        return tuple(intern_str(alias) for alias in aliases)
+
+    def get_aliases(self):
+        """
+        .. note:: This is a new list on every call, so modifying it in place
+            does nothing. Set a new list of aliases instead.
+
+        :rtype: list
+        :returns: The object's aliases.
+        """
+
+        return list(self._aliases)
+
+    def set_aliases(self, aliases):
+        """
+        Sets the object's aliases.
+
+        :param list aliases: The new list of aliases.
+        """
+
+        self._aliases = self._intern_aliases(aliases)
+        self._lowercase_aliases = None
+        self.mark_dirty('aliases')
+        self._object_store.reindex_object(
+            self, 'name_trigram', 'location_alias', 'exit_alias')
+
+    aliases = property(get_aliases, set_aliases)
+
+    def _get_description_field(self):
+        """
+        :rtype: str
+        :returns: The object's stored description. See
+            :py:meth:`get_description` for the one that is shown to players.
+        """
+
+        return self._description
+
+    def _set_description_field(self, description):
+        """
+        :param str description: The object's new description.
+        """
+
+        self._description = description
+        self.mark_dirty('description')
+
+    description = property(_get_description_field, _set_description_field)
+
+    def _get_internal_description_field(self):
+        """
+        :rtype: str
+        :returns: The object's stored internal description.
+        """
+
+        return self._internal_description
+
+    def _set_internal_description_field(self, internal_description):
+        """
+        :param str internal_description: The object's new internal description.
+        """
+
+        self._internal_description = internal_description
+        self.mark_dirty('internal_description')
+
+    internal_description = property(
+        _get_internal_description_field, _set_internal_description_field)
+
+    @property
+    def normalized_name(self):
+        """
+        The object's name, run through fuzzywuzzy's processing (lower-cased,
+        punctuation stripped). Calculated once and cached until the name
+        changes.
+
+        :rtype: str
+        """
+
+        if self._normalized_name is None:
+            self._normalized_name = fuzz_utils.full_process(self._name or '')
+        return self._normalized_name
+
+    @property
+    def lowercase_aliases(self):
+        """
+        The object's aliases, lower-cased. Calculated once and cached until
+        the aliases change.
+
+        :rtype: frozenset
+        """
+
+        if self._lowercase_aliases is None:
+            self._lowercase_aliases = frozenset(
+                alias.lower() for alias in self._aliases)
+        return self._lowercase_aliases
+
     @property
     def attributes(self):
         """
-        Redirects to the object's attributes dict.
+        Redirects to the object's attributes dict. If the object was loaded
+        with raw JSON attributes, they are decoded here.
+
+        .. note:: Since changes to the dict can't be seen, the next save
+            writes all of the attributes out. Use :py:meth:`get_attribute`
+            and :py:meth:`set_attribute` to only write the keys that change,
+            or :py:meth:`get_attributes` to just read them.
+
+        :rtype: dict
+        """
+
+        attributes = self._get_attributes_dict()
+        # We can't see changes made to the dict, so assume the worst.
+        self.mark_dirty('attributes')
+        return attributes
+
+    def get_attributes(self):
+        """
+        Reads all of the attributes, without marking them as changed.
 
         :rtype: dict
+        :returns: A copy of the attributes dict. Changes made to it aren't
+            saved.
         """
 
+        return dict(self._get_attributes_dict())
+
+    def _get_attributes_dict(self):
+        """
+        :rtype: dict
+        :returns: The attributes dict, decoding it first if need be.
+        """
+
+        if self._attributes is None:
+            if self._raw_attributes:
+                self._attributes = json.loads(self._raw_attributes) or {}
+            else:
+                self._attributes = {}
+            # The dict may be modified from here on out, so the raw text
+            # can no longer be trusted.
+            self._raw_attributes = None
         return self._attributes
 
+    def get_attribute(self, attr_name, default=None):
+        """
+        Reads a single attribute, without marking the attributes as changed.
+
+        :param str attr_name: The attribute to read.
+        :keyword default: Returned if the attribute isn't set.
+        :returns: The attribute's value, or ``default``.
+        """
+
+        return self._get_attributes_dict().get(attr_name, default)
+
+    def set_attribute(self, attr_name, value):
+        """
+        Sets a single attribute. Only this key is written on the next save,
+        rather than the whole attributes document.
+
+        :param str attr_name: The attribute to set.
+        :param value: Any JSON-serializable value.
+        """
+
+        self._get_attributes_dict()[attr_name] = value
+        self.mark_dirty(('attributes', attr_name))
+
+    def delete_attribute(self, attr_name):
+        """
+        Removes a single attribute, if it is set. As with
+        :py:meth:`set_attribute`, only this key is written on the next save.
+
+        :param str attr_name: The attribute to remove.
+        """
+
+        self._get_attributes_dict().pop(attr_name, None)
+        self.mark_dirty(('attributes', attr_name))
+
+    @property
+    def is_hydrated(self):
+        """
+        :rtype: bool
+        :returns: False if this object was loaded as a skeleton, and hasn't
+            had its descriptions and attributes filled in yet.
+        """
+
+        return self._hydrated
+
+    def hydrate(self, description=None, internal_description=None,
+                attributes=None, raw_attributes=None):
+        """
+        Fills in the fields that are left out of a skeleton load. Anything
+        that was set on the object in the meantime wins out over the
+        values passed in here. Does nothing for objects that are already
+        hydrated.
+
+        :keyword str description: The object's description.
+        :keyword str internal_description: The object's internal description.
+        :keyword dict attributes: The object's decoded attributes.
+        :keyword str raw_attributes: The object's attributes as JSON text.
+            Ignored if ``attributes`` is passed.
+        """
+
+        if self._hydrated:
+            return
+
+        dirty_fields = self._dirty_fields or ()
+        if 'description' not in dirty_fields:
+            self._description = description
+        if 'internal_description' not in dirty_fields:
+            self._internal_description = internal_description
+
+        if self._attributes is None:
+            self._attributes = attributes or None
+            self._raw_attributes = None if attributes else raw_attributes
+        else:
+            # Attributes were accessed before we got here. Lay any changes
+            # on top of what was in the DB.
+            if attributes is None and raw_attributes:
+                attributes = json.loads(raw_attributes)
+            merged = attributes or {}
+            merged.update(self._attributes)
+            # Keys removed via delete_attribute() stay removed.
+            for field in dirty_fields:
+                if isinstance(field, tuple) and field[1] not in self._attributes:
+                    merged.pop(field[1], None)
+            self._attributes = merged
+
+        self._hydrated = True
+
+    def dehydrate(self):
+        """
+        Drops the object's descriptions and attributes, turning it back into
+        a skeleton. They can be loaded again through :py:meth:`hydrate`.
+        Objects with unsaved changes can't be dehydrated.
+        """
+
+        assert not self.is_payload_dirty, \
+            "Can't dehydrate an object with unsaved changes: %s" % self.id
+
+        self._description = None
+        self._internal_description = None
+        self._attributes = None
+        self._raw_attributes = None
+        self._hydrated = False
+
+    @property
+    def is_dirty(self):
+        """
+        :rtype: bool
+        :returns: True if any of the object's fields have changed since it
+            was last loaded or saved.
+        """
+
+        return bool(self._dirty_fields)
+
+    @property
+    def is_payload_dirty(self):
+        """
+        :rtype: bool
+        :returns: True if the object's descriptions or attributes may have
+            changed since they were last loaded or saved.
+        """
+
+        if not self._dirty_fields:
+            return False
+        return any(
+            field in self.PAYLOAD_FIELDS or isinstance(field, tuple)
+            for field in self._dirty_fields)
+
+    def mark_dirty(self, *fields):
+        """
+        Notes that some of the object's DB columns have changed, so that the
+        next save writes them out. The setters do this for you.
+
+        :param fields: The names of the changed columns. Individual
+            attributes are marked with an ``('attributes', attr_name)``
+            tuple, so only that key is written.
+        """
+
+        if self._dirty_fields is None:
+            self._dirty_fields = set()
+        self._dirty_fields.update(fields)
+
+    def mark_clean(self, *fields):
+        """
+        Notes that some of the object's DB columns have been written out by
+        something other than a save, like a set-based UPDATE.
+
+        :param str fields: The names of the columns that were written.
+        """
+
+        if self._dirty_fields:
+            self._dirty_fields.difference_update(fields)
+
+    def pop_dirty_fields(self):
+        """
+        Called when the object is about to be saved. The object is considered
+        clean from here on out, unless :py:meth:`mark_dirty` is called again.
+
+        :rtype: set
+        :returns: The names of the columns that have changed since the
+            object was last loaded or saved, plus ``('attributes', attr_name)``
+            tuples for individually changed attributes.
+        """
+
+        dirty_fields = self._dirty_fields or set()
+        self._dirty_fields = None
+        return dirty_fields
+
+    def get_serialized_attributes(self):
+        """
+        :rtype: str
+        :returns: The object's attributes as JSON text, for saving. If the
+            attributes were never decoded, this is the text they were
+            loaded from.
+        """
+
+        if self._raw_attributes is not None:
+            return self._raw_attributes
+        return json.dumps(self._attributes or {})
+
+    def get_raw_attributes(self):
+        """
+        :rtype: str or None
+        :returns: The JSON text this object's attributes were loaded from, if
+            the attributes haven't been accessed since. Otherwise, ``None``.
+        """
+
+        return self._raw_attributes
+
     def get_location(self):
         """
         Determines the object's location and returns the instance representing
@@ -185,6 +641,8 @@ class BaseObject(object):
             # Rooms can't have locations.
             return
         self._generic_baseobject_to_id_property_setter('location_id', obj_or_id)
+        self._object_store.reindex_object(
+            self, 'location', 'location_alias', 'exit_alias')
 
     location = property(get_location, set_location)
 
@@ -212,6 +670,7 @@ class BaseObject(object):
         """
 
         self._generic_baseobject_to_id_property_setter('zone_id', obj_or_id)
+        self._object_store.reindex_object(self, 'zone')
 
     zone = property(get_zone, set_zone)
 
@@ -486,33 +945,26 @@ class BaseObject(object):
 
         return "%s\n%s\n%s" % (name, desc, contents)
 
-    def _find_name_or_alias_match(self, objects, query):
+    def _find_name_or_alias_match(self, container, query):
         """
-        Performs name and alias matches on a list of objects. Returns the
-        best match, or ``None`` if nothing was found.
+        Performs name and alias matches on the contents of an object. Returns
+        the best match, or ``None`` if nothing was found.
 
-        :param iterable objects: A list of ``BaseObject`` sub-class instances
-            to attempt to match to.
+        :param BaseObject container: The object whose contents to attempt
+            to match to.
         :param str query: The string to match against.
         :rtype: BaseObject
         :returns: The best match object for the given query.
         """
 
-        if not objects:
-            return None
-
-        for obj in objects:
-            # Start by checking all objects for an alias match.
-            aliases = [alias.lower() for alias in obj.aliases]
-            if query.lower() in aliases:
-                # If a match is found, return immediately on said match.
-                return obj
+        # Exact alias matches are a straight index lookup, and take
+        # priority over everything else.
+        alias_matches = self._object_store.find_by_alias(container, query)
+        if alias_matches:
+            return alias_matches[0]
 
-        processor = lambda x: fuzz_utils.full_process(x)
-
-        for choice in objects:
-            processed = processor(choice.name)
-            if query in processed:
+        for choice in container.get_contents():
+            if query in choice.normalized_name:
                 return choice
 
         return None
@@ -603,17 +1055,14 @@ class BaseObject(object):
         if self.location:
             #noinspection PyUnresolvedReferences
             neighboring_match = self._find_name_or_alias_match(
-                self.location.get_contents(),
+                self.location,
                 desc
             )
             if neighboring_match:
                 return neighboring_match
 
         # Next search the objects inside the invoker
-        inventory_match = self._find_name_or_alias_match(
-            self.get_contents(),
-            desc
-        )
+        inventory_match = self._find_name_or_alias_match(self, desc)
         if inventory_match:
             return inventory_match
 
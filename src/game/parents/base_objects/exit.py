@@ -13,6 +13,8 @@ class ExitObject(BaseObject):
     destination.
     """
 
+    __slots__ = ()
+
     #
     ## Begin properties.
     #
@@ -40,6 +42,7 @@ class ExitObject(BaseObject):
         """
 
         self._generic_baseobject_to_id_property_setter('destination_id', obj_or_id)
+        self._object_store.reindex_object(self, 'destination')
 
     destination = property(get_destination, set_destination)
 
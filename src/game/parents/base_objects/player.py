@@ -9,6 +9,8 @@ class PlayerObject(ThingObject):
     src.game.parents.base_objects.player.PlayerObject
     """
 
+    __slots__ = ()
+
     @property
     def base_type(self):
         """
@@ -60,6 +62,8 @@ class AdminPlayerObject(PlayerObject):
     src.game.parents.base_objects.player.AdminPlayerObject
     """
 
+    __slots__ = ()
+
     def is_admin(self):
         """
         This always returns ``True``, since this is a AdminPlayerObject.
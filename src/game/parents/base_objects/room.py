@@ -7,6 +7,8 @@ class RoomObject(BaseObject):
     room-specific behavior.
     """
 
+    __slots__ = ()
+
     @property
     def base_type(self):
         """
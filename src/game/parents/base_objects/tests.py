@@ -111,6 +111,60 @@ class BaseObjectTests(DottTestCase):
         # 'key' should refer to keything which is inside of smallthing
         self.assertEqual(keything, smallthing.contextual_object_search('key'))
 
+    @inlineCallbacks
+    def test_alias_search_and_name_cache(self):
+        """
+        Alias matches come from the store's location alias index, and the
+        normalized name/alias caches are invalidated on change.
+        """
+
+        room = yield self.object_store.create_object(settings.ROOM_PARENT, name='Room')
+        searcher = yield self.object_store.create_object(
+            settings.THING_PARENT,
+            location_id=room.id,
+            name='Searcher')
+        widget = yield self.object_store.create_object(
+            settings.THING_PARENT,
+            location_id=room.id,
+            aliases=['WDG'],
+            name='Shiny Widget')
+
+        self.assertEqual(widget.normalized_name, 'shiny widget')
+        self.assertEqual(widget, searcher.contextual_object_search('wdg'))
+
+        widget.aliases = ['gizmo']
+        self.assertEqual(widget.lowercase_aliases, frozenset(['gizmo']))
+        self.assertEqual(None, searcher.contextual_object_search('wdg'))
+        self.assertEqual(widget, searcher.contextual_object_search('GIZMO'))
+
+        widget.name = 'Dull Sprocket'
+        self.assertEqual(widget.normalized_name, 'dull sprocket')
+        self.assertEqual(widget, searcher.contextual_object_search('sprocket'))
+
+        # Moving the object takes its aliases along with it.
+        widget.set_location(searcher)
+        self.assertListEqual(self.object_store.find_by_alias(room, 'gizmo'), [])
+        self.assertEqual(widget, searcher.contextual_object_search('gizmo'))
+
+    @inlineCallbacks
+    def test_shared_strings(self):
+        """
+        Objects don't carry a __dict__, and share parent and alias strings.
+        """
+
+        room = yield self.object_store.create_object(settings.ROOM_PARENT, name='Room')
+        thing1 = yield self.object_store.create_object(
+            settings.THING_PARENT, location_id=room.id, aliases=['box'], name='Box 1')
+        thing2 = yield self.object_store.create_object(
+            settings.THING_PARENT, location_id=room.id, aliases=['box'], name='Box 2')
+
+        self.assertFalse(hasattr(thing1, '__dict__'))
+        self.assertIs(thing1.parent, thing2.parent)
+        self.assertIs(thing1.aliases[0], thing2.aliases[0])
+        # Handing out the alias list mustn't expose the stored aliases.
+        thing1.aliases.append('crate')
+        self.assertListEqual(thing1.aliases, ['box'])
+
     @inlineCallbacks
     def test_deletion_cleanup(self):
         """
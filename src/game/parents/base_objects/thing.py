@@ -16,6 +16,8 @@ class ThingObject(BaseObject):
     However, a ThingObject can carry other ThingObjects, like a RoomObject.
     """
 
+    __slots__ = ()
+
     @property
     def base_type(self):
         """
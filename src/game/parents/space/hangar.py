@@ -8,6 +8,8 @@ class HangarMixin(object):
     Contains hangar-specific stuff.
     """
 
+    __slots__ = ()
+
     def get_inspace_obj(self):
         """
         Returns the object that this hangar is attached to in space. This will
@@ -56,7 +58,7 @@ class RoomHangarObject(RoomObject, HangarMixin):
     src.game.parents.space.hangar.RoomHangarObject
     """
 
-    pass
+    __slots__ = ()
 
 
 class ThingHangarObject(ThingObject, HangarMixin):
@@ -66,4 +68,4 @@ class ThingHangarObject(ThingObject, HangarMixin):
     src.game.parents.space.hangar.ThingHangarObject
     """
 
-    pass
\ No newline at end of file
+    __slots__ = ()
\ No newline at end of file
@@ -1,4 +1,4 @@
 from src.game.parents.space.solar_system import InSpaceObject
 
 class JumpGateObject(InSpaceObject):
-    pass
\ No newline at end of file
+    __slots__ = ()
\ No newline at end of file
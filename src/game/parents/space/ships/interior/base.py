@@ -7,6 +7,9 @@ class SpaceShipInteriorObject(ThingObject):
     the bridge. To the player, these look and feel like rooms, but they're
     really objects sitting inside the BaseSpaceShipObject's inventory.
     """
+
+    __slots__ = ()
+
     def get_ship_obj(self):
         """
         Returns the ship object which this interior object belongs to.
@@ -369,6 +369,8 @@ class SpaceShipBridgeObject(SpaceShipInteriorObject):
     call this a cockpit.
     """
 
+    __slots__ = ()
+
     local_command_table = ShipBridgeCommandTable()
 
     def can_object_leave(self, obj):
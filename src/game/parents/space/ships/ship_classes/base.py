@@ -22,6 +22,8 @@ class BaseSpaceShipObject(InSpaceObject):
     :py:class:`SpaceShipBridgeObject`.
     """
 
+    __slots__ = ()
+
     # This is the full name of the ship type.
     ship_type_name = 'Unknown'
     # The alphanumerical ship reference code.
@@ -90,10 +92,12 @@ class BaseSpaceShipObject(InSpaceObject):
         :raises: ShipError if no bridge was found.
         """
 
-        contents = self.get_contents()
-        for obj in contents:
-            if isinstance(obj, SpaceShipBridgeObject):
-                return obj
+        bridges = self._object_store.find(
+            parent=SpaceShipBridgeObject,
+            location=self,
+        )
+        if bridges:
+            return bridges[0]
 
         raise ShipError("No bridge found for %s" % self.get_appearance_name(
             None, force_admin_view=True))
@@ -149,8 +153,11 @@ class BaseSpaceShipObject(InSpaceObject):
         """
 
         assert not self.is_ship_landed(), "Attempting to get contacts while landed."
-        return [obj for obj in self.location.get_contents()
-                if isinstance(obj, InSpaceObject) and obj.id != self.id]
+        contacts = self._object_store.find(
+            parent=InSpaceObject,
+            location=self.location,
+        )
+        return [obj for obj in contacts if obj.id != self.id]
 
     def check_ship_standing(self, inquiring_ship):
         """
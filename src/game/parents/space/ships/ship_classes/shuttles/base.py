@@ -7,5 +7,7 @@ class BaseShuttleSpaceShipObject(BaseSpaceShipObject):
     Some basic stuff for the Shuttle ship class.
     """
 
+    __slots__ = ()
+
     ship_class = SHIP_CLASS_SHUTTLE
     ship_class_code = SHIP_CLASS_CODE_SHUTTLE
\ No newline at end of file
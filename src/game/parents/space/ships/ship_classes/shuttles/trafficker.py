@@ -9,6 +9,8 @@ class TraffickerSpaceShipBridgeObject(SpaceShipBridgeObject):
     src.game.parents.space.ships.ship_classes.shuttles.trafficker.TraffickerSpaceShipBridgeObject
     """
 
+    __slots__ = ()
+
     def get_description(self, *args, **kwargs):
         """
         A customized bridge description for the ship.
@@ -30,6 +32,8 @@ class TraffickerSpaceShipObject(BaseShuttleSpaceShipObject):
     src.game.parents.space.ships.ship_classes.shuttles.trafficker.TraffickerSpaceShipObject
     """
 
+    __slots__ = ()
+
     ship_type_name = 'Trafficker'
     ship_reference = 'TFK-1A'
 
@@ -8,5 +8,7 @@ class AthenaSpaceStationObject(BaseSpaceStationObject):
     src.game.parents.space.ships.ship_classes.stations.athena.AthenaSpaceStationObject
     """
 
+    __slots__ = ()
+
     ship_type_name = 'Athena'
     ship_reference = 'ATH-1A'
@@ -7,5 +7,7 @@ class BaseSpaceStationObject(BaseSpaceShipObject):
     A basic space station.
     """
 
+    __slots__ = ()
+
     ship_class = SHIP_CLASS_STATION
     ship_class_code = SHIP_CLASS_CODE_STATION
\ No newline at end of file
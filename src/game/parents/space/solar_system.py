@@ -9,6 +9,8 @@ class SolarSystemObject(RoomObject):
     src.game.parents.space.solar_system.SolarSystemObject
     """
 
+    __slots__ = ()
+
     def get_places_obj_list(self):
         """
         Returns all warpable places in the solar system as a list.
@@ -17,10 +19,10 @@ class SolarSystemObject(RoomObject):
         :returns: A list of :py:class:`SolarSystemPlaceObject` sub-classes.
         """
 
-        return [
-            obj for obj in self.get_contents()
-            if isinstance(obj, SolarSystemPlaceObject)
-        ]
+        return self._object_store.find(
+            parent=SolarSystemPlaceObject,
+            location=self,
+        )
 
 
 class SolarSystemPlaceObject(ThingObject):
@@ -31,6 +33,8 @@ class SolarSystemPlaceObject(ThingObject):
     src.game.parents.space.solar_system.SolarSystemPlaceObject
     """
 
+    __slots__ = ()
+
     def get_solar_system_obj(self):
         """
         Determines which solar system this place is in.
@@ -57,14 +61,12 @@ class SolarSystemPlaceObject(ThingObject):
 
         # Keys are in-space objects, values will eventually be their hangar objects.
         grouped_hangars = {}
-        inspace_objs = self.get_contents()
         # Look through each object's DOCKABLE_IDS attribute to see what the
-        # possibilities are.
-        for obj in inspace_objs:
-            obj_dockables = obj.attributes.get('DOCKABLE_IDS', [])
-            if not obj_dockables:
-                continue
-            grouped_hangars[obj.id] = obj_dockables
+        # possibilities are. InSpaceObject indexes it, so only the objects
+        # that have some are looked at.
+        for obj in self._object_store.find(
+                location=self, has_attribute='DOCKABLE_IDS'):
+            grouped_hangars[obj.id] = obj.get_attribute('DOCKABLE_IDS')
 
         # This will be a flattened list of hangar IDs the ship can dock to.
         flat_hangar_id_list = []
@@ -101,7 +103,11 @@ class InSpaceObject(ThingObject):
     in that they may be interacted with.
     """
 
+    __slots__ = ()
+
     display_name = "InSpaceObject"
+    # DOCKABLE_IDS is a list of hangar IDs that ships may dock in.
+    indexed_attributes = ThingObject.indexed_attributes + ('DOCKABLE_IDS',)
 
 
 class PlanetObject(InSpaceObject):
@@ -111,6 +117,8 @@ class PlanetObject(InSpaceObject):
     src.game.parents.space.solar_system.PlanetObject
     """
 
+    __slots__ = ()
+
     @property
     def display_name(self):
         return self.name
\ No newline at end of file
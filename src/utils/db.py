@@ -2,31 +2,277 @@
 Some assorted DB-related utils.
 """
 
-import psycopg2
-import psycopg2.extras
+import re
+import time
+
+from twisted.internet.defer import Deferred, DeferredLock, succeed
 from txpostgres import txpostgres
 
 import settings
 
+# Connection pools are shared by everything in a process. Keys are
+# (db_mode, lane) tuples, values are started pools.
+_POOLS = {}
+# Deferreds waiting on pools that are still connecting, with the same keys.
+_POOL_WAITERS = {}
+
+
+class PreparedStatement(object):
+    """
+    A query that is parsed and planned once per connection, then executed
+    by name. Write the query with ``%s`` placeholders, same as for
+    ``runQuery``, and run it with the connection's ``runPrepared*`` methods.
+    """
+
+    def __init__(self, name, query):
+        """
+        :param str name: A name for the statement, unique within the process.
+        :param str query: The SQL, with ``%s`` placeholders for parameters.
+        """
 
-class txPGDictConnection(txpostgres.Connection):
+        self.name = name
+        self.query = query
+        num_params = query.count('%s')
+        self.prepare_sql = "PREPARE %s AS %s" % (
+            name, query % tuple('$%d' % (i + 1) for i in range(num_params)))
+        if num_params:
+            self.execute_sql = "EXECUTE %s (%s)" % (
+                name, ', '.join(['%s'] * num_params))
+        else:
+            self.execute_sql = "EXECUTE %s" % name
+
+
+class txPGConnection(txpostgres.Connection):
+    """
+    A txpostgres Connection sub-class that can run prepared statements.
+    Rows come back as plain tuples. Use :py:func:`get_select_columns` and
+    :py:func:`row_to_kwargs` to get at the values by column name.
     """
-    This is a txpostgres Connection sub-class that returns rows as dicts,
-    instead of tuples.
 
-    .. note:: This does incur some additional overhead, and is going to be
-        slower than the default cursor. This is not a problem for us most
-        of the time, since we only really use the DB for persistence.
+    def __init__(self, *args, **kwargs):
+        txpostgres.Connection.__init__(self, *args, **kwargs)
+        # Names of the statements that have been prepared on this connection.
+        self.prepared_statements = set()
+
+    def prepare(self, *statements):
+        """
+        Prepares any of the given statements that haven't been already on
+        this connection, in a single round trip.
+
+        :param PreparedStatement statements: The statements to prepare.
+        :rtype: Deferred
+        """
+
+        to_prepare = dict(
+            (statement.name, statement) for statement in statements
+            if statement.name not in self.prepared_statements)
+        if not to_prepare:
+            return succeed(None)
+
+        d = self.runOperation('; '.join(
+            statement.prepare_sql for statement in to_prepare.values()))
+        d.addCallback(
+            lambda _: self.prepared_statements.update(to_prepare.keys()))
+        return d
+
+    def runPreparedQuery(self, statement, params=()):
+        """
+        Like ``runQuery``, but executes a prepared statement.
+
+        :param PreparedStatement statement: The statement to execute.
+        :param tuple params: The statement's parameters.
+        :rtype: Deferred
+        """
+
+        d = self.prepare(statement)
+        d.addCallback(
+            lambda _: self.runQuery(statement.execute_sql, params))
+        return d
+
+    def runPreparedOperation(self, statement, params=()):
+        """
+        Like ``runOperation``, but executes a prepared statement.
+
+        :param PreparedStatement statement: The statement to execute.
+        :param tuple params: The statement's parameters.
+        :rtype: Deferred
+        """
+
+        d = self.prepare(statement)
+        d.addCallback(
+            lambda _: self.runOperation(statement.execute_sql, params))
+        return d
+
+    def runPreparedOperations(self, executions):
+        """
+        Executes several prepared statements in a single round trip. As with
+        any multi-statement query, they're run in one implicit transaction.
+
+        :param list executions: A list of ``(statement, params)`` tuples.
+        :rtype: Deferred
+        """
+
+        statements = [statement for statement, _ in executions]
+        query = '; '.join(statement.execute_sql for statement in statements)
+        params = []
+        for _, statement_params in executions:
+            params.extend(statement_params)
+
+        d = self.prepare(*statements)
+        d.addCallback(lambda _: self.runOperation(query, params))
+        return d
+
+
+class txPGConnectionPool(txpostgres.ConnectionPool):
+    """
+    A pool of :py:class:`txPGConnection` instances, which also keeps
+    track of how busy it is, and how long queries wait for a free
+    connection. This can be used anywhere a single connection is.
+    """
+
+    connectionFactory = txPGConnection
+
+    def __init__(self, _ignored, *connargs, **connkw):
+        txpostgres.ConnectionPool.__init__(self, _ignored, *connargs, **connkw)
+        self.peak_in_use = 0
+        self.requests = 0
+        # Requests that couldn't get a connection straight away.
+        self.waits = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def runQuery(self, *args, **kwargs):
+        return self._run('runQuery', *args, **kwargs)
+
+    def runOperation(self, *args, **kwargs):
+        return self._run('runOperation', *args, **kwargs)
+
+    def runInteraction(self, interaction, *args, **kwargs):
+        return self._run('runInteraction', interaction, *args, **kwargs)
+
+    def runPreparedQuery(self, statement, params=()):
+        return self._run('runPreparedQuery', statement, params)
+
+    def runPreparedOperation(self, statement, params=()):
+        return self._run('runPreparedOperation', statement, params)
+
+    def runPreparedOperations(self, executions):
+        return self._run('runPreparedOperations', executions)
+
+    def _run(self, method_name, *args, **kwargs):
+        """
+        Runs a connection method once one is free.
+
+        :param str method_name: The txpostgres Connection method to run.
+        :rtype: Deferred
+        """
+
+        self.requests += 1
+        if not self._semaphore.tokens:
+            self.waits += 1
+        return self._semaphore.run(
+            self._run_on_connection, time.time(), method_name, *args, **kwargs)
+
+    def _run_on_connection(self, requested_at, method_name, *args, **kwargs):
+        wait_time = time.time() - requested_at
+        self.total_wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+
+        conn = self.connections.pop()
+        self.peak_in_use = max(self.peak_in_use, self.get_in_use())
+        d = getattr(conn, method_name)(*args, **kwargs)
+        return d.addBoth(self._putBackAndPassthrough, conn)
+
+    def get_in_use(self):
+        """
+        :rtype: int
+        :returns: The number of connections currently running something.
+        """
+
+        return self.min - len(self.connections)
+
+    def get_stats(self):
+        """
+        :rtype: dict
+        :returns: The pool's size, current and peak utilization, the number
+            of requests waiting for a connection, and wait counts and times
+            since start-up.
+        """
+
+        return {
+            'size': self.min,
+            'in_use': self.get_in_use(),
+            'peak_in_use': self.peak_in_use,
+            'queued': len(self._semaphore.waiting),
+            'requests': self.requests,
+            'waits': self.waits,
+            'max_wait_time': self.max_wait_time,
+            'avg_wait_time': self.total_wait_time / self.requests
+            if self.requests else 0.0,
+        }
+
+
+class KeyedLock(object):
+    """
+    A set of DeferredLocks, created as needed for each key and discarded
+    once nothing holds or waits on them. Pooled connections run queries
+    side by side, so this is used to keep writes to the same row in order.
     """
 
-    @staticmethod
-    def dict_connect(*args, **kwargs):
-        kwargs['connection_factory'] = psycopg2.extras.DictConnection
-        conn = psycopg2.connect(*args, **kwargs)
-        return conn
+    def __init__(self):
+        self._locks = {}
 
-    # Overriding the default connection factory.
-    connectionFactory = dict_connect
+    def run(self, key, func, *args, **kwargs):
+        """
+        Runs ``func`` once every earlier call with the same key is done.
+
+        :param key: Usually a row's ID.
+        :param callable func: The function to run. May return a Deferred.
+        :rtype: Deferred
+        """
+
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = DeferredLock()
+
+        def discard_lock(result):
+            if not lock.locked and self._locks.get(key) is lock:
+                del self._locks[key]
+            return result
+
+        return lock.run(func, *args, **kwargs).addBoth(discard_lock)
+
+
+def get_select_columns(query):
+    """
+    Works out the names of the columns a SELECT returns, in order, so rows
+    can be handled as plain tuples. Expressions need an ``AS`` alias.
+
+    :param str query: A ``SELECT ... FROM ...`` query.
+    :rtype: tuple
+    :returns: The column names, or aliases where given.
+    """
+
+    match = re.match(r'\s*SELECT\s+(.*?)\s+FROM\s', query, re.I | re.S)
+    columns = []
+    for column in match.group(1).split(','):
+        # The last word is either the column itself or its alias.
+        columns.append(column.split()[-1])
+    return tuple(columns)
+
+
+def row_to_kwargs(columns, row):
+    """
+    Converts a tuple row to a dict, usually to pass to a constructor as
+    kwargs. This runs for every row loaded, so keep it lean.
+
+    :param tuple columns: The row's column names, as returned by
+        :py:func:`get_select_columns`.
+    :param tuple row: A row, straight from the cursor.
+    :rtype: dict
+    """
+
+    return dict(zip(columns, row))
 
 
 def get_db_connection_kwargs(db_mode='production', include_db=True):
@@ -52,4 +298,84 @@ def get_db_connection_kwargs(db_mode='production', include_db=True):
     if not include_db:
         del conn_info['database']
 
-    return conn_info
\ No newline at end of file
+    return conn_info
+
+
+def get_db_backend(db_mode='production'):
+    """
+    :param str db_mode: Either 'test' or 'production'.
+    :rtype: str
+    :returns: The name of the storage backend to use for the given mode,
+        either 'postgres' or 'memory'.
+    """
+
+    if db_mode == 'production':
+        return settings.DB_BACKEND
+    return settings.TEST_DB_BACKEND
+
+
+def get_db_pool(db_mode='production', lane='interactive'):
+    """
+    Returns the process's connection pool for the given lane, connecting
+    it first if need be. Player-facing queries should use the
+    ``'interactive'`` lane, and loads, batch writes, and other long-running
+    work the ``'bulk'`` lane, so they can't hold each other up. Pool sizes
+    are set by ``settings.DB_POOL_SIZES``.
+
+    :param str db_mode: Either 'test' or 'production'.
+    :param str lane: One of the keys in ``settings.DB_POOL_SIZES``.
+    :rtype: Deferred
+    :returns: A Deferred that fires with a :py:class:`txPGConnectionPool`.
+    """
+
+    key = (db_mode, lane)
+    if key in _POOLS:
+        return succeed(_POOLS[key])
+
+    waiter = Deferred()
+    if key in _POOL_WAITERS:
+        _POOL_WAITERS[key].append(waiter)
+        return waiter
+    _POOL_WAITERS[key] = [waiter]
+
+    conn_info = get_db_connection_kwargs(db_mode=db_mode)
+    pool = txPGConnectionPool(
+        None, min=settings.DB_POOL_SIZES[lane], **conn_info)
+
+    def on_started(_):
+        _POOLS[key] = pool
+        for pool_waiter in _POOL_WAITERS.pop(key):
+            pool_waiter.callback(pool)
+
+    def on_failed(failure):
+        pool.close()
+        for pool_waiter in _POOL_WAITERS.pop(key):
+            pool_waiter.errback(failure)
+
+    pool.start().addCallbacks(on_started, on_failed)
+    return waiter
+
+
+def get_db_pool_stats(db_mode='production'):
+    """
+    :param str db_mode: Either 'test' or 'production'.
+    :rtype: dict
+    :returns: The stats for each of the process's connected pools, keyed
+        by lane. See :py:meth:`txPGConnectionPool.get_stats`.
+    """
+
+    return dict(
+        (lane, pool.get_stats())
+        for (pool_mode, lane), pool in _POOLS.items()
+        if pool_mode == db_mode
+    )
+
+
+def close_db_pools():
+    """
+    Disconnects and forgets all of the process's connection pools.
+    """
+
+    for pool in _POOLS.values():
+        pool.close()
+    _POOLS.clear()
@@ -32,4 +32,21 @@ def to_str(obj, encoding='utf-8'):
             obj = obj.encode(encoding)
         except UnicodeEncodeError:
             raise Exception("Error: Unicode could not encode unicode string '%s'(%s) to a bytestring. " % (obj, encoding))
-    return obj
\ No newline at end of file
+    return obj
+
+
+# Keys are (type, string) tuples, values are the canonical copy of the string.
+_INTERNED_STRINGS = {}
+
+
+def intern_str(obj):
+    """
+    Returns a canonical, shared copy of the given string, so that many
+    equal strings only take up memory once. Unlike the built-in intern(),
+    this works with unicode strings, too. Interned strings are never
+    freed, so only use this on values with few distinct possibilities
+    (parent paths, aliases, and the like).
+    """
+    if obj is None:
+        return None
+    return _INTERNED_STRINGS.setdefault((type(obj), obj), obj)
@@ -7,7 +7,7 @@ import os
 
 import psycopg2
 from twisted.trial import unittest
-from twisted.internet.defer import inlineCallbacks
+from twisted.internet.defer import inlineCallbacks, returnValue
 
 import settings
 from src.game.commands.global_cmdtable import GlobalCommandTable, GlobalAdminCommandTable
@@ -19,11 +19,26 @@ from src.daemons.proxy.sessions.session_manager import SessionManager
 # I'm probably going to hell for this, but we use it to make sure that
 # we only create the test DB once, instead of between every test. Makes things
 # run a little faster.
-from src.utils.db import get_db_connection_kwargs
+from src.utils.db import get_db_backend, get_db_connection_kwargs, \
+    get_db_pool, close_db_pools
 
 DB_WAS_CREATED = False
 
 
+def requires_postgres(test_method):
+    """
+    Decorates tests that poke at Postgres directly, so they're skipped when
+    the suite runs against another backend (``settings.TEST_DB_BACKEND``).
+
+    :param function test_method: The test method to decorate.
+    :rtype: function
+    """
+
+    if get_db_backend(db_mode='test') != 'postgres':
+        test_method.skip = "Needs the Postgres storage backend."
+    return test_method
+
+
 #noinspection PyDocstring,PyPep8Naming
 class FakeProxyAMP(object):
     """
@@ -63,15 +78,18 @@ class MockMudService(object):
     def unload(self):
         """
         Right now this is specific to unit tests, and doesn't actually exist
-        in the actual MudService class. We clear out the various test tables
-        and close all DB pointers.
+        in the actual MudService class. We close the object store, clear out
+        the various test tables and close all DB pointers. The memory
+        backend's tables go away with the stores, so there's nothing to
+        clear for it.
         """
 
-        yield self.object_store.db_manager._db.runOperation(
-            "TRUNCATE dott_accounts, dott_objects")
+        yield self.object_store.close()
+        if get_db_backend(db_mode='test') == 'postgres':
+            db = yield get_db_pool(db_mode='test')
+            yield db.runOperation("TRUNCATE dott_accounts, dott_objects")
 
-        self.object_store.db_manager._db.close()
-        self.account_store.db_manager._db.close()
+        close_db_pools()
 
 
 #noinspection PyPep8Naming
@@ -109,7 +127,7 @@ class DottTestCase(unittest.TestCase):
         """
 
         global DB_WAS_CREATED
-        if not DB_WAS_CREATED:
+        if not DB_WAS_CREATED and get_db_backend(db_mode='test') == 'postgres':
             # We have to use psycopg2 directly since txpostgres can't
             # be used with autocommit=True.
             conn_info = get_db_connection_kwargs(db_mode='test', include_db=False)
@@ -144,3 +162,24 @@ class DottTestCase(unittest.TestCase):
         self.session_manager = self.mud_service.session_manager
         self.object_store = self.mud_service.object_store
         self.account_store = self.mud_service.account_store
+
+    @inlineCallbacks
+    def recreate_object_store(self):
+        """
+        Swaps the object store out for a new one, as if the server had been
+        restarted. Features that are set up when the store is created can
+        be turned on by patching their settings first. The old store is
+        closed without flushing anything, and its DB manager is handed to
+        the new one, so nothing in the DB is lost on the memory backend.
+
+        :rtype: ObjectStore
+        :returns: The new object store, loaded from the DB.
+        """
+
+        old_store = self.object_store
+        yield old_store.close()
+        self.object_store = ObjectStore(self.mud_service, db_mode='test')
+        self.object_store.db_manager = old_store.db_manager
+        self.mud_service.object_store = self.object_store
+        yield self.object_store.prep_and_load()
+        returnValue(self.object_store)